@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Vectorized backtests of screens over stock_data_daily.
+
+A backtest treats every (symbol, date) row that passes a screen between
+`start` and `end` as an entry at that date's close. The screen is a
+built-in screen id or a definition in the screen language of screens.py.
+Signals are screens too: "new-buys" and "new-sells" enter on the bar where
+the signal flips.
+
+Prices are laid out as a (dates, symbols) adjusted_close matrix over the
+universe calendar (every date with at least one row), so the whole run is
+a handful of array operations instead of a loop over trades:
+
+    forward return at N   adjusted_close N sessions after the entry / at entry - 1;
+                          entries without a bar N sessions later are not counted
+    hit rate              share of those returns above zero
+    equity curve          every entry held for `hold` sessions from the next one,
+                          one equal lot per open entry, rebalanced daily; days
+                          with nothing open earn nothing
+    max drawdown          largest fall of the equity curve from a prior peak
+
+Gaps in a symbol's own history are bridged by carrying its last price, so
+a halted position earns nothing until it trades again.
+
+The universe is split into chunks of symbols. Each chunk is loaded and
+evaluated independently and returns additive partial results (trade
+returns per horizon, daily sums of open lots and their returns), so with
+workers > 1 the chunks run in separate processes, each reading the database
+on its own connection. The API runs every backtest on one shared pool of
+BACKTEST_WORKERS processes (shared_pool) and admits at most
+BACKTEST_MAX_CONCURRENT of them at a time.
+
+Usage:
+    python backtest.py new-buys --start 2015-01-02 --end 2024-12-31
+    python backtest.py gapup --horizons 1,5,20 --hold 5 --workers 8
+"""
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from screens import SCREENS, Screen, resolve_screen
+
+DEFAULT_HORIZONS = (1, 5, 10, 20)
+DEFAULT_HOLD = 20
+MAX_HORIZON = 252
+BACKTEST_CHUNK_SYMBOLS = int(os.getenv("BACKTEST_CHUNK_SYMBOLS", "500"))
+BACKTEST_WORKERS = int(os.getenv("BACKTEST_WORKERS", str(os.cpu_count() or 1)))
+BACKTEST_MAX_CONCURRENT = int(os.getenv("BACKTEST_MAX_CONCURRENT", "2"))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _carry_forward(prices: np.ndarray) -> np.ndarray:
+    """Fill NaN gaps in each symbol's column with its last price (leading NaNs stay)"""
+    dates = np.arange(prices.shape[0])[:, None]
+    last = np.maximum.accumulate(np.where(np.isnan(prices), 0, dates), axis=0)
+    # Rows before a symbol's first price point at row 0, which is NaN for them
+    return np.take_along_axis(prices, last, axis=0)
+
+
+def evaluate(prices: np.ndarray, entries: np.ndarray, horizons: Sequence[int], hold: int) -> dict:
+    """
+    Backtest one (dates, symbols) block: `prices` are adjusted closes (NaN
+    without a bar), `entries` the rows passing the screen. Returns the
+    additive partial results combined by summarize().
+    """
+    dates = prices.shape[0]
+    entries = entries & ~np.isnan(prices)
+
+    returns = {}
+    for horizon in horizons:
+        later = np.full_like(prices, np.nan)
+        if horizon < dates:
+            later[:dates - horizon] = prices[horizon:]
+        forward = later / prices - 1
+        returns[horizon] = forward[entries & ~np.isnan(forward)]
+
+    # lots[d]: entries made in the `hold` sessions before d, i.e. open during d
+    counts = np.zeros((dates + 1, prices.shape[1]))
+    np.cumsum(entries, axis=0, out=counts[1:])
+    lots = np.zeros_like(prices)
+    lots[1:] = counts[1:dates] - counts[np.maximum(np.arange(1, dates) - hold, 0)]
+
+    filled = _carry_forward(prices)
+    daily = np.zeros_like(prices)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        daily[1:] = filled[1:] / filled[:-1] - 1
+    daily[np.isnan(daily)] = 0
+
+    return {
+        "returns": returns,
+        "entries": int(entries.sum()),
+        "entry_dates": entries.sum(axis=1),
+        "lots": lots.sum(axis=1),
+        "lot_returns": (lots * daily).sum(axis=1),
+    }
+
+
+def _load_chunk(conn: sqlite3.Connection, symbol_ids: Sequence[int], calendar: np.ndarray,
+                screen: Screen) -> Tuple[np.ndarray, np.ndarray]:
+    """(dates, symbols) adjusted_close and screen-match matrices for a chunk of symbols"""
+    # One row per symbol with its history as comma-separated text: building a Python
+    # row per bar costs more than the rest of the backtest. SQLite renders reals with
+    # 15 significant digits, beyond the precision of any feed's prices.
+    # IS 1 turns an unknown (NULL) condition into 0, which group_concat would skip
+    matched = f"({screen.condition}) IS 1" if screen.condition else "1"
+    query = f"""
+    SELECT d.symbol_id, group_concat(d.date), group_concat(d.adjusted_close), group_concat({matched})
+    FROM stock_data_daily d
+    WHERE d.symbol_id IN ({", ".join("?" for _ in symbol_ids)}) AND d.date >= ? AND d.date <= ?
+    GROUP BY d.symbol_id
+    """
+    params = (*screen.params, *symbol_ids, calendar[0], calendar[-1])
+    prices = np.full((len(calendar), len(symbol_ids)), np.nan)
+    entries = np.zeros(prices.shape, dtype=bool)
+    columns = {symbol_id: i for i, symbol_id in enumerate(symbol_ids)}
+    for symbol_id, dates, closes, flags in conn.execute(query, params):
+        date_index = np.searchsorted(calendar, np.array(dates.split(",")))
+        prices[date_index, columns[symbol_id]] = np.array(closes.split(","), dtype=np.float64)
+        entries[date_index, columns[symbol_id]] = np.array(flags.split(","), dtype=np.int8) == 1
+    return prices, entries
+
+
+def run_chunk(db_path: str, symbol_ids: Sequence[int], calendar: np.ndarray, entry_dates: int,
+              screen: str, horizons: Sequence[int], hold: int) -> dict:
+    """Load and evaluate one chunk of symbols on its own connection (a worker process's unit of work)"""
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("PRAGMA query_only = ON")
+        prices, matched = _load_chunk(conn, symbol_ids, calendar, resolve_screen(screen))
+    # Entries only up to `end`; the dates after it are there for the forward returns
+    matched[entry_dates:] = False
+    return evaluate(prices, matched, horizons, hold)
+
+
+def _horizon_stats(returns: np.ndarray) -> dict:
+    if len(returns) == 0:
+        return {"trades": 0, "mean": None, "median": None, "hit_rate": None, "best": None, "worst": None}
+    return {
+        "trades": int(len(returns)),
+        "mean": float(returns.mean()),
+        "median": float(np.median(returns)),
+        "hit_rate": float(np.count_nonzero(returns > 0) / len(returns)),
+        "best": float(returns.max()),
+        "worst": float(returns.min()),
+    }
+
+
+def summarize(parts: List[dict], calendar: np.ndarray, horizons: Sequence[int]) -> dict:
+    """Combine the partial results of every chunk into the backtest report"""
+    lots = sum(part["lots"] for part in parts)
+    lot_returns = sum(part["lot_returns"] for part in parts)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        daily = np.where(lots > 0, lot_returns / lots, 0.0)
+    equity = np.cumprod(1 + daily)
+    drawdown = 1 - equity / np.maximum.accumulate(equity)
+
+    # The curve runs from the first entry to the last session any position is open
+    active = np.flatnonzero((sum(part["entry_dates"] for part in parts) > 0) | (lots > 0))
+    first, last = (active[0], active[-1] + 1) if len(active) else (0, 0)
+    return {
+        "trades": int(sum(part["entries"] for part in parts)),
+        "forward_returns": {
+            str(horizon): _horizon_stats(np.concatenate([part["returns"][horizon] for part in parts]))
+            for horizon in horizons
+        },
+        "total_return": float(equity[last - 1] - 1) if last else 0.0,
+        "max_drawdown": float(drawdown[first:last].max()) if last else 0.0,
+        "equity_curve": [
+            {"date": date, "equity": value, "positions": int(open_lots)}
+            for date, value, open_lots in zip(calendar[first:last].tolist(), equity[first:last].tolist(),
+                                              lots[first:last].tolist())
+        ],
+    }
+
+
+def _calendar(conn: sqlite3.Connection, start: str, end: str, extra: int) -> Tuple[np.ndarray, int]:
+    """Trading dates from start to end plus `extra` sessions after end, and how many are entry dates"""
+    dates = [row[0] for row in conn.execute(
+        "SELECT DISTINCT date FROM stock_data_daily WHERE date >= ? AND date <= ? ORDER BY date", (start, end)
+    )]
+    after = [row[0] for row in conn.execute(
+        "SELECT DISTINCT date FROM stock_data_daily WHERE date > ? ORDER BY date LIMIT ?", (end, extra)
+    )]
+    return np.array(dates + after), len(dates)
+
+
+def _symbol_ids(conn: sqlite3.Connection, symbols: Optional[Sequence[str]]) -> List[int]:
+    if symbols is None:
+        return [row[0] for row in conn.execute("SELECT symbol_id FROM symbols ORDER BY symbol_id")]
+    query = f"SELECT symbol_id FROM symbols WHERE symbol IN ({', '.join('?' for _ in symbols)}) ORDER BY symbol_id"
+    return [row[0] for row in conn.execute(query, tuple(symbols))]
+
+
+def _process_pool(workers: int) -> ProcessPoolExecutor:
+    # spawn, not fork: the API starts workers from a thread of a process holding pooled connections
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def shared_pool() -> Optional[ProcessPoolExecutor]:
+    """The worker processes every API backtest shares; None when BACKTEST_WORKERS is 1"""
+    global _pool
+    if BACKTEST_WORKERS <= 1:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = _process_pool(BACKTEST_WORKERS)
+        return _pool
+
+
+def close_shared_pool():
+    """Stop the shared worker processes (application shutdown)"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def run_backtest(db_path: str, screen: str, start: str, end: str,
+                 horizons: Sequence[int] = DEFAULT_HORIZONS, hold: int = DEFAULT_HOLD,
+                 symbols: Optional[Sequence[str]] = None, workers: int = 1,
+                 chunk_symbols: int = BACKTEST_CHUNK_SYMBOLS, pool: Optional[Executor] = None) -> dict:
+    """
+    Backtest a screen (a screens.SCREENS id or a screen definition) for
+    entries from start to end inclusive, over `symbols` or the whole
+    universe. The symbol chunks are evaluated on `pool` when given, or with
+    workers > 1 in that many processes started for this backtest. Raises
+    ScreenError for an invalid screen.
+    """
+    resolve_screen(screen)
+    horizons = sorted(set(horizons))
+    if not horizons or horizons[0] < 1 or horizons[-1] > MAX_HORIZON or not 1 <= hold <= MAX_HORIZON:
+        raise ValueError(f"Horizons and hold must be between 1 and {MAX_HORIZON} sessions")
+
+    started = time.perf_counter()
+    with sqlite3.connect(db_path) as conn:
+        calendar, entry_dates = _calendar(conn, start, end, max(horizons[-1], hold))
+        symbol_ids = _symbol_ids(conn, symbols)
+
+    report = {"screen": screen, "start": start, "end": end, "horizons": horizons, "hold": hold,
+              "symbols": len(symbol_ids), "sessions": entry_dates}
+    if entry_dates == 0 or not symbol_ids:
+        report.update(trades=0, forward_returns={str(h): _horizon_stats(np.empty(0)) for h in horizons},
+                      total_return=0.0, max_drawdown=0.0, equity_curve=[])
+        return report
+
+    chunks = [symbol_ids[i:i + chunk_symbols] for i in range(0, len(symbol_ids), chunk_symbols)]
+    args = (calendar, entry_dates, screen, horizons, hold)
+    columns = list(zip(*((db_path, chunk) + args for chunk in chunks)))
+    if pool is not None and len(chunks) > 1:
+        parts = list(pool.map(run_chunk, *columns))
+    elif workers > 1 and len(chunks) > 1:
+        with _process_pool(min(workers, len(chunks))) as own:
+            parts = list(own.map(run_chunk, *columns))
+    else:
+        parts = [run_chunk(db_path, chunk, *args) for chunk in chunks]
+
+    report.update(summarize(parts, calendar, horizons))
+    logging.info(f"Backtest {screen} {start}..{end}: {len(symbol_ids)} symbols, {entry_dates} sessions, "
+                 f"{report['trades']} trades in {time.perf_counter() - started:.2f}s")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest a screen over stock_data_daily")
+    parser.add_argument("screen", help=f"Screen whose matches are entries: one of {', '.join(SCREENS)} or a definition")
+    parser.add_argument("--start", default="0000-01-01", help="First entry date (YYYY-MM-DD)")
+    parser.add_argument("--end", default="9999-12-31", help="Last entry date (YYYY-MM-DD)")
+    parser.add_argument("--horizons", default=",".join(map(str, DEFAULT_HORIZONS)),
+                        help="Comma-separated forward return horizons in sessions")
+    parser.add_argument("--hold", type=int, default=DEFAULT_HOLD, help="Sessions each entry is held in the equity curve")
+    parser.add_argument("--symbols", default=None, help="Comma-separated symbols; default the whole universe")
+    parser.add_argument("--workers", type=int, default=BACKTEST_WORKERS, help="Worker processes")
+    parser.add_argument("--curve", action="store_true", help="Include the equity curve in the output")
+    args = parser.parse_args()
+
+    from database import DATABASE_PATH
+
+    logging.basicConfig(level=logging.INFO)
+    report = run_backtest(
+        DATABASE_PATH, args.screen, args.start, args.end,
+        horizons=[int(h) for h in args.horizons.split(",")], hold=args.hold,
+        symbols=args.symbols.split(",") if args.symbols else None, workers=args.workers,
+    )
+    if not args.curve:
+        report.pop("equity_curve")
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Benchmark the row-to-JSON response path against per-row Pydantic models.
+
+Compares, per request, the CPU time of the previous path (build a model per
+row, then FastAPI validates against response_model and renders JSONResponse)
+with serialization.json_response on the same rows, for a 2,500-bar chart
+(CandlestickData) and a 3,000-row screener (SymbolWithPriceResponse). Both
+paths must produce identical bytes. Also reports the payload size and
+encode time of each /price-data format for the same chart.
+
+Usage:
+    python bench_serialization.py [--iterations 50]
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from datetime import date, timedelta
+from typing import Callable, List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from models import SymbolWithPriceResponse
+from price_data import BINARY_LAYOUT, PRICE_COLUMNS
+from routers.stocks.get_price_data import CandlestickData
+from serialization import dumps, json_response, pack_columns, to_columns
+
+
+def price_rows(n: int) -> List[dict]:
+    rng = random.Random(1)
+    start = date(2015, 1, 1)
+    rows, close = [], 100.0
+    for i in range(n):
+        close *= 1 + rng.gauss(0, 0.01)
+        rows.append({
+            "time": (start + timedelta(days=i)).isoformat(),
+            "open": close * 0.99,
+            "high": close * 1.01,
+            "low": close * 0.98,
+            "close": close,
+            "volume": rng.randrange(1_000_000, 50_000_000),
+            "ema_21": close * 0.995 if i >= 21 else None,
+            "ema_200": close * 0.97 if i >= 200 else None,
+        })
+    return rows
+
+
+def screener_rows(n: int) -> List[dict]:
+    rng = random.Random(2)
+    rows = []
+    for i in range(n):
+        prev = rng.uniform(5, 500)
+        last = prev * (1 + rng.gauss(0, 0.02))
+        rows.append({
+            "symbol": f"SYM{i:04d}",
+            "type": "stock",
+            "last_price": last,
+            "prev_close": prev,
+            "price_change": last - prev,
+            "percent_change": (last - prev) / prev * 100,
+        })
+    return rows
+
+
+def model_path(model, build: Callable[[dict], object]) -> Callable[[List[dict]], bytes]:
+    """The previous path: a model per row, then FastAPI's response_model handling"""
+    field = create_model_field(name="Response", type_=List[model], mode="serialization")
+    loop = asyncio.new_event_loop()
+
+    def encode(rows: List[dict]) -> bytes:
+        content = [build(row) for row in rows]
+        serialized = loop.run_until_complete(serialize_response(field=field, response_content=content))
+        return JSONResponse(serialized).body
+    return encode
+
+
+def fast_path(rows: List[dict]) -> bytes:
+    return json_response(rows).body
+
+
+def candlestick(row: dict) -> CandlestickData:
+    return CandlestickData(
+        time=row["time"],
+        open=float(row["open"]),
+        high=float(row["high"]),
+        low=float(row["low"]),
+        close=float(row["close"]),
+        volume=int(row["volume"]),
+        ema_21=float(row["ema_21"]) if row["ema_21"] is not None else None,
+        ema_200=float(row["ema_200"]) if row["ema_200"] is not None else None,
+    )
+
+
+def cpu_ms(encode: Callable[[List[dict]], bytes], rows: List[dict], iterations: int) -> float:
+    encode(rows)
+    started = time.process_time()
+    for _ in range(iterations):
+        encode(rows)
+    return (time.process_time() - started) / iterations * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON response encoding")
+    parser.add_argument("--iterations", type=int, default=50, help="Requests to time per case")
+    args = parser.parse_args()
+
+    cases = [
+        ("price-data, 2,500 bars", price_rows(2500), model_path(CandlestickData, candlestick)),
+        ("screener, 3,000 rows", screener_rows(3000), model_path(SymbolWithPriceResponse, lambda row: SymbolWithPriceResponse(**row))),
+    ]
+    for name, rows, slow_path in cases:
+        if slow_path(rows) != fast_path(rows):
+            raise SystemExit(f"{name}: encodings differ")
+        slow = cpu_ms(slow_path, rows, args.iterations)
+        fast = cpu_ms(fast_path, rows, args.iterations)
+        print(f"{name}: pydantic {slow:.2f} ms, orjson {fast:.2f} ms per request "
+              f"({slow - fast:.2f} ms CPU saved, {slow / fast:.1f}x)")
+
+    rows = price_rows(2500)
+    formats = [
+        ("rows", lambda rows: dumps(rows)),
+        ("columns", lambda rows: dumps(to_columns(rows, PRICE_COLUMNS))),
+        ("binary", lambda rows: pack_columns(rows, BINARY_LAYOUT)),
+    ]
+    for name, encode in formats:
+        print(f"price-data format={name}: {len(encode(rows)):,} bytes, "
+              f"{cpu_ms(encode, rows, args.iterations):.2f} ms to encode")
+
+
+if __name__ == "__main__":
+    main()
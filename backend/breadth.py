@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Daily market breadth across the whole universe.
+
+For every trading date: how many symbols made new 63/252-bar highs and
+lows, gapped up and down, closed above their 50/200-bar EMA (out of those
+with an EMA) and flipped to a buy or sell signal. All of it comes from one
+GROUP BY date aggregate over stock_data_daily, so a range of dates costs
+one scan of their rows.
+
+The counts are stored in the market_breadth table when BREADTH_ENABLED (the
+default), so reading a range is a primary-key range read. Writers keep it
+current by calling refresh_breadth from the earliest date they changed, the
+same way they call refresh_rs_ranks. With BREADTH_ENABLED off the aggregate
+runs on each request.
+
+Ratios are derived on read: pct_above_ema_N is 100 * above / with (NULL
+when no symbol has the EMA yet), and the net_ fields are differences.
+
+Usage:
+    python breadth.py                     # rebuild every date
+    python breadth.py --since 2025-06-02  # rebuild dates from this one on
+"""
+
+import argparse
+import logging
+import os
+import sqlite3
+from typing import List, Optional
+
+from database import bump_data_versions, get_db_connection
+
+BREADTH_ENABLED = os.getenv("BREADTH_ENABLED", "1") != "0"
+
+# Stored count columns, in market_breadth order, and their aggregates
+COUNT_COLUMNS = {
+    "symbols": "COUNT(*)",
+    "new_highs_63": "TOTAL(is_high_63)",
+    "new_lows_63": "TOTAL(is_low_63)",
+    "new_highs_252": "TOTAL(is_high_252)",
+    "new_lows_252": "TOTAL(is_low_252)",
+    "gap_ups": "TOTAL(is_gap_up)",
+    "gap_downs": "TOTAL(is_gap_down)",
+    "above_ema_50": "TOTAL(close > ema_50)",
+    "with_ema_50": "COUNT(ema_50)",
+    "above_ema_200": "TOTAL(close > ema_200)",
+    "with_ema_200": "COUNT(ema_200)",
+    "buy_signals": "TOTAL(buy_signal)",
+    "sell_signals": "TOTAL(sell_signal)",
+}
+
+# One row per date of stock_data_daily matching {where}
+AGGREGATE_QUERY = f"""
+SELECT date, {", ".join(f"CAST({aggregate} AS INTEGER) AS {name}" for name, aggregate in COUNT_COLUMNS.items())}
+FROM stock_data_daily
+WHERE {{where}}
+GROUP BY date
+"""
+
+# Fields of a breadth row as served, computed from the stored counts
+SERIES_COLUMNS = """
+date, symbols,
+new_highs_63, new_lows_63, new_highs_63 - new_lows_63 AS net_new_highs_63,
+new_highs_252, new_lows_252, new_highs_252 - new_lows_252 AS net_new_highs_252,
+gap_ups, gap_downs,
+CASE WHEN with_ema_50 > 0 THEN 100.0 * above_ema_50 / with_ema_50 END AS pct_above_ema_50,
+CASE WHEN with_ema_200 > 0 THEN 100.0 * above_ema_200 / with_ema_200 END AS pct_above_ema_200,
+buy_signals, sell_signals, buy_signals - sell_signals AS net_signals
+"""
+
+
+def _range(start: Optional[str], end: Optional[str]):
+    conditions, params = [], []
+    if start is not None:
+        conditions.append("date >= ?")
+        params.append(start)
+    if end is not None:
+        conditions.append("date <= ?")
+        params.append(end)
+    return " AND ".join(conditions) or "1", params
+
+
+def refresh_breadth(conn: sqlite3.Connection, since: Optional[str] = None) -> int:
+    """
+    Recompute market_breadth for every date (or every date from `since`
+    on) and bump the data version of every date rewritten, so cached
+    /breadth responses are revalidated. A no-op when BREADTH_ENABLED is off.
+    Does not commit. Returns the number of dates written.
+    """
+    if not BREADTH_ENABLED:
+        return 0
+    where, params = _range(since, None)
+    # Dates whose rows are all gone must disappear too, so the range is replaced
+    removed = conn.execute(f"DELETE FROM market_breadth WHERE {where} RETURNING date", params).fetchall()
+    written = conn.execute(f"""
+    INSERT INTO market_breadth (date, {", ".join(COUNT_COLUMNS)})
+    {AGGREGATE_QUERY.format(where=where)}
+    RETURNING date
+    """, params).fetchall()
+    bump_data_versions(conn, {date for (date,) in removed + written})
+    return len(written)
+
+
+def breadth_series(start: Optional[str] = None, end: Optional[str] = None) -> List[dict]:
+    """Breadth for every date from start to end (inclusive, either open), oldest first. Blocking."""
+    where, params = _range(start, end)
+    if BREADTH_ENABLED:
+        source = f"SELECT * FROM market_breadth WHERE {where}"
+    else:
+        source = AGGREGATE_QUERY.format(where=where)
+    with get_db_connection() as conn:
+        rows = conn.execute(f"SELECT {SERIES_COLUMNS} FROM ({source}) ORDER BY date", params)
+        return [dict(row) for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the market_breadth table")
+    parser.add_argument("--since", default=None, help="First date to rebuild (YYYY-MM-DD); default every date")
+    args = parser.parse_args()
+
+    from database import DATABASE_PATH
+
+    logging.basicConfig(level=logging.INFO)
+    with sqlite3.connect(DATABASE_PATH) as conn:
+        written = refresh_breadth(conn, args.since)
+        conn.commit()
+    logging.info(f"Wrote breadth for {written} dates")
+
+
+if __name__ == "__main__":
+    main()
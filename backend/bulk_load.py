@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Bulk loader for daily OHLCV files.
+
+Streams rows from CSV, JSON or NDJSON files into stock_data_daily over a
+single connection, writing them with executemany in batches and committing
+once per transaction-sized group instead of once per row. Rows are upserted
+on (symbol, date), so re-running a load is safe. Symbol metadata (name,
+type, interval and an optional exchange column) goes to the symbols table.
+
+Usage:
+    python bulk_load.py data/*.csv
+    python bulk_load.py --full-reload --indicators full history/*.csv
+    python bulk_load.py --indicators incremental eod_2025-06-02.json
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import database
+from breadth import refresh_breadth
+from database import bump_data_versions, refresh_prev_close, write_raw_rows
+from indexes import FLAG_INDEXES, sync_indexes
+from resample import refresh_rollups
+
+DEFAULT_BATCH_SIZE = 5000
+DEFAULT_TRANSACTION_SIZE = 100000
+
+# Alternative header names seen in vendor exports
+FIELD_ALIASES = {
+    "code": "symbol",
+    "ticker": "symbol",
+    "adj_close": "adjusted_close",
+    "adjclose": "adjusted_close",
+}
+
+
+@dataclass
+class LoadStats:
+    """Outcome of a bulk load"""
+    rows: int
+    symbols: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+
+def _normalize(record: dict, defaults: dict) -> dict:
+    row = dict(defaults)
+    for key, value in record.items():
+        key = key.strip().lower()
+        row[FIELD_ALIASES.get(key, key)] = value
+    if row.get("adjusted_close") in (None, ""):
+        row["adjusted_close"] = row.get("close")
+    if not row.get("name"):
+        row["name"] = row.get("symbol")
+    row["symbol"] = str(row["symbol"]).upper()
+    return row
+
+
+def iter_file_rows(path: str, symbol: Optional[str] = None, type: str = "stock", interval: str = "1day") -> Iterator[dict]:
+    """
+    Stream rows from a .csv, .json (array of objects) or .ndjson/.jsonl file.
+
+    Headers are matched case-insensitively. When the file has no symbol column
+    the `symbol` argument is used, falling back to the file name up to its
+    first dot (so AAPL.US.csv loads as AAPL). Numeric fields are left as read;
+    SQLite's column affinity stores numeric text as REAL/INTEGER.
+    """
+    stem = os.path.basename(path).split(".")[0]
+    defaults = {"symbol": symbol or stem, "type": type, "interval": interval}
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, "r", newline="") as f:
+        if ext == ".csv":
+            records: Iterable[dict] = csv.DictReader(f)
+        elif ext in (".ndjson", ".jsonl"):
+            records = (json.loads(line) for line in f if line.strip())
+        elif ext == ".json":
+            records = json.load(f)
+        else:
+            raise ValueError(f"Unsupported file type: {path}")
+        for record in records:
+            yield _normalize(record, defaults)
+
+
+def _secondary_indexes(conn: sqlite3.Connection) -> List[tuple]:
+    return conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = 'stock_data_daily' AND sql IS NOT NULL"
+    ).fetchall()
+
+
+def bulk_load(
+    rows: Iterable[dict],
+    db_path: Optional[str] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    transaction_size: int = DEFAULT_TRANSACTION_SIZE,
+    full_reload: bool = False,
+    indicators: str = "none",
+) -> LoadStats:
+    """
+    Upsert raw OHLCV rows into stock_data_daily.
+
+    batch_size        rows per executemany call
+    transaction_size  rows per commit
+    full_reload       drop the secondary indexes for the load and rebuild them once at the end
+    indicators        "none" only refreshes prev_close, "full" recomputes every derived
+                      column for the loaded symbols, "incremental" advances saved
+                      indicator state with each new bar (see incremental.write_latest)
+    """
+    if indicators not in ("none", "full", "incremental"):
+        raise ValueError("indicators must be 'none', 'full' or 'incremental'")
+    started = time.perf_counter()
+    earliest: Dict[str, str] = {}
+    dates = set()
+    count = 0
+
+    conn = sqlite3.connect(db_path or database.DATABASE_PATH)
+    try:
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        dropped = []
+        if full_reload:
+            dropped = _secondary_indexes(conn)
+            for name, _ in dropped:
+                conn.execute(f"DROP INDEX {name}")
+            conn.commit()
+
+        batch: List[dict] = []
+        pending = 0
+        # Symbols the incremental update could not advance, recomputed after the load
+        rebuild = set()
+
+        def flush():
+            nonlocal pending
+            if indicators == "incremental":
+                from incremental import write_latest
+                rebuild.update(write_latest(conn, batch)[1])
+            else:
+                write_raw_rows(conn, batch)
+            pending += len(batch)
+            if pending >= transaction_size:
+                conn.commit()
+                pending = 0
+            batch.clear()
+
+        for row in rows:
+            batch.append(row)
+            symbol, date = row["symbol"], row["date"]
+            if symbol not in earliest or date < earliest[symbol]:
+                earliest[symbol] = date
+            dates.add(date)
+            count += 1
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+        conn.commit()
+
+        # Flag indexes only cover rows with a flag set, so they are rebuilt
+        # after the indicators instead of being maintained while they are written
+        for name, sql in dropped:
+            if name not in FLAG_INDEXES:
+                logging.info(f"Rebuilding index {name}")
+                conn.execute(sql)
+        conn.commit()
+
+        if indicators != "incremental":
+            if full_reload:
+                refresh_rollups(conn)
+            else:
+                for symbol, since in earliest.items():
+                    refresh_rollups(conn, symbol, since)
+            conn.commit()
+
+        if indicators == "full":
+            from indicators import recompute_indicators
+            recompute_indicators(conn, sorted(earliest))
+        elif indicators == "incremental":
+            if dates:
+                from rs_rank import refresh_rs_ranks
+                refresh_rs_ranks(conn, min(dates))
+                refresh_breadth(conn, min(dates))
+                conn.commit()
+            if rebuild:
+                from indicators import recompute_indicators
+                logging.info(f"Recomputing full history for {len(rebuild)} symbols without usable state")
+                recompute_indicators(conn, sorted(rebuild))
+        elif indicators == "none":
+            if full_reload:
+                refresh_prev_close(conn)
+            else:
+                for symbol, since in earliest.items():
+                    refresh_prev_close(conn, symbol, since)
+            if dates:
+                refresh_breadth(conn, None if full_reload else min(dates))
+            conn.commit()
+
+        # Bumped only once everything derived from the rows (prev_close,
+        # rollups, ranks, breadth) is written, so no response is cached
+        # under the new versions while any of it is stale
+        bump_data_versions(conn, dates)
+        conn.commit()
+
+        if full_reload:
+            logging.info("Rebuilding screener flag indexes")
+            sync_indexes(conn)
+            conn.commit()
+    finally:
+        conn.close()
+
+    return LoadStats(rows=count, symbols=len(earliest), seconds=time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk load daily OHLCV files into stock_data_daily")
+    parser.add_argument("files", nargs="+", help="CSV, JSON or NDJSON files")
+    parser.add_argument("--db", default=None, help="Database path (defaults to DATABASE_PATH)")
+    parser.add_argument("--symbol", default=None, help="Symbol for files without a symbol column")
+    parser.add_argument("--type", default="stock", help="Value for the type column when absent")
+    parser.add_argument("--interval", default="1day", help="Value for the interval column when absent")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Rows per executemany batch")
+    parser.add_argument("--transaction-size", type=int, default=DEFAULT_TRANSACTION_SIZE, help="Rows per commit")
+    parser.add_argument("--full-reload", action="store_true", help="Defer index maintenance until the load finishes")
+    parser.add_argument("--indicators", choices=("none", "full", "incremental"), default="none",
+                        help="How to fill the derived indicator columns after loading")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.db:
+        database.DATABASE_PATH = args.db
+    database.init_database()
+
+    def rows():
+        for path in args.files:
+            logging.info(f"Loading {path}")
+            yield from iter_file_rows(path, args.symbol, args.type, args.interval)
+
+    stats = bulk_load(
+        rows(),
+        batch_size=args.batch_size,
+        transaction_size=args.transaction_size,
+        full_reload=args.full_reload,
+        indicators=args.indicators,
+    )
+    print(f"Loaded {stats.rows} rows for {stats.symbols} symbols in {stats.seconds:.2f}s "
+          f"({stats.rows_per_second:,.0f} rows/sec)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+In-process result cache for date-keyed screener endpoints.
+
+Entries are keyed by endpoint + normalized query parameters and remember the
+data version of their trading date (see database.get_data_version). Any write
+to that date bumps the version, so the next lookup discards the stale entry
+instead of serving it. Entries also expire after a TTL, and the cache evicts
+least recently used entries to stay within both an entry count and an
+approximate memory budget.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, List, Optional, Tuple
+
+from database import execute_query_async, get_data_version, run_in_db_thread
+
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "1024"))
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "86400"))
+
+
+def estimate_size(value: Any) -> int:
+    """Rough memory footprint of a query result (list of flat dicts), sampling the first row"""
+    if isinstance(value, list):
+        if not value:
+            return sys.getsizeof(value)
+        first = value[0]
+        row = sys.getsizeof(first)
+        if isinstance(first, dict):
+            row += sum(sys.getsizeof(v) for v in first.values())
+        return sys.getsizeof(value) + row * len(value)
+    return sys.getsizeof(value)
+
+
+class ResultCache:
+    """Thread-safe LRU + TTL cache whose entries are tied to a data version"""
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int, float, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _drop(self, key: Hashable):
+        _, _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def get(self, key: Hashable, version: int) -> Tuple[bool, Any]:
+        """Return (found, value); entries for an older data version or past their TTL count as misses"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, entry_version, expires, _ = entry
+                if entry_version == version and expires > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                self._drop(key)
+                self.invalidations += 1
+            self.misses += 1
+            return False, None
+
+    def put(self, key: Hashable, value: Any, version: int):
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, version, time.monotonic() + self.ttl, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+result_cache = ResultCache(RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_MAX_BYTES, RESULT_CACHE_TTL)
+
+
+async def cached_query(endpoint: str, date: str, query: str, params: tuple, **key_params: Optional[Any]) -> List[dict]:
+    """
+    Run a screener query for one trading date through the result cache.
+
+    `key_params` are the endpoint's own request parameters (period, direction,
+    limit, ...) and together with the endpoint name and date form the key.
+    The data version is read before the query runs, so a write that lands
+    while it runs leaves the entry already stale rather than wrongly fresh.
+    """
+    key = (endpoint, date, tuple(sorted(key_params.items())))
+    version = await run_in_db_thread(get_data_version, date)
+    found, rows = result_cache.get(key, version)
+    if found:
+        return rows
+    rows = await execute_query_async(query, params)
+    result_cache.put(key, rows, version)
+    return rows
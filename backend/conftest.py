@@ -0,0 +1,84 @@
+"""
+Shared test fixtures: synthetic daily bars and an isolated database per test.
+
+A test module can set SYMBOLS and BARS to choose the universe `loaded_db`
+and `client` load; the default is six symbols (SPY first, as the RS
+benchmark) of 300 daily bars from 2020-01-01.
+"""
+
+import random
+from datetime import date, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+import database
+import latest_session
+from bulk_load import bulk_load
+from cache import result_cache
+from main import app
+
+SYMBOLS = ("SPY", "AAA", "BBB", "CCC", "DDD", "EEE")
+BARS = 300
+
+
+def make_rows(symbol, bars, seed, start=date(2020, 1, 1)):
+    """A random walk of daily OHLCV rows (bulk_load shape), one per calendar day"""
+    rng = random.Random(seed)
+    close = 100.0
+    rows = []
+    for i in range(bars):
+        open_ = close * (1 + rng.gauss(0, 0.01))
+        close = open_ * (1 + rng.gauss(0, 0.02))
+        rows.append({
+            "symbol": symbol, "name": symbol, "type": "stock", "interval": "1day",
+            "date": (start + timedelta(days=i)).isoformat(),
+            "open": open_, "close": close, "adjusted_close": close,
+            "high": max(open_, close) * (1 + abs(rng.gauss(0, 0.01))),
+            "low": min(open_, close) * (1 - abs(rng.gauss(0, 0.01))),
+            "volume": rng.randint(1000, 9000),
+        })
+    return rows
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    """An empty database path the app and every helper use, with fresh in-memory caches"""
+    path = str(tmp_path / "stocks.sqlite")
+    monkeypatch.setattr(database, "DATABASE_PATH", path)
+    monkeypatch.setattr(latest_session, "latest_sessions", latest_session.LatestSessions(2))
+    result_cache.clear()
+    yield path
+    result_cache.clear()
+
+
+@pytest.fixture
+def loaded_db(db_path, request):
+    """The database with the module's universe loaded and its indicators computed"""
+    symbols = getattr(request.module, "SYMBOLS", SYMBOLS)
+    bars = getattr(request.module, "BARS", BARS)
+    database.init_database()
+    rows = []
+    for seed, symbol in enumerate(symbols):
+        rows += make_rows(symbol, bars, seed=seed)
+    bulk_load(rows, indicators="full")
+    return db_path
+
+
+@pytest.fixture
+def client(loaded_db):
+    """The app on `loaded_db`"""
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def replay_path(tmp_path, monkeypatch):
+    """Path of a recorded trade file the app's realtime hub replays as fast as it can"""
+    import realtime
+
+    path = tmp_path / "trades.jsonl"
+    monkeypatch.setattr(realtime, "REALTIME_FEED", str(path))
+    monkeypatch.setattr(realtime, "REALTIME_REPLAY_SPEED", 0.0)
+    monkeypatch.setattr(realtime, "REALTIME_INTERVAL", 0.005)
+    return path
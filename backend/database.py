@@ -1,12 +1,30 @@
+import asyncio
 import sqlite3
 import logging
 import os
-from typing import List
+import queue
+import threading
+import time
+from typing import AsyncIterator, Iterable, Iterator, List, Optional
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
+from indexes import sync_indexes
+from migrations import SCHEMA_VERSION, run_migrations
 
 # Database configuration - can be overridden by environment variable
 DATABASE_PATH = os.getenv("DATABASE_PATH", "stockdb.sqlite")
 
+# Connection pool configuration
+DATABASE_POOL_SIZE = int(os.getenv("DATABASE_POOL_SIZE", "8"))
+DATABASE_POOL_TIMEOUT = float(os.getenv("DATABASE_POOL_TIMEOUT", "30"))
+DATABASE_MMAP_SIZE = int(os.getenv("DATABASE_MMAP_SIZE", str(256 * 1024 * 1024)))
+# Negative values are KiB, positive values are pages (SQLite's cache_size convention)
+DATABASE_CACHE_SIZE = int(os.getenv("DATABASE_CACHE_SIZE", "-65536"))
+# Maximum number of queries running at once for the async API; further queries queue
+DATABASE_MAX_CONCURRENCY = int(os.getenv("DATABASE_MAX_CONCURRENCY", str(DATABASE_POOL_SIZE)))
+# Rows fetched per step when streaming a query result
+DATABASE_STREAM_BATCH_SIZE = int(os.getenv("DATABASE_STREAM_BATCH_SIZE", "2000"))
+
 def init_database():
     """Initialize the database with the schema from stockdb.sql"""
     try:
@@ -21,31 +39,294 @@ def init_database():
                     schema_sql = f.read()
 
                 conn.executescript(schema_sql)
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
                 conn.commit()
                 logging.info("Database schema created successfully")
             else:
-                logging.info("Database schema already exists - skipping initialization")
+                logging.info("Database schema already exists - checking for pending migrations")
+                run_migrations(conn)
+
+            built = sync_indexes(conn)
+            conn.commit()
+            if built:
+                logging.info(f"Built screener indexes: {', '.join(built)}")
 
     except Exception as e:
         logging.error(f"Error initializing database: {e}")
         raise
 
+def _connect(path: str, read_only: bool) -> sqlite3.Connection:
+    """Open a long-lived connection with the per-connection PRAGMA tuning applied"""
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.row_factory = sqlite3.Row  # This allows dict-like access to rows
+    conn.execute(f"PRAGMA mmap_size = {DATABASE_MMAP_SIZE}")
+    conn.execute(f"PRAGMA cache_size = {DATABASE_CACHE_SIZE}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    if read_only:
+        conn.execute("PRAGMA query_only = ON")
+    else:
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+    return conn
+
+class ConnectionPool:
+    """
+    Bounded pool of long-lived read-only connections plus one writer connection.
+
+    Readers are created lazily up to `size` and handed out LIFO so the most
+    recently used connection, with the warmest page cache, is reused first.
+    SQLite allows a single writer at a time, so writes share one dedicated
+    connection behind a lock.
+    """
+
+    def __init__(self, path: str, size: int, timeout: float):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._writer: Optional[sqlite3.Connection] = None
+        self._writer_lock = threading.Lock()
+        self._closed = False
+        self._created = 0
+        self._checked_out = 0
+        self._acquires = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._wait_time = 0.0
+        self._max_wait = 0.0
+        self._writer_waits = 0
+        self._writer_wait_time = 0.0
+
+    def _record_wait(self, waited: float):
+        with self._lock:
+            self._waits += 1
+            self._wait_time += waited
+            self._max_wait = max(self._max_wait, waited)
+
+    def acquire(self) -> sqlite3.Connection:
+        with self._lock:
+            self._acquires += 1
+            create = self._idle.empty() and self._created < self.size
+            if create:
+                self._created += 1
+        if create:
+            try:
+                conn = _connect(self.path, read_only=True)
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        else:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                started = time.perf_counter()
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    with self._lock:
+                        self._timeouts += 1
+                    raise TimeoutError(f"No database connection available after {self.timeout}s")
+                finally:
+                    self._record_wait(time.perf_counter() - started)
+        with self._lock:
+            self._checked_out += 1
+        return conn
+
+    def release(self, conn: sqlite3.Connection):
+        with self._lock:
+            self._checked_out -= 1
+            closed = self._closed
+        if conn.in_transaction:
+            conn.rollback()
+        if closed:
+            conn.close()
+        else:
+            self._idle.put(conn)
+
+    @contextmanager
+    def writer(self):
+        """Exclusive access to the writer connection"""
+        started = time.perf_counter()
+        acquired = self._writer_lock.acquire(blocking=False)
+        if not acquired:
+            self._writer_lock.acquire()
+            with self._lock:
+                self._writer_waits += 1
+                self._writer_wait_time += time.perf_counter() - started
+        try:
+            if self._writer is None:
+                self._writer = _connect(self.path, read_only=False)
+            yield self._writer
+        finally:
+            self._writer_lock.release()
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._writer_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "path": self.path,
+                "size": self.size,
+                "open": self._created,
+                "idle": self._idle.qsize(),
+                "checked_out": self._checked_out,
+                "acquires": self._acquires,
+                "waits": self._waits,
+                "timeouts": self._timeouts,
+                "wait_time_total": round(self._wait_time, 6),
+                "wait_time_max": round(self._max_wait, 6),
+                "writer_waits": self._writer_waits,
+                "writer_wait_time_total": round(self._writer_wait_time, 6),
+            }
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> ConnectionPool:
+    """Return the process-wide pool, (re)creating it if DATABASE_PATH changed"""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.path != DATABASE_PATH:
+            if _pool is not None:
+                _pool.close()
+            _pool = ConnectionPool(DATABASE_PATH, DATABASE_POOL_SIZE, DATABASE_POOL_TIMEOUT)
+        return _pool
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _pool_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=DATABASE_MAX_CONCURRENCY, thread_name_prefix="sqlite")
+        return _executor
+
+async def run_in_db_thread(func, *args):
+    """Run a blocking database call on the bounded query executor without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), func, *args)
+
+def close_pool():
+    """Close every pooled connection and stop the query executor (application shutdown)"""
+    global _pool, _executor
+    with _pool_lock:
+        executor, _executor = _executor, None
+    # In-flight queries still need the pool, so drain them before closing it
+    if executor is not None:
+        executor.shutdown(wait=True)
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+    _data_versions.close()
+
+class VersionSnapshot:
+    """data_versions as loaded at one point in time"""
+
+    def __init__(self, rows: list):
+        self.versions = {date: version for date, version, _ in rows}
+        self.updated_at = {date: updated for date, _, updated in rows if updated is not None}
+        self.latest_date = max(self.versions) if self.versions else None
+        # Changes whenever any date is written; versions only ever increase
+        self.generation = sum(self.versions.values())
+        self.last_modified = max(self.updated_at.values()) if self.updated_at else None
+
+class DataVersions:
+    """
+    In-process copy of the data_versions table.
+
+    The table is only re-read when PRAGMA data_version reports that another
+    connection committed since the last check, so a lookup normally costs one
+    PRAGMA on a dedicated read-only connection.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._path: Optional[str] = None
+        self._seen = None
+        self._snapshot = VersionSnapshot([])
+
+    def snapshot(self) -> VersionSnapshot:
+        with self._lock:
+            if self._conn is None or self._path != DATABASE_PATH:
+                if self._conn is not None:
+                    self._conn.close()
+                self._conn = _connect(DATABASE_PATH, read_only=True)
+                self._path = DATABASE_PATH
+                self._seen = None
+            current = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if current != self._seen:
+                rows = self._conn.execute("SELECT date, version, updated_at FROM data_versions").fetchall()
+                self._snapshot = VersionSnapshot(rows)
+                self._seen = current
+            return self._snapshot
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+_data_versions = DataVersions()
+
+def get_data_versions() -> VersionSnapshot:
+    """Current per-date versions, latest loaded date and overall generation"""
+    return _data_versions.snapshot()
+
+def get_data_version(date: str) -> int:
+    """Change counter for one trading date; 0 if nothing was ever written for it"""
+    return _data_versions.snapshot().versions.get(date, 0)
+
+def bump_data_versions(conn: sqlite3.Connection, dates: Iterable[str]):
+    """Record that rows for these dates were written. Does not commit."""
+    now = time.time()
+    conn.executemany(
+        "INSERT INTO data_versions (date, version, updated_at) VALUES (?, 1, ?) "
+        "ON CONFLICT(date) DO UPDATE SET version = version + 1, updated_at = excluded.updated_at",
+        [(date, now) for date in set(dates)],
+    )
+
+def get_pool_stats() -> dict:
+    """Checkout, wait and timeout counters for sizing the pool under load"""
+    return get_pool().stats()
+
 @contextmanager
 def get_db_connection():
-    """Context manager for database connections"""
-    conn = None
+    """Context manager for pooled read-only database connections"""
+    pool = get_pool()
+    conn = pool.acquire()
     try:
-        conn = sqlite3.connect(DATABASE_PATH)
-        conn.row_factory = sqlite3.Row  # This allows dict-like access to rows
         yield conn
     except Exception as e:
-        if conn:
-            conn.rollback()
         logging.error(f"Database error: {e}")
         raise
     finally:
-        if conn:
-            conn.close()
+        pool.release(conn)
+
+@contextmanager
+def get_write_connection():
+    """Context manager for the single writer connection; rolls back on error"""
+    with get_pool().writer() as conn:
+        try:
+            yield conn
+        except Exception as e:
+            conn.rollback()
+            logging.error(f"Database error: {e}")
+            raise
 
 def execute_query(query: str, params: tuple = ()) -> List[dict]:
     """Execute a SELECT query and return results as list of dictionaries"""
@@ -54,16 +335,216 @@ def execute_query(query: str, params: tuple = ()) -> List[dict]:
         rows = cursor.fetchall()
         return [dict(row) for row in rows]
 
+async def execute_query_async(query: str, params: tuple = ()) -> List[dict]:
+    """Non-blocking execute_query for async routes; runs on the bounded query executor"""
+    return await run_in_db_thread(execute_query, query, params)
+
+class QueryStream:
+    """
+    A SELECT read incrementally from a pooled connection with fetchmany.
+
+    The connection stays checked out until the result is exhausted or
+    close() is called. fetch() and close() are serialized, so a stream can be
+    advanced on one executor thread and closed from another.
+    """
+
+    def __init__(self, query: str, params: tuple = (), batch_size: int = DATABASE_STREAM_BATCH_SIZE):
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._pool = get_pool()
+        self._conn: Optional[sqlite3.Connection] = self._pool.acquire()
+        try:
+            self._cursor = self._conn.execute(query, params)
+        except Exception as e:
+            self._pool.release(self._conn)
+            self._conn = None
+            logging.error(f"Database error: {e}")
+            raise
+
+    def fetch(self) -> List[dict]:
+        """Next batch of rows as dictionaries; empty once the result is exhausted"""
+        with self._lock:
+            if self._conn is None:
+                return []
+            rows = self._cursor.fetchmany(self.batch_size)
+            if not rows:
+                self._close()
+            return [dict(row) for row in rows]
+
+    def _close(self):
+        if self._conn is not None:
+            self._cursor.close()
+            self._pool.release(self._conn)
+            self._conn = None
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+def iter_query(query: str, params: tuple = (), batch_size: int = DATABASE_STREAM_BATCH_SIZE) -> Iterator[dict]:
+    """Execute a SELECT query and yield rows as dictionaries without materializing the result"""
+    stream = QueryStream(query, params, batch_size)
+    try:
+        while True:
+            rows = stream.fetch()
+            if not rows:
+                return
+            yield from rows
+    finally:
+        stream.close()
+
+async def stream_query_async(query: str, params: tuple = (),
+                             batch_size: int = DATABASE_STREAM_BATCH_SIZE) -> AsyncIterator[List[dict]]:
+    """
+    Yield a query's rows in batches for streaming responses. Each fetch runs on
+    the bounded query executor, so memory stays at one batch however large the
+    result, and the first rows are available as soon as SQLite produces them.
+    """
+    stream = await run_in_db_thread(QueryStream, query, params, batch_size)
+    try:
+        while True:
+            rows = await run_in_db_thread(stream.fetch)
+            if not rows:
+                return
+            yield rows
+    finally:
+        # Runs on disconnect too; queued behind any fetch still in flight
+        try:
+            _get_executor().submit(stream.close)
+        except RuntimeError:
+            stream.close()
+
 def execute_insert(query: str, params: tuple = ()) -> int:
     """Execute an INSERT query and return the last row id"""
-    with get_db_connection() as conn:
+    with get_write_connection() as conn:
         cursor = conn.execute(query, params)
         conn.commit()
         return cursor.lastrowid
 
 def execute_update(query: str, params: tuple = ()) -> int:
     """Execute an UPDATE/DELETE query and return affected rows count"""
-    with get_db_connection() as conn:
+    with get_write_connection() as conn:
         cursor = conn.execute(query, params)
         conn.commit()
         return cursor.rowcount
+
+# Columns supplied by the data feed; everything else in stock_data_daily is derived
+RAW_COLUMNS = (
+    "symbol", "name", "type", "interval", "date",
+    "open", "high", "low", "close", "adjusted_close", "volume",
+)
+# Feed columns stored once per symbol in the symbols dimension table
+SYMBOL_COLUMNS = ("symbol", "name", "type", "interval")
+# Feed columns stored per bar in stock_data_daily, keyed by symbol_id
+BAR_COLUMNS = ("date", "open", "high", "low", "close", "adjusted_close", "volume")
+
+# Resolves a symbol parameter to its integer key; SQLite evaluates it once per statement
+SYMBOL_ID = "(SELECT symbol_id FROM symbols WHERE symbol = ?)"
+
+# Metadata of a feed row; an exchange is only overwritten when the feed supplies one
+UPSERT_SYMBOL_QUERY = """
+INSERT INTO symbols (symbol, name, type, interval, exchange)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT(symbol) DO UPDATE SET
+name = excluded.name, type = excluded.type, interval = excluded.interval,
+exchange = COALESCE(excluded.exchange, symbols.exchange)
+"""
+
+def upsert_bars_query(columns: Iterable[str]) -> str:
+    """
+    Upsert of the given stock_data_daily columns (which must start with date).
+    Parameters are the symbol followed by `columns`; other columns of an
+    existing row are left untouched.
+    """
+    columns = list(columns)
+    return f"""
+    INSERT INTO stock_data_daily (symbol_id, {", ".join(columns)})
+    VALUES ({SYMBOL_ID}, {", ".join("?" for _ in columns)})
+    ON CONFLICT(symbol_id, date) DO UPDATE SET
+    {", ".join(f"{col} = excluded.{col}" for col in columns if col != "date")}
+    """
+
+# Upsert of the raw columns that leaves an existing row's derived columns untouched
+UPSERT_RAW_QUERY = upsert_bars_query(BAR_COLUMNS)
+
+def upsert_symbols(conn: sqlite3.Connection, rows: Iterable[dict]):
+    """Insert or refresh the symbols rows for feed rows (the last row per symbol wins). Does not commit."""
+    latest = {row["symbol"]: row for row in rows}
+    conn.executemany(UPSERT_SYMBOL_QUERY, [
+        tuple(row[col] for col in SYMBOL_COLUMNS) + (row.get("exchange"),) for row in latest.values()
+    ])
+
+def write_raw_rows(conn: sqlite3.Connection, rows: List[dict]):
+    """Upsert feed rows: their symbols metadata, then their bars. Does not commit."""
+    upsert_symbols(conn, rows)
+    conn.executemany(UPSERT_RAW_QUERY, [(row["symbol"],) + tuple(row[col] for col in BAR_COLUMNS) for row in rows])
+
+def refresh_prev_close(conn: sqlite3.Connection, symbol: Optional[str] = None, since: Optional[str] = None) -> int:
+    """
+    Recompute prev_close, price_change and percent_change from the prior bar's close.
+
+    With no arguments every row is refreshed (used by the backfill migration).
+    With a symbol (and optionally a date) only that symbol's rows from `since`
+    onwards are touched; the window is started at the bar before `since` so the
+    first refreshed row still sees its predecessor. Does not commit.
+    """
+    where = ""
+    params: list = []
+    if symbol is not None:
+        where = f"WHERE symbol_id = {SYMBOL_ID}"
+        params.append(symbol)
+        if since is not None:
+            where += f""" AND date >= COALESCE(
+                (SELECT MAX(date) FROM stock_data_daily WHERE symbol_id = {SYMBOL_ID} AND date < ?), ?)"""
+            params.extend([symbol, since, since])
+    query = f"""
+    UPDATE stock_data_daily AS d
+    SET prev_close = p.prev_close,
+        price_change = d.close - p.prev_close,
+        percent_change = CASE
+            WHEN p.prev_close > 0 THEN ((d.close - p.prev_close) / p.prev_close) * 100.0
+            ELSE NULL
+        END
+    FROM (
+        SELECT symbol_id, date, LAG(close) OVER (PARTITION BY symbol_id ORDER BY date) AS prev_close
+        FROM stock_data_daily
+        {where}
+    ) AS p
+    WHERE d.symbol_id = p.symbol_id AND d.date = p.date
+    """
+    if since is not None:
+        query += " AND d.date >= ?"
+        params.append(since)
+    cursor = conn.execute(query, tuple(params))
+    return cursor.rowcount
+
+def upsert_stock_data(rows: Iterable[dict]) -> int:
+    """
+    Insert or update raw OHLCV rows and fill in their previous-close columns
+    and weekly/monthly rollups.
+
+    Existing rows keep their derived indicator columns; only the raw feed
+    columns are overwritten. Returns the number of rows written.
+    """
+    earliest = {}
+    written = set()
+    count = 0
+    rows = list(rows)
+    with get_write_connection() as conn:
+        write_raw_rows(conn, rows)
+        for row in rows:
+            symbol, date = row["symbol"], row["date"]
+            written.add(date)
+            if symbol not in earliest or date < earliest[symbol]:
+                earliest[symbol] = date
+            count += 1
+        from breadth import refresh_breadth
+        from resample import refresh_rollups
+        for symbol, since in earliest.items():
+            refresh_prev_close(conn, symbol, since)
+            refresh_rollups(conn, symbol, since)
+        if written:
+            refresh_breadth(conn, min(written))
+        bump_data_versions(conn, written)
+        conn.commit()
+    return count
@@ -0,0 +1,111 @@
+"""
+Shape-preserving decimation of price series for long chart ranges.
+
+A series of n bars is cut into `points` consecutive buckets: the first and
+last bars keep buckets of their own and the bars in between are split evenly.
+
+- OHLC and volume use min/max buckets: each bucket becomes one bar at its
+  first bar's time with the first open, highest high, lowest low, last close
+  and summed volume, so no price extreme is lost.
+- Line overlays (the EMAs) use Largest-Triangle-Three-Buckets: from each
+  bucket the point forming the largest triangle with its neighbouring
+  buckets is kept, which preserves the visual shape of the line (its turning
+  points) where plain decimation would cut them off.
+
+A line point is picked from anywhere in its bucket, so it does not share the
+time of the bucket's bar. Each line is therefore its own series of
+{time, value} points at the picked bar's own date, plotted on the same time
+axis as the bars.
+
+Everything is computed with whole-array operations (reduceat over the
+buckets and a padded bucket-by-offset matrix for LTTB), so the cost is a
+few milliseconds however long the history.
+"""
+
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+OHLCV_COLUMNS = ("time", "open", "high", "low", "close", "volume")
+LINE_COLUMNS = ("ema_21", "ema_200")
+
+
+def bucket_starts(n: int, points: int) -> np.ndarray:
+    """Index of the first bar of each bucket; first and last bars are buckets of their own"""
+    if points >= n:
+        return np.arange(n)
+    middle = np.floor(np.linspace(1, n - 1, points - 1)).astype(np.int64)[:-1]
+    return np.concatenate(([0], middle, [n - 1]))
+
+
+def lttb(y: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """
+    Pick one index per bucket with Largest-Triangle-Three-Buckets, using the
+    bar index as x (trading bars are evenly spaced). The triangle's left
+    vertex is the previous bucket's average rather than its chosen point,
+    which removes LTTB's sequential dependency so all buckets are scored in
+    one pass over a padded (bucket, offset) matrix. NaN values (EMA warm-up)
+    are never picked while the bucket has a real value.
+    """
+    n, buckets = len(y), len(starts)
+    lengths = np.diff(np.append(starts, n))
+    x = np.arange(n, dtype=np.float64)
+    valid = ~np.isnan(y)
+    filled = np.where(valid, y, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        avg_x = np.add.reduceat(x, starts) / lengths
+        avg_y = np.add.reduceat(filled, starts) / np.add.reduceat(valid.astype(np.float64), starts)
+
+    offsets = np.arange(lengths.max())
+    index = np.minimum(starts[:, None] + offsets, n - 1)
+    inside = offsets < lengths[:, None]
+    # Vertices: previous bucket's average, the candidate, next bucket's average
+    left_x, left_y = np.roll(avg_x, 1)[:, None], np.roll(avg_y, 1)[:, None]
+    right_x, right_y = np.roll(avg_x, -1)[:, None], np.roll(avg_y, -1)[:, None]
+    with np.errstate(invalid="ignore"):
+        area = np.abs((left_x - right_x) * (y[index] - left_y) - (left_x - x[index]) * (right_y - left_y))
+    area[~inside | np.isnan(area)] = -np.inf
+    best = np.argmax(area, axis=1)
+
+    # Buckets without a scorable triangle (missing neighbour average) keep their first real value
+    unscored = np.isneginf(area[np.arange(buckets), best])
+    first_real = np.argmax(valid[index] & inside, axis=1)
+    best = np.where(unscored, first_real, best)
+
+    chosen = starts + best
+    chosen[0], chosen[-1] = 0, n - 1
+    return chosen
+
+
+def downsample_rows(rows: List[dict], points: int, line_columns: Sequence[str] = LINE_COLUMNS) -> dict:
+    """
+    Reduce price-data rows (time, OHLCV and line columns) to at most `points`
+    bars and at most `points` points per line. Returns {"bars": [{time,
+    open, high, low, close, volume}], "lines": {name: [{time, value}]}}; a
+    line leaves out the bars where it has no value. Series of at most
+    `points` bars keep every bar and every line value.
+    """
+    n = len(rows)
+    starts = bucket_starts(n, points)
+    ends = np.append(starts[1:], n) - 1
+
+    def column(name: str) -> np.ndarray:
+        return np.array([row[name] for row in rows], dtype=np.float64)
+
+    times = [row["time"] for row in rows]
+    bars: Dict[str, list] = {
+        "time": [times[i] for i in starts],
+        "open": column("open")[starts].tolist(),
+        "high": np.maximum.reduceat(column("high"), starts).tolist(),
+        "low": np.minimum.reduceat(column("low"), starts).tolist(),
+        "close": column("close")[ends].tolist(),
+        # Rounded before the cast, which would truncate fractional volumes
+        "volume": np.add.reduceat(np.rint(column("volume")).astype(np.int64), starts).tolist(),
+    }
+    lines = {}
+    for name in line_columns:
+        values = column(name)
+        picked = starts if points >= n else lttb(values, starts)
+        lines[name] = [{"time": times[i], "value": value}
+                       for i, value in zip(picked.tolist(), values[picked].tolist()) if value == value]
+    return {"bars": [dict(zip(OHLCV_COLUMNS, values)) for values in zip(*bars.values())], "lines": lines}
@@ -0,0 +1,87 @@
+"""
+HTTP conditional request support (ETag / Last-Modified / Cache-Control).
+
+Validators are derived from the data version (database.get_data_versions),
+not from the response body, so a matching If-None-Match or If-Modified-Since
+is answered with 304 before any SQL runs.
+
+Date-keyed endpoints use the version of their own date. Responses for past
+trading days may be cached by clients for HISTORICAL_MAX_AGE seconds; the
+latest session is marked no-cache so clients always revalidate it (cheaply,
+thanks to the ETag).
+"""
+
+import hashlib
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response
+
+from database import get_data_versions, run_in_db_thread
+
+HISTORICAL_MAX_AGE = int(os.getenv("HTTP_HISTORICAL_MAX_AGE", "86400"))
+
+
+def _etag(parts: tuple) -> str:
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    # If-None-Match uses the weak comparison, so W/ prefixes are ignored
+    candidates = [tag.strip() for tag in header.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def _not_modified_since(header: str, last_modified: float) -> bool:
+    try:
+        since = parsedate_to_datetime(header).timestamp()
+    except (TypeError, ValueError):
+        return False
+    return int(last_modified) <= since
+
+
+async def conditional_response(request: Request, response: Response, endpoint: str,
+                         date: Optional[str] = None, as_of: Optional[str] = None,
+                         **params) -> Optional[Response]:
+    """
+    Set ETag, Last-Modified and Cache-Control for a read endpoint.
+
+    With a `date`, validators follow that date's version; without one they
+    follow the overall data generation (e.g. a symbol's price history), and
+    `as_of` marks such a response historical when it ends before the latest
+    session.
+    Returns a 304 response when the client's copy is current, otherwise None
+    after adding the headers to `response`. The version lookup runs on the
+    query executor, as it may re-read data_versions after a write.
+    """
+    snapshot = await run_in_db_thread(get_data_versions)
+    if date is not None:
+        version = snapshot.versions.get(date, 0)
+        last_modified = snapshot.updated_at.get(date)
+        historical = snapshot.latest_date is not None and date < snapshot.latest_date
+    else:
+        version = (snapshot.latest_date, snapshot.generation)
+        last_modified = snapshot.last_modified
+        historical = as_of is not None and snapshot.latest_date is not None and as_of < snapshot.latest_date
+
+    etag = _etag((endpoint, date, as_of, tuple(sorted(params.items())), version))
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={HISTORICAL_MAX_AGE}" if historical else "no-cache",
+    }
+    if last_modified is not None:
+        headers["Last-Modified"] = formatdate(last_modified, usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_none_match is not None:
+        not_modified = _etag_matches(if_none_match, etag)
+    else:
+        not_modified = (if_modified_since is not None and last_modified is not None
+                        and _not_modified_since(if_modified_since, last_modified))
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,315 @@
+"""
+Incremental, append-only indicator updates.
+
+A full recompute (indicators.recompute_indicators) saves a small state record
+per symbol in the indicator_state table: the last bar, the unblanked
+recursive averages, the current swing levels and signal, and the trailing
+windows needed for rolling highs/lows, average volume and RS highs. Given only
+the newest bar per symbol, update_latest advances that state and writes the
+single new row, so the end-of-day update costs O(symbols) instead of
+O(symbols x history). Results match a full recompute of the same history.
+"""
+
+import logging
+import math
+import sqlite3
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from indicators import (
+    ATR_PERIOD, AVG_VOLUME_PERIOD, BENCHMARK_SYMBOL, DERIVED_COLUMNS, DOJI_BODY_RATIO,
+    EMA_PERIODS, HIGH_LOW_PERIODS, RS_HIGH_PERIOD, RSI_PERIOD,
+    SIGNAL_FAST, SIGNAL_SLOW, SMOOTHED_SERIES, SWING_STRENGTH, Panel,
+    recompute_indicators,
+)
+from breadth import refresh_breadth
+from database import BAR_COLUMNS, SYMBOL_ID, bump_data_versions, upsert_bars_query, upsert_symbols
+from resample import refresh_rollups
+from rs_rank import refresh_rs_ranks
+
+NAN = float("nan")
+HIGH_LOW_WINDOW = max(max(HIGH_LOW_PERIODS), 2 * SWING_STRENGTH + 1)
+
+STATE_COLUMNS = (
+    "symbol", "date", "bars", "close", "high", "low",
+    *SMOOTHED_SERIES, "swing_high", "swing_low", "signal",
+    "highs", "lows", "volumes", "rs_values",
+)
+WINDOW_COLUMNS = ("highs", "lows", "volumes", "rs_values")
+
+
+@dataclass
+class IndicatorState:
+    """Everything needed to compute the next bar's indicators for one symbol"""
+    symbol: str
+    date: str
+    bars: int
+    close: float
+    high: float
+    low: float
+    ema_10: float
+    ema_21: float
+    ema_50: float
+    ema_200: float
+    avg_gain: float
+    avg_loss: float
+    atr: float
+    swing_high: float
+    swing_low: float
+    signal: Optional[int]
+    highs: np.ndarray
+    lows: np.ndarray
+    volumes: np.ndarray
+    rs_values: np.ndarray
+
+
+def _nullable(value):
+    return None if value is None or value != value else value
+
+
+def _real(value) -> float:
+    return NAN if value is None else float(value)
+
+
+def states_from_panel(panel: Panel, derived: Dict[str, np.ndarray]) -> List[IndicatorState]:
+    """Build the end-of-history state of every symbol in a computed panel"""
+    p = panel.prices
+    smoothed = derived["_smoothed"]
+    states = []
+    for j, symbol in enumerate(panel.symbols):
+        last = int(panel.counts[j]) - 1
+        signal = derived["signal"][last, j]
+        averages = {name: float(smoothed[i, last, j]) for i, name in enumerate(SMOOTHED_SERIES)}
+        states.append(IndicatorState(
+            symbol=symbol,
+            date=panel.dates[last, j],
+            bars=last + 1,
+            close=float(p["close"][last, j]),
+            high=float(p["high"][last, j]),
+            low=float(p["low"][last, j]),
+            swing_high=float(derived["swing_high"][last, j]),
+            swing_low=float(derived["swing_low"][last, j]),
+            signal=None if np.isnan(signal) else int(signal),
+            highs=p["high"][max(0, last + 1 - HIGH_LOW_WINDOW):last + 1, j].copy(),
+            lows=p["low"][max(0, last + 1 - HIGH_LOW_WINDOW):last + 1, j].copy(),
+            volumes=p["volume"][max(0, last + 1 - AVG_VOLUME_PERIOD):last + 1, j].copy(),
+            rs_values=derived["rs"][max(0, last + 1 - RS_HIGH_PERIOD):last + 1, j].copy(),
+            **averages,
+        ))
+    return states
+
+
+def save_states(conn: sqlite3.Connection, states: Iterable[IndicatorState]):
+    """Insert or replace state records. Does not commit."""
+    placeholders = ", ".join("?" for _ in STATE_COLUMNS)
+    query = f"INSERT OR REPLACE INTO indicator_state ({', '.join(STATE_COLUMNS)}) VALUES ({placeholders})"
+    rows = []
+    for state in states:
+        values = []
+        for col in STATE_COLUMNS:
+            value = getattr(state, col)
+            if col in WINDOW_COLUMNS:
+                value = value.astype(np.float64).tobytes()
+            elif isinstance(value, float):
+                value = _nullable(value)
+            values.append(value)
+        rows.append(values)
+    conn.executemany(query, rows)
+
+
+def load_states(conn: sqlite3.Connection, symbols: List[str]) -> Dict[str, IndicatorState]:
+    """Load saved state records for the given symbols"""
+    states = {}
+    for start in range(0, len(symbols), 500):
+        chunk = symbols[start:start + 500]
+        cursor = conn.execute(
+            f"SELECT {', '.join(STATE_COLUMNS)} FROM indicator_state WHERE symbol IN ({', '.join('?' for _ in chunk)})",
+            chunk,
+        )
+        for row in cursor:
+            values = dict(zip(STATE_COLUMNS, row))
+            for col in WINDOW_COLUMNS:
+                values[col] = np.frombuffer(values[col], dtype=np.float64)
+            for col in SMOOTHED_SERIES + ("swing_high", "swing_low"):
+                values[col] = _real(values[col])
+            states[values["symbol"]] = IndicatorState(**values)
+    return states
+
+
+def _window(values: np.ndarray, value: float, size: int) -> np.ndarray:
+    return np.append(values[-(size - 1):] if size > 1 else values[:0], value)
+
+
+def _smooth(state: float, value: float, alpha: float) -> float:
+    # Same update as indicators._ewm so incremental and full results agree bit for bit
+    if math.isnan(state):
+        return value
+    return state + alpha * (value - state)
+
+
+def advance(state: IndicatorState, bar: dict, benchmark_close: Optional[float]) -> dict:
+    """Fold one new bar into `state` (in place) and return its derived columns"""
+    t = state.bars
+    open_, high, low, close = (float(bar[f]) for f in ("open", "high", "low", "close"))
+    prev_close, prev_high, prev_low = state.close, state.high, state.low
+    row = {}
+
+    row["prev_close"] = prev_close
+    row["price_change"] = close - prev_close
+    row["percent_change"] = (close - prev_close) / prev_close * 100.0 if prev_close > 0 else None
+
+    delta = close - prev_close
+    true_range = max(high - low, abs(high - prev_close), abs(low - prev_close))
+    for n in EMA_PERIODS:
+        name = f"ema_{n}"
+        value = _smooth(getattr(state, name), close, 2.0 / (n + 1))
+        setattr(state, name, value)
+        row[name] = value if t >= n - 1 else None
+    state.avg_gain = _smooth(state.avg_gain, max(delta, 0.0), 1.0 / RSI_PERIOD)
+    state.avg_loss = _smooth(state.avg_loss, max(-delta, 0.0), 1.0 / RSI_PERIOD)
+    state.atr = _smooth(state.atr, true_range, 1.0 / ATR_PERIOD)
+    if state.avg_loss > 0:
+        rsi = 100.0 - 100.0 / (1.0 + state.avg_gain / state.avg_loss)
+    else:
+        rsi = 100.0 if state.avg_gain > 0 else 50.0
+    row["rsi_14"] = rsi if t >= RSI_PERIOD else None
+    row["atr"] = state.atr if t >= ATR_PERIOD - 1 else None
+
+    state.highs = _window(state.highs, high, HIGH_LOW_WINDOW)
+    state.lows = _window(state.lows, low, HIGH_LOW_WINDOW)
+    state.volumes = _window(state.volumes, float(bar["volume"]), AVG_VOLUME_PERIOD)
+    row["avg_volume"] = float(state.volumes.mean()) if t >= AVG_VOLUME_PERIOD - 1 else None
+    for n in HIGH_LOW_PERIODS:
+        row[f"is_high_{n}"] = int(t >= n - 1 and high >= state.highs[-n:].max())
+        row[f"is_low_{n}"] = int(t >= n - 1 and low <= state.lows[-n:].min())
+
+    # A pivot two bars back is confirmed once the bars after it are known
+    k = SWING_STRENGTH
+    pivots = {"swing_high": None, "swing_low": None}
+    if t >= 2 * k:
+        highs, lows = state.highs[-(2 * k + 1):], state.lows[-(2 * k + 1):]
+        if highs[k] > highs[:k].max() and highs[k] > highs[k + 1:].max():
+            pivots["swing_high"] = float(highs[k])
+        if lows[k] < lows[:k].min() and lows[k] < lows[k + 1:].min():
+            pivots["swing_low"] = float(lows[k])
+    for name, pivot in pivots.items():
+        level = getattr(state, name)
+        row[f"is_{name}"] = int(pivot is not None)
+        row[f"{name}_cross_up"] = int(close > level and prev_close <= level)
+        row[f"{name}_cross_down"] = int(close < level and prev_close >= level)
+        if pivot is not None:
+            setattr(state, name, pivot)
+        row[name] = _nullable(getattr(state, name))
+
+    row["is_gap_up"] = int(low > prev_high)
+    row["is_gap_down"] = int(high < prev_low)
+    doji = abs(close - open_) <= DOJI_BODY_RATIO * (high - low)
+    row["is_doji_bar"] = int(doji)
+    row["is_bull_bar"] = int(close > open_ and not doji)
+    row["is_bear_bar"] = int(close < open_ and not doji)
+
+    rs = NAN
+    if benchmark_close is not None and benchmark_close > 0:
+        rs = 100.0 * float(bar["adjusted_close"]) / benchmark_close
+    state.rs_values = _window(state.rs_values, rs, RS_HIGH_PERIOD)
+    row["rs"] = _nullable(rs)
+    rs_high = t >= RS_HIGH_PERIOD - 1 and not math.isnan(rs) and rs >= np.nanmax(state.rs_values)
+    row["is_rs_52_week_high"] = int(rs_high)
+
+    signal = None
+    if row[f"ema_{SIGNAL_FAST}"] is not None and row[f"ema_{SIGNAL_SLOW}"] is not None:
+        signal = 1 if row[f"ema_{SIGNAL_FAST}"] > row[f"ema_{SIGNAL_SLOW}"] else -1
+    changed = signal is not None and state.signal is not None and signal != state.signal
+    row["signal"] = signal
+    row["signal_change"] = int(changed)
+    row["buy_signal"] = int(changed and signal == 1)
+    row["sell_signal"] = int(changed and signal == -1)
+
+    state.date = bar["date"]
+    state.bars = t + 1
+    state.close, state.high, state.low = close, high, low
+    state.signal = signal
+    return row
+
+
+def _benchmark_closes(conn: sqlite3.Connection, bars: List[dict]) -> Dict[str, float]:
+    """Benchmark adjusted close per date, preferring bars in this update"""
+    closes = {b["date"]: float(b["adjusted_close"]) for b in bars if b["symbol"] == BENCHMARK_SYMBOL}
+    missing = sorted({b["date"] for b in bars} - closes.keys())
+    for date in missing:
+        row = conn.execute(
+            f"SELECT adjusted_close FROM stock_data_daily WHERE symbol_id = {SYMBOL_ID} AND date = ?",
+            (BENCHMARK_SYMBOL, date),
+        ).fetchone()
+        if row is not None:
+            closes[date] = row[0]
+    return closes
+
+
+def write_latest(conn: sqlite3.Connection, bars: Iterable) -> Tuple[int, List[str]]:
+    """Write new bars and their indicators by advancing each symbol's saved state.
+
+    `bars` are raw OHLCV rows (StockDataCreate shape), normally the newest bar
+    per symbol. Symbols without saved state, or bars that are not newer than
+    the saved state (history corrections), are written without indicators
+    and returned for a full recompute. Refreshes the rollups and saved states
+    but not rs_rank, breadth or data_versions, and does not commit, so a
+    caller can batch many calls into one transaction. Returns the number of
+    rows written and the symbols to recompute.
+    """
+    bars = sorted(
+        (b.model_dump() if hasattr(b, "model_dump") else dict(b) for b in bars),
+        key=lambda b: (b["symbol"], b["date"]),
+    )
+    if not bars:
+        return 0, []
+    symbols = sorted({b["symbol"] for b in bars})
+    states = load_states(conn, symbols)
+    benchmark = _benchmark_closes(conn, bars)
+
+    columns = BAR_COLUMNS + DERIVED_COLUMNS
+    upsert = upsert_bars_query(columns)
+
+    rows, rebuild = [], set()
+    for bar in bars:
+        symbol = bar["symbol"]
+        state = states.get(symbol)
+        if symbol in rebuild or state is None or bar["date"] <= state.date:
+            rebuild.add(symbol)
+            rows.append({**bar, **{col: None for col in DERIVED_COLUMNS}})
+            continue
+        rows.append({**bar, **advance(state, bar, benchmark.get(bar["date"]))})
+
+    upsert_symbols(conn, rows)
+    conn.executemany(upsert, [(row["symbol"],) + tuple(row[col] for col in columns) for row in rows])
+    earliest: Dict[str, str] = {}
+    for bar in bars:
+        earliest.setdefault(bar["symbol"], bar["date"])
+    for symbol, since in earliest.items():
+        refresh_rollups(conn, symbol, since)
+    save_states(conn, (state for symbol, state in states.items() if symbol not in rebuild))
+    return len(rows), sorted(rebuild)
+
+
+def update_latest(conn: sqlite3.Connection, bars: Iterable) -> int:
+    """Write new bars and their indicators (see write_latest) as one committed update.
+
+    Also refreshes rs_rank and breadth from the earliest new date and bumps
+    data_versions, then recomputes the full history of symbols without
+    usable state. Returns the number of rows written.
+    """
+    bars = [b.model_dump() if hasattr(b, "model_dump") else dict(b) for b in bars]
+    count, rebuild = write_latest(conn, bars)
+    if not count:
+        return 0
+    since = min(bar["date"] for bar in bars)
+    refresh_rs_ranks(conn, since)
+    refresh_breadth(conn, since)
+    bump_data_versions(conn, {bar["date"] for bar in bars})
+    conn.commit()
+    if rebuild:
+        logging.info(f"Recomputing full history for {len(rebuild)} symbols without usable state")
+        recompute_indicators(conn, rebuild)
+    return count
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Partial covering indexes for the flag screeners.
+
+Every flag screener reads one trading date's rows that have a single flag
+set (is_gap_up = 1, swing_low_cross_down = 1, ...) ordered by rs. Each flag
+gets a partial index holding only the flagged rows, keyed (date, rs) and
+carrying the columns the screener projects, so a screener is one index
+range read already in output order: no table lookups and no sort step.
+Partial indexes stay small because only a few rows per date carry a flag.
+
+init_database keeps the indexes in sync with the definitions below; the
+command line rebuilds or drops them, e.g. around a large bulk load.
+
+Usage:
+    python indexes.py            # create missing indexes, recreate changed ones
+    python indexes.py --rebuild  # drop and recreate every flag index
+    python indexes.py --drop     # drop every flag index
+    python indexes.py --list     # show the flag indexes and their row counts
+"""
+
+import argparse
+import logging
+import sqlite3
+from typing import Dict, List
+
+# Flag columns screened with `flag = 1`
+FLAG_COLUMNS = (
+    "is_gap_up", "is_gap_down",
+    "is_high_63", "is_high_252", "is_low_63", "is_low_252",
+    "is_rs_52_week_high",
+    "swing_high_cross_up", "swing_high_cross_down",
+    "swing_low_cross_up", "swing_low_cross_down",
+    "signal_change",
+)
+# Further equality filters of a screener, keyed between date and rs
+FLAG_KEYS = {"signal_change": ("signal",)}
+# Projected by the flag screeners; symbol and type come from symbols via symbol_id
+COVERED_COLUMNS = ("symbol_id", "close", "prev_close", "price_change", "percent_change", "rs_rank")
+
+
+def index_name(flag: str) -> str:
+    return f"stock_data_daily_{flag}"
+
+
+def index_sql(flag: str) -> str:
+    """CREATE INDEX statement for a flag, in the form SQLite stores in sqlite_master"""
+    # The flag itself is carried too: older SQLite versions only treat a partial
+    # index as covering when it holds every column the query mentions
+    columns = ("date",) + FLAG_KEYS.get(flag, ()) + ("rs",) + COVERED_COLUMNS + (flag,)
+    return f"CREATE INDEX {index_name(flag)} ON stock_data_daily ({', '.join(columns)}) WHERE {flag} = 1"
+
+
+FLAG_INDEXES = {index_name(flag): index_sql(flag) for flag in FLAG_COLUMNS}
+
+
+def existing_indexes(conn: sqlite3.Connection) -> Dict[str, str]:
+    """Flag indexes present in the database, by name, with their stored SQL"""
+    rows = conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = 'stock_data_daily'")
+    return {name: sql for name, sql in rows if name in FLAG_INDEXES}
+
+
+def sync_indexes(conn: sqlite3.Connection) -> List[str]:
+    """Create missing flag indexes and recreate those whose definition changed. Does not commit."""
+    existing = existing_indexes(conn)
+    built = []
+    for name, sql in FLAG_INDEXES.items():
+        if existing.get(name) == sql:
+            continue
+        if name in existing:
+            conn.execute(f"DROP INDEX {name}")
+        conn.execute(sql)
+        built.append(name)
+    return built
+
+
+def drop_indexes(conn: sqlite3.Connection) -> List[str]:
+    """Drop every flag index. Does not commit."""
+    dropped = list(existing_indexes(conn))
+    for name in dropped:
+        conn.execute(f"DROP INDEX {name}")
+    return dropped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the partial covering indexes of the flag screeners")
+    action = parser.add_mutually_exclusive_group()
+    action.add_argument("--rebuild", action="store_true", help="Drop and recreate every flag index")
+    action.add_argument("--drop", action="store_true", help="Drop every flag index")
+    action.add_argument("--list", action="store_true", help="List the flag indexes and the rows each holds")
+    args = parser.parse_args()
+
+    from database import DATABASE_PATH
+
+    logging.basicConfig(level=logging.INFO)
+    with sqlite3.connect(DATABASE_PATH) as conn:
+        if args.list:
+            existing = existing_indexes(conn)
+            for flag in FLAG_COLUMNS:
+                name = index_name(flag)
+                if name in existing:
+                    rows = conn.execute(f"SELECT COUNT(*) FROM stock_data_daily INDEXED BY {name} WHERE {flag} = 1")
+                    print(f"{name}: {rows.fetchone()[0]} rows")
+                else:
+                    print(f"{name}: missing")
+            return
+        if args.drop or args.rebuild:
+            dropped = drop_indexes(conn)
+            logging.info(f"Dropped {len(dropped)} index(es)")
+        if not args.drop:
+            built = sync_indexes(conn)
+            logging.info(f"Built {len(built)} index(es)")
+        conn.commit()
+
+
+if __name__ == "__main__":
+    main()
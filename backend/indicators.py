@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+"""
+Vectorized indicator engine for the derived columns of stock_data_daily.
+
+Raw OHLCV rows (the StockDataCreate shape) are grouped per symbol and laid out
+as a bars x symbols matrix where every column starts at that symbol's first
+bar. Every indicator is then computed with whole-array NumPy operations; the
+only Python loop is over bar positions for the recursive averages (EMA, Wilder
+RSI and ATR), each step updating every symbol of the chunk at once.
+
+Indicator definitions:
+    prev_close / price_change / percent_change  prior bar's close and the move from it
+    ema_N           EMA of close, alpha 2/(N+1), seeded with the first close
+    rsi_14 / atr    Wilder smoothing (alpha 1/14), seeded with the first value
+    avg_volume      simple 50-bar average volume
+    is_high_N       the bar's high is the highest high of the last N bars (likewise is_low_N)
+    is_swing_high   the high two bars ago is strictly above the two bars on each side;
+                    flagged on the bar that confirms it, swing_high carries the level forward
+    swing_*_cross_* close crosses the swing level in force on the previous bar
+    is_gap_up/down  the bar's low is above the prior high (high below the prior low)
+    is_doji/bull/bear_bar  body within 10% of the range / close above / below open
+    rs              100 * adjusted_close / benchmark adjusted_close on the same date
+    is_rs_52_week_high  rs is the highest of the last 252 bars
+    signal          1 while ema_10 > ema_21, -1 otherwise; buy/sell_signal and
+                    signal_change mark the bar where it flips
+
+Values that need more history than a symbol has are left NULL; flags are 0.
+
+rs_rank, the percentile of rs across the universe on each date, is
+cross-sectional rather than per-symbol and is computed in rs_rank.py.
+
+Usage:
+    python indicators.py    # recompute every derived column in the database
+"""
+
+import logging
+import sqlite3
+import time
+from operator import itemgetter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from database import SYMBOL_ID, bump_data_versions
+
+BENCHMARK_SYMBOL = "SPY"
+EMA_PERIODS = (10, 21, 50, 200)
+RSI_PERIOD = 14
+ATR_PERIOD = 14
+AVG_VOLUME_PERIOD = 50
+HIGH_LOW_PERIODS = (63, 252)
+SWING_STRENGTH = 2
+RS_HIGH_PERIOD = 252
+DOJI_BODY_RATIO = 0.1
+SIGNAL_FAST = 10
+SIGNAL_SLOW = 21
+
+# Raw columns read from the feed, in the order used by the panel
+PRICE_FIELDS = ("open", "high", "low", "close", "adjusted_close", "volume")
+
+# Derived columns written back to stock_data_daily
+FLOAT_COLUMNS = (
+    "prev_close", "price_change", "percent_change", "avg_volume",
+    "swing_high", "swing_low", "rs", "atr",
+    "ema_10", "ema_21", "ema_50", "ema_200", "rsi_14",
+)
+FLAG_COLUMNS = (
+    "is_swing_high", "swing_high_cross_up", "swing_high_cross_down",
+    "is_swing_low", "swing_low_cross_up", "swing_low_cross_down",
+    "is_rs_52_week_high", "is_gap_up", "is_gap_down",
+    "is_doji_bar", "is_bull_bar", "is_bear_bar",
+    "is_high_63", "is_high_252", "is_low_63", "is_low_252",
+    "buy_signal", "sell_signal", "signal_change",
+)
+INT_COLUMNS = ("signal",)
+DERIVED_COLUMNS = FLOAT_COLUMNS + FLAG_COLUMNS + INT_COLUMNS
+
+# Recursive averages advanced together in compute_panel, in stacking order
+SMOOTHED_SERIES = tuple(f"ema_{n}" for n in EMA_PERIODS) + ("avg_gain", "avg_loss", "atr")
+
+
+class Panel:
+    """Per-symbol price history laid out as (bars, symbols) float64 matrices"""
+
+    def __init__(self, symbols: List[str], counts: np.ndarray, dates: np.ndarray, prices: Dict[str, np.ndarray]):
+        self.symbols = symbols
+        self.counts = counts
+        self.dates = dates
+        self.prices = prices
+
+    @property
+    def valid(self) -> np.ndarray:
+        bars = np.arange(self.dates.shape[0])[:, None]
+        return bars < self.counts[None, :]
+
+
+def _as_dict(row) -> dict:
+    if hasattr(row, "model_dump"):
+        return row.model_dump()
+    if isinstance(row, dict):
+        return row
+    return dict(row)
+
+
+def panel_from_columns(symbols: List[str], dates: List[str], fields: Dict[str, Iterable]) -> Panel:
+    """Lay out column-oriented rows, already sorted by (symbol, date), as a panel"""
+    n = len(symbols)
+    if n == 0:
+        return Panel([], np.zeros(0, dtype=np.int64), np.empty((0, 0), dtype=object), {})
+    symbol_array = np.array(symbols)
+    starts = np.flatnonzero(np.concatenate([[True], symbol_array[1:] != symbol_array[:-1]]))
+    counts = np.diff(np.append(starts, n))
+    column = np.repeat(np.arange(len(starts)), counts)
+    bar = np.arange(n) - np.repeat(starts, counts)
+    shape = (int(counts.max()), len(starts))
+
+    prices = {}
+    for field in PRICE_FIELDS:
+        matrix = np.full(shape, np.nan)
+        matrix[bar, column] = np.asarray(fields[field], dtype=np.float64)
+        prices[field] = matrix
+    date_matrix = np.full(shape, None, dtype=object)
+    date_matrix[bar, column] = np.array(dates, dtype=object)
+
+    return Panel(symbol_array[starts].tolist(), counts, date_matrix, prices)
+
+
+def build_panel(rows: Iterable) -> Tuple[Panel, List[dict]]:
+    """Group raw OHLCV rows by symbol into a left-aligned bar panel.
+
+    Returns the panel and the input rows as dicts, sorted by (symbol, date).
+    """
+    records = [_as_dict(row) for row in rows]
+    # Timsort is linear on input that is already ordered, which is the usual case
+    records.sort(key=itemgetter("symbol", "date"))
+    fields = {field: [r[field] for r in records] for field in PRICE_FIELDS}
+    panel = panel_from_columns([r["symbol"] for r in records], [r["date"] for r in records], fields)
+    return panel, records
+
+
+def _shift(a: np.ndarray, n: int = 1, fill=np.nan) -> np.ndarray:
+    """Shift a (bars, symbols) matrix down by n bars"""
+    out = np.full_like(a, fill)
+    if n < a.shape[0]:
+        out[n:] = a[:-n]
+    return out
+
+
+def _rolling(a: np.ndarray, window: int, op) -> np.ndarray:
+    """Rolling max/min over the last `window` bars (inclusive) using power-of-two doubling.
+
+    `op` is np.fmax or np.fmin, so NaNs inside a window are ignored. Bars with
+    fewer than `window` predecessors are NaN.
+    """
+    out = np.full_like(a, np.nan)
+    n = a.shape[0]
+    if window > n:
+        return out
+    span = 1
+    acc = a
+    while span * 2 <= window:
+        acc = np.concatenate([acc[:span], op(acc[span:], acc[:-span])])
+        span *= 2
+    # acc[t] now covers [t - span + 1, t]; combine two overlapping spans for the full window
+    offset = window - span
+    if offset:
+        acc = np.concatenate([acc[:offset], op(acc[offset:], acc[:-offset])])
+    out[window - 1:] = acc[window - 1:]
+    return out
+
+
+def _rolling_mean(a: np.ndarray, window: int) -> np.ndarray:
+    out = np.full_like(a, np.nan)
+    if window > a.shape[0]:
+        return out
+    csum = np.cumsum(np.nan_to_num(a), axis=0)
+    out[window - 1:] = csum[window - 1:]
+    out[window:] -= csum[:-window]
+    return out / window
+
+
+def _ewm(series: np.ndarray, alphas: np.ndarray) -> np.ndarray:
+    """Exponential smoothing of stacked series, shape (k, bars, symbols).
+
+    Each series is seeded with its first non-NaN value. The loop runs over
+    bars only; every step updates all k series for every symbol.
+    """
+    out = np.empty_like(series)
+    alphas = alphas[:, None]
+    state = series[:, 0].copy()
+    out[:, 0] = state
+    for t in range(1, series.shape[1]):
+        x = series[:, t]
+        state = np.where(np.isnan(state), x, state + alphas * (x - state))
+        out[:, t] = state
+    return out
+
+
+def _warm_up(a: np.ndarray, bars: int) -> np.ndarray:
+    """Copy of `a` with the first `bars` rows blanked where there is too little history"""
+    a = a.copy()
+    a[:min(bars, a.shape[0])] = np.nan
+    return a
+
+
+def _forward_fill(values: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """Carry values[t] forward from each bar where mask is set"""
+    bars = np.arange(values.shape[0])[:, None]
+    idx = np.where(mask, bars, 0)
+    idx = np.maximum.accumulate(idx, axis=0)
+    filled = np.take_along_axis(values, idx, axis=0)
+    seen = np.maximum.accumulate(mask, axis=0)
+    return np.where(seen, filled, np.nan)
+
+
+def _crosses(close: np.ndarray, level: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Close crossing above / below the level that was in force on the previous bar"""
+    prior_level = _shift(level)
+    prior_close = _shift(close)
+    up = (close > prior_level) & (prior_close <= prior_level)
+    down = (close < prior_level) & (prior_close >= prior_level)
+    return up, down
+
+
+def benchmark_series(panel: Panel, benchmark: Optional[Tuple[np.ndarray, np.ndarray]] = None):
+    """Benchmark (dates, adjusted_close) sorted by date, taken from the panel if not given"""
+    if benchmark is not None:
+        return benchmark
+    if BENCHMARK_SYMBOL not in panel.symbols:
+        return None
+    j = panel.symbols.index(BENCHMARK_SYMBOL)
+    n = panel.counts[j]
+    return panel.dates[:n, j].astype(str), panel.prices["adjusted_close"][:n, j]
+
+
+def _relative_strength(panel: Panel, benchmark) -> np.ndarray:
+    rs = np.full(panel.prices["close"].shape, np.nan)
+    if benchmark is None or len(benchmark[0]) == 0:
+        return rs
+    bench_dates, bench_close = benchmark
+    valid = panel.valid
+    dates = panel.dates[valid].astype(str)
+    pos = np.clip(np.searchsorted(bench_dates, dates), 0, len(bench_dates) - 1)
+    matched = bench_dates[pos] == dates
+    ratio = np.full(dates.shape, np.nan)
+    denom = bench_close[pos[matched]]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio[matched] = np.where(denom > 0, 100.0 * panel.prices["adjusted_close"][valid][matched] / denom, np.nan)
+    rs[valid] = ratio
+    return rs
+
+
+def compute_panel(panel: Panel, benchmark=None) -> Dict[str, np.ndarray]:
+    """Compute every derived column for a panel. Returns (bars, symbols) matrices.
+
+    The "_smoothed" entry holds the raw (k, bars, symbols) recursive averages
+    in SMOOTHED_SERIES order and is not a table column.
+    """
+    p = panel.prices
+    open_, high, low, close, volume = p["open"], p["high"], p["low"], p["close"], p["volume"]
+    out: Dict[str, np.ndarray] = {}
+
+    prev_close = _shift(close)
+    out["prev_close"] = prev_close
+    out["price_change"] = close - prev_close
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out["percent_change"] = np.where(prev_close > 0, (close - prev_close) / prev_close * 100.0, np.nan)
+
+    # Recursive averages, all advanced in a single pass over the bars
+    delta = close - prev_close
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    stacked = np.stack([close] * len(EMA_PERIODS) + [np.maximum(delta, 0), np.maximum(-delta, 0), true_range])
+    alphas = np.array([2.0 / (n + 1) for n in EMA_PERIODS] + [1.0 / RSI_PERIOD] * 2 + [1.0 / ATR_PERIOD])
+    smoothed = _ewm(stacked, alphas)
+    for i, n in enumerate(EMA_PERIODS):
+        out[f"ema_{n}"] = _warm_up(smoothed[i], n - 1)
+    avg_gain, avg_loss = smoothed[len(EMA_PERIODS)], smoothed[len(EMA_PERIODS) + 1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = np.where(avg_loss > 0, 100.0 - 100.0 / (1.0 + avg_gain / avg_loss), np.where(avg_gain > 0, 100.0, 50.0))
+    out["rsi_14"] = _warm_up(np.where(np.isnan(avg_gain), np.nan, rsi), RSI_PERIOD)
+    out["atr"] = _warm_up(smoothed[-1], ATR_PERIOD - 1)
+    # Unblanked averages, kept so incremental updates can resume from the last bar
+    out["_smoothed"] = smoothed
+
+    out["avg_volume"] = _rolling_mean(volume, AVG_VOLUME_PERIOD)
+
+    for n in HIGH_LOW_PERIODS:
+        out[f"is_high_{n}"] = high >= _rolling(high, n, np.fmax)
+        out[f"is_low_{n}"] = low <= _rolling(low, n, np.fmin)
+
+    k = SWING_STRENGTH
+    for side, prices, op, level_col in (("high", high, np.fmax, "swing_high"), ("low", low, np.fmin, "swing_low")):
+        neighbours = _rolling(prices, k, op)
+        pivot = _shift(prices, k)
+        before = _shift(neighbours, k + 1)
+        if side == "high":
+            confirmed = (pivot > before) & (pivot > neighbours)
+        else:
+            confirmed = (pivot < before) & (pivot < neighbours)
+        out[f"is_swing_{side}"] = confirmed
+        level = _forward_fill(pivot, confirmed)
+        out[level_col] = level
+        out[f"{level_col}_cross_up"], out[f"{level_col}_cross_down"] = _crosses(close, level)
+
+    prior_high, prior_low = _shift(high), _shift(low)
+    out["is_gap_up"] = low > prior_high
+    out["is_gap_down"] = high < prior_low
+
+    body = np.abs(close - open_)
+    doji = body <= DOJI_BODY_RATIO * (high - low)
+    out["is_doji_bar"] = doji
+    out["is_bull_bar"] = (close > open_) & ~doji
+    out["is_bear_bar"] = (close < open_) & ~doji
+
+    rs = _relative_strength(panel, benchmark_series(panel, benchmark))
+    out["rs"] = rs
+    out["is_rs_52_week_high"] = rs >= _rolling(rs, RS_HIGH_PERIOD, np.fmax)
+
+    fast, slow = out[f"ema_{SIGNAL_FAST}"], out[f"ema_{SIGNAL_SLOW}"]
+    ready = ~np.isnan(fast) & ~np.isnan(slow)
+    signal = np.where(ready, np.where(fast > slow, 1.0, -1.0), np.nan)
+    prior_signal = _shift(signal)
+    changed = ~np.isnan(prior_signal) & ~np.isnan(signal) & (signal != prior_signal)
+    out["signal"] = signal
+    out["signal_change"] = changed
+    out["buy_signal"] = changed & (signal == 1)
+    out["sell_signal"] = changed & (signal == -1)
+
+    return out
+
+
+def _column_values(matrix: np.ndarray, valid: np.ndarray, column: str, nulls: bool = True) -> list:
+    """Flatten a (bars, symbols) matrix into per-row Python values, symbol-major.
+
+    NaN becomes None unless `nulls` is False; sqlite3 already binds NaN as NULL.
+    """
+    values = matrix.T[valid.T]
+    if column in FLAG_COLUMNS:
+        return values.astype(np.int64).tolist()
+    if not nulls:
+        return values.tolist()
+    if column in INT_COLUMNS:
+        return [None if v != v else int(v) for v in values.tolist()]
+    return [None if v != v else v for v in values.tolist()]
+
+
+def compute_indicators(rows: Iterable, benchmark=None) -> List[dict]:
+    """Compute every derived column for raw OHLCV rows.
+
+    `rows` may be StockDataCreate models, dicts or sqlite3.Row objects for any
+    number of symbols. If `benchmark` (dates, adjusted closes) is not given,
+    relative strength uses the SPY rows in the input when present.
+    Returns one dict per input row, sorted by (symbol, date).
+    """
+    panel, records = build_panel(rows)
+    if not records:
+        return []
+    derived = compute_panel(panel, benchmark)
+    valid = panel.valid
+    columns = [_column_values(derived[col], valid, col) for col in DERIVED_COLUMNS]
+    results = []
+    for record, values in zip(records, zip(*columns)):
+        row = record.copy()
+        row.update(zip(DERIVED_COLUMNS, values))
+        results.append(row)
+    return results
+
+
+def _load_benchmark(conn: sqlite3.Connection):
+    rows = conn.execute(
+        f"SELECT date, adjusted_close FROM stock_data_daily WHERE symbol_id = {SYMBOL_ID} ORDER BY date",
+        (BENCHMARK_SYMBOL,),
+    ).fetchall()
+    if not rows:
+        return None
+    return np.array([r[0] for r in rows]), np.array([r[1] for r in rows], dtype=np.float64)
+
+
+def recompute_indicators(conn: sqlite3.Connection, symbols: Optional[List[str]] = None, chunk_size: int = 500) -> int:
+    """Recompute every derived column for the given symbols (default: all) and write them back.
+
+    Symbols are processed in chunks to bound memory; each chunk is one
+    executemany UPDATE and one commit. The per-symbol state used by
+    incremental.update_latest is saved alongside. Returns the number of rows updated.
+    """
+    benchmark = _load_benchmark(conn)
+    from incremental import save_states, states_from_panel
+    from breadth import refresh_breadth
+    from rs_rank import refresh_rs_ranks
+
+    if symbols is None:
+        symbols = [r[0] for r in conn.execute("SELECT symbol FROM symbols ORDER BY symbol")]
+
+    assignments = ", ".join(f"{col} = ?" for col in DERIVED_COLUMNS)
+    update = f"UPDATE stock_data_daily SET {assignments} WHERE symbol_id = ? AND date = ?"
+    select = """
+    SELECT s.symbol, d.symbol_id, d.date, {}
+    FROM symbols AS s JOIN stock_data_daily AS d ON d.symbol_id = s.symbol_id
+    WHERE s.symbol IN ({}) ORDER BY s.symbol, d.date
+    """
+
+    total = 0
+    earliest = None
+    for start in range(0, len(symbols), chunk_size):
+        chunk = symbols[start:start + chunk_size]
+        cursor = conn.execute(select.format(", ".join(PRICE_FIELDS), ", ".join("?" for _ in chunk)), chunk)
+        rows = cursor.fetchall()
+        if not rows:
+            continue
+        symbol_col, id_col, date_col, *price_cols = zip(*rows)
+        panel = panel_from_columns(symbol_col, date_col, dict(zip(PRICE_FIELDS, price_cols)))
+        derived = compute_panel(panel, benchmark)
+        valid = panel.valid
+        columns = [_column_values(derived[col], valid, col, nulls=False) for col in DERIVED_COLUMNS]
+        conn.executemany(update, zip(*columns, id_col, date_col))
+        save_states(conn, states_from_panel(panel, derived))
+        bump_data_versions(conn, date_col)
+        conn.commit()
+        total += len(rows)
+        earliest = min(min(date_col), earliest or date_col[0])
+        logging.info(f"Recomputed indicators for {start + len(chunk)}/{len(symbols)} symbols")
+    if earliest is not None:
+        # rs moved on every date of the recomputed histories, so their ranks and breadth follow
+        refresh_rs_ranks(conn, earliest)
+        refresh_breadth(conn, earliest)
+        conn.commit()
+    return total
+
+
+if __name__ == "__main__":
+    from database import DATABASE_PATH
+
+    logging.basicConfig(level=logging.INFO)
+    started = time.perf_counter()
+    with sqlite3.connect(DATABASE_PATH) as conn:
+        updated = recompute_indicators(conn)
+    elapsed = time.perf_counter() - started
+    logging.info(f"Updated {updated} rows in {elapsed:.1f}s")
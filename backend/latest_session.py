@@ -0,0 +1,238 @@
+"""
+In-memory snapshot of the latest trading sessions.
+
+Most requests ask about the most recent date: the dashboard's default
+screens, /maxdate and quotes. The last SNAPSHOT_DAYS trading dates of the
+whole universe are held here as NumPy columns (one Session per date), so
+those requests are answered with array operations instead of SQL.
+
+Freshness follows data_versions, like the result cache: each lookup checks
+the in-process version snapshot, which costs one PRAGMA data_version, and
+once any writer (in this process or another) has committed to a held date
+or added a newer one, the sessions are reloaded on the query executor.
+Older dates, and every request while SNAPSHOT_ENABLED is off, use SQL.
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from database import VersionSnapshot, get_data_versions, get_db_connection, run_in_db_thread
+from screens import INTEGER_COLUMNS, MEMBER_COLUMNS, REAL_COLUMNS, SCREENS, Screen
+
+SNAPSHOT_ENABLED = os.getenv("SNAPSHOT_ENABLED", "1") != "0"
+SNAPSHOT_DAYS = int(os.getenv("SNAPSHOT_DAYS", "2"))
+
+QUOTE_COLUMNS = ("open", "high", "low", "close", "volume", "prev_close", "price_change", "percent_change")
+# Screener member fields that are named differently from their column
+MEMBER_SOURCES = {"last_price": "close"}
+# Members kept per session for screens other than the built-in ones
+MAX_SCREENED = 256
+
+
+def _to_python(values: np.ndarray, integer: bool) -> list:
+    """Column values as JSON-ready Python values, NaN becoming None"""
+    if integer:
+        return [None if v != v else int(v) for v in values.tolist()]
+    return [None if v != v else v for v in values.tolist()]
+
+
+class Session:
+    """One trading date of the whole universe as columns, rows ordered by symbol_id"""
+
+    __slots__ = ("date", "symbols", "types", "positions", "columns", "_screened")
+
+    def __init__(self, date: str, symbols: List[str], types: List[str], columns: Dict[str, np.ndarray]):
+        self.date = date
+        self.symbols = symbols
+        self.types = types
+        self.positions = {symbol: i for i, symbol in enumerate(symbols)}
+        self.columns = columns
+        # A session never changes once loaded, so each screen's members are built once
+        self._screened: Dict[str, List[dict]] = {}
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def nbytes(self) -> int:
+        return sum(column.nbytes for column in self.columns.values())
+
+    def values(self, name: str, index: np.ndarray) -> list:
+        return _to_python(self.columns[name][index], name in INTEGER_COLUMNS)
+
+    def match(self, screen: Screen) -> np.ndarray:
+        """Row positions passing the screen, in the order of its SQL"""
+        return screen.select(self.columns)
+
+    def members(self, index: np.ndarray) -> List[dict]:
+        """Screener rows (MEMBER_COLUMNS) for the given row positions"""
+        fields = {}
+        for name in MEMBER_COLUMNS:
+            if name == "symbol":
+                fields[name] = [self.symbols[i] for i in index]
+            elif name == "type":
+                fields[name] = [self.types[i] for i in index]
+            else:
+                fields[name] = self.values(MEMBER_SOURCES.get(name, name), index)
+        return [dict(zip(fields, row)) for row in zip(*fields.values())]
+
+    def screen(self, screen: Screen) -> List[dict]:
+        """Every member of a screen, in order; shared between requests, so not to be modified"""
+        members = self._screened.get(screen.id)
+        if members is None:
+            members = self.members(self.match(screen))
+            if screen.id in SCREENS or len(self._screened) < MAX_SCREENED + len(SCREENS):
+                self._screened[screen.id] = members
+        return members
+
+    def evaluate(self, screens: Iterable[Screen], limit: Optional[int] = None) -> Dict[str, dict]:
+        """Same result as screens.evaluate_screens over this session's rows"""
+        results = {}
+        for screen in screens:
+            members = self.screen(screen)
+            results[screen.id] = {
+                "name": screen.name,
+                "count": len(members),
+                "members": members if limit is None else members[:limit],
+            }
+        return results
+
+    def quote(self, symbol: str) -> Optional[dict]:
+        i = self.positions.get(symbol)
+        if i is None:
+            return None
+        index = np.array([i])
+        quote = {"symbol": symbol, "type": self.types[i], "date": self.date}
+        quote.update((name, self.values(name, index)[0]) for name in QUOTE_COLUMNS)
+        return quote
+
+
+class LatestSessions:
+    """The newest `days` sessions, reloaded whenever data_versions shows a write to them"""
+
+    def __init__(self, days: int):
+        self.days = days
+        self._lock = threading.Lock()
+        self._versions: Optional[VersionSnapshot] = None
+        self._sessions: Dict[str, Session] = {}
+        self.loads = 0
+        self.load_time = 0.0
+
+    def _load(self) -> Dict[str, Session]:
+        # Every column a screen can use; integer columns are float64 too so NULL can be NaN
+        columns = REAL_COLUMNS + INTEGER_COLUMNS
+        with get_db_connection() as conn:
+            dates = [row[0] for row in conn.execute(
+                "SELECT DISTINCT date FROM stock_data_daily ORDER BY date DESC LIMIT ?", (self.days,)
+            )]
+            # symbol_id order is the tie order of the screeners' index scans
+            query = f"""
+            SELECT d.date, s.symbol, s.type, {", ".join(f"d.{c}" for c in columns)}
+            FROM stock_data_daily d
+            JOIN symbols s ON s.symbol_id = d.symbol_id
+            WHERE d.date IN ({", ".join("?" for _ in dates)})
+            ORDER BY d.date, d.symbol_id
+            """
+            rows = conn.execute(query, tuple(dates)).fetchall()
+        sessions = {}
+        start = 0
+        while start < len(rows):
+            date = rows[start][0]
+            end = start
+            while end < len(rows) and rows[end][0] == date:
+                end += 1
+            fields = list(zip(*rows[start:end]))
+            sessions[date] = Session(date, list(fields[1]), list(fields[2]), {
+                name: np.array(values, dtype=np.float64) for name, values in zip(columns, fields[3:])
+            })
+            start = end
+        return sessions
+
+    def _key(self, versions: VersionSnapshot) -> tuple:
+        """Versions of every date from the oldest held one on: changes on writes to them or newer dates"""
+        oldest = min(self._sessions) if self._sessions else ""
+        return tuple(sorted((date, version) for date, version in versions.versions.items() if date >= oldest))
+
+    def refresh(self, versions: Optional[VersionSnapshot] = None) -> Dict[str, Session]:
+        """Reload the sessions if a held or newer date was written since the last load. Blocking."""
+        versions = versions or get_data_versions()
+        with self._lock:
+            if versions is not self._versions:
+                if self._versions is None or self._key(versions) != self._key(self._versions):
+                    started = time.perf_counter()
+                    self._sessions = self._load() if self.days > 0 else {}
+                    self.load_time = time.perf_counter() - started
+                    self.loads += 1
+                self._versions = versions
+            return self._sessions
+
+    async def sessions(self) -> Dict[str, Session]:
+        """Current sessions by date; a reload after a write runs on the query executor"""
+        versions = await run_in_db_thread(get_data_versions)
+        if versions is self._versions:
+            return self._sessions
+        return await run_in_db_thread(self.refresh, versions)
+
+    def stats(self) -> dict:
+        sessions = self._sessions
+        return {
+            "enabled": SNAPSHOT_ENABLED,
+            "dates": sorted(sessions),
+            "rows": sum(len(s) for s in sessions.values()),
+            "bytes": sum(s.nbytes() for s in sessions.values()),
+            "loads": self.loads,
+            "last_load_seconds": round(self.load_time, 6),
+        }
+
+
+latest_sessions = LatestSessions(SNAPSHOT_DAYS)
+
+
+async def get_session(date: str) -> Optional[Session]:
+    """The in-memory session for a date, or None when it is not held and SQL must answer"""
+    if not SNAPSHOT_ENABLED:
+        return None
+    return (await latest_sessions.sessions()).get(date)
+
+
+async def screen_members(date: str, screen: Screen, limit: Optional[int] = None) -> Optional[List[dict]]:
+    """
+    A screener's rows for `date` from memory, matching its SQL (LIMIT
+    semantics included: a negative limit means no limit), or None when the
+    date is not held.
+    """
+    session = await get_session(date)
+    if session is None:
+        return None
+    members = session.screen(screen)
+    return members[:limit] if limit is not None and limit >= 0 else members
+
+
+async def latest_date(symbol: str) -> Optional[str]:
+    """The newest held date with a bar for `symbol`, or None (not held or disabled)"""
+    if not SNAPSHOT_ENABLED:
+        return None
+    sessions = await latest_sessions.sessions()
+    for date in sorted(sessions, reverse=True):
+        if symbol in sessions[date].positions:
+            return date
+    return None
+
+
+async def latest_quotes(symbols: Iterable[str]) -> Dict[str, dict]:
+    """Each symbol's newest held bar; symbols without one are left out"""
+    if not SNAPSHOT_ENABLED:
+        return {}
+    sessions = await latest_sessions.sessions()
+    newest_first = [sessions[date] for date in sorted(sessions, reverse=True)]
+    quotes = {}
+    for symbol in symbols:
+        for session in newest_first:
+            quote = session.quote(symbol)
+            if quote is not None:
+                quotes[symbol] = quote
+                break
+    return quotes
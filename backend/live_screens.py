@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Intraday evaluation of the price-level screens against streaming trades.
+
+The built-in screens that depend only on today's bar and levels known
+before the session opens (gaps, 63/252-bar highs and lows, swing level
+crosses) are tracked live. Each symbol's trigger levels come from its saved
+indicator state when its first trade of the session arrives: the prior
+close, high and low, the highest high and lowest low of the prior N-1 bars
+and the current swing high and low. From then on every trade is an O(1)
+comparison of the session's high, low and last price against those levels,
+and only a change of membership produces an event.
+
+The conditions are those of incremental.advance, so a symbol is in a live
+screen exactly when the nightly update would set the screen's flag if the
+session closed at the last trade. The gap and new high/low screens compare
+the session's high and low, so they only pass for a bar known to hold the
+whole session (realtime.LiveBar.complete); the swing crosses only need the
+last price and are evaluated for any bar.
+
+Usage:
+    python live_screens.py trades.jsonl AAPL MSFT   # print the entries/exits of a replay
+"""
+
+import argparse
+import asyncio
+import logging
+import math
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from incremental import IndicatorState
+
+# Screens evaluated live, in the order of TriggerLevels.passes
+LIVE_SCREENS = (
+    "gapup", "gapdown",
+    "new-highs-63", "new-lows-63", "new-highs-252", "new-lows-252",
+    "swing-high-cross-up", "swing-high-cross-down", "swing-low-cross-up", "swing-low-cross-down",
+)
+# The stock_data_daily flag each live screen follows
+SCREEN_FLAGS = {
+    "gapup": "is_gap_up", "gapdown": "is_gap_down",
+    "new-highs-63": "is_high_63", "new-lows-63": "is_low_63",
+    "new-highs-252": "is_high_252", "new-lows-252": "is_low_252",
+    "swing-high-cross-up": "swing_high_cross_up", "swing-high-cross-down": "swing_high_cross_down",
+    "swing-low-cross-up": "swing_low_cross_up", "swing-low-cross-down": "swing_low_cross_down",
+}
+OUTSIDE = (False,) * len(LIVE_SCREENS)
+INF = math.inf
+
+
+def _prior_extreme(values: np.ndarray, bars: int, n: int, highest: bool) -> float:
+    """Highest (lowest) of the prior n-1 values; out of reach until there are that many bars"""
+    if bars < n - 1:
+        return INF if highest else -INF
+    window = values[len(values) - (n - 1):]
+    return float(window.max() if highest else window.min())
+
+
+class TriggerLevels:
+    """The levels one symbol's live screens compare the session's prices against"""
+
+    __slots__ = ("date", "prev_close", "prev_high", "prev_low", "high_63", "low_63", "high_252", "low_252",
+                 "swing_high", "swing_low")
+
+    def __init__(self, state: IndicatorState):
+        self.date = state.date
+        self.prev_close, self.prev_high, self.prev_low = state.close, state.high, state.low
+        self.high_63 = _prior_extreme(state.highs, state.bars, 63, True)
+        self.low_63 = _prior_extreme(state.lows, state.bars, 63, False)
+        self.high_252 = _prior_extreme(state.highs, state.bars, 252, True)
+        self.low_252 = _prior_extreme(state.lows, state.bars, 252, False)
+        # NaN (no swing level yet) fails every comparison, like in advance
+        self.swing_high, self.swing_low = state.swing_high, state.swing_low
+
+    def passes(self, high: float, low: float, close: float, complete: bool = True) -> Tuple[bool, ...]:
+        """
+        Membership of each LIVE_SCREENS screen for a session that has traded
+        from low to high, last at close. When the range is not `complete`
+        (trades were missed) the screens on the range fail.
+        """
+        prev_close, swing_high, swing_low = self.prev_close, self.swing_high, self.swing_low
+        return (
+            complete and low > self.prev_high,
+            complete and high < self.prev_low,
+            complete and high >= self.high_63,
+            complete and low <= self.low_63,
+            complete and high >= self.high_252,
+            complete and low <= self.low_252,
+            close > swing_high and prev_close <= swing_high,
+            close < swing_high and prev_close >= swing_high,
+            close > swing_low and prev_close <= swing_low,
+            close < swing_low and prev_close >= swing_low,
+        )
+
+
+class LiveScreener:
+    """Current live screen membership of every symbol with trigger levels for its session"""
+
+    def __init__(self):
+        self.levels: Dict[str, TriggerLevels] = {}
+        self.members: Dict[str, Tuple[bool, ...]] = {}
+
+    def load(self, state: IndicatorState, bar) -> List[dict]:
+        """
+        Take the symbol's levels from its saved state before the bar's
+        session (ignored when the state already covers it) and evaluate the
+        bar so far. Returns the entries.
+        """
+        if state.date >= bar.date:
+            return []
+        self.levels[bar.symbol] = TriggerLevels(state)
+        self.members.pop(bar.symbol, None)
+        return self.check(bar)
+
+    def drop(self, symbol: str):
+        """Forget the symbol's levels and membership (its session ended or nobody watches it)"""
+        self.levels.pop(symbol, None)
+        self.members.pop(symbol, None)
+
+    def exits(self, bar) -> List[dict]:
+        """Exit events for every screen the bar's symbol is in, e.g. before its bar is discarded"""
+        return self._changes(bar, OUTSIDE, self.members.get(bar.symbol, OUTSIDE))
+
+    def check(self, bar) -> List[dict]:
+        """Entries and exits caused by the bar's latest trade"""
+        levels = self.levels.get(bar.symbol)
+        if levels is None:
+            return []
+        passed = levels.passes(bar.high, bar.low, bar.close, bar.complete)
+        before = self.members.get(bar.symbol, OUTSIDE)
+        if passed == before:
+            return []
+        self.members[bar.symbol] = passed
+        return self._changes(bar, passed, before)
+
+    @staticmethod
+    def _changes(bar, passed: Tuple[bool, ...], before: Tuple[bool, ...]) -> List[dict]:
+        return [
+            {"screen": screen, "symbol": bar.symbol, "date": bar.date, "entered": now,
+             "price": bar.close, "time": bar.time}
+            for screen, now, was in zip(LIVE_SCREENS, passed, before) if now != was
+        ]
+
+    def screen_members(self, screen: str) -> List[str]:
+        i = LIVE_SCREENS.index(screen)
+        return sorted(symbol for symbol, passed in self.members.items() if passed[i])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded trades through the live screens")
+    parser.add_argument("path", help="Recorded trade messages, one JSON object per line")
+    parser.add_argument("symbols", nargs="+", help="Symbols to evaluate")
+    args = parser.parse_args()
+
+    import sqlite3
+
+    import orjson
+
+    from database import DATABASE_PATH
+    from incremental import load_states
+    from realtime import BarAggregator, ReplayFeed, parse_trade
+
+    async def replay(states: Dict[str, IndicatorState]):
+        feed, aggregator, screener = ReplayFeed(args.path), BarAggregator(), LiveScreener()
+        await feed.subscribe(list(symbols))
+        async for message in feed.messages():
+            trade = parse_trade(message)
+            if trade is None:
+                continue
+            previous = aggregator.bars.get(trade.symbol)
+            bar = aggregator.add(trade)
+            if bar is None:
+                continue
+            if bar is not previous:
+                screener.drop(bar.symbol)
+                state = states.get(bar.symbol)
+                events = screener.load(state, bar) if state is not None else []
+            else:
+                events = screener.check(bar)
+            for event in events:
+                print(orjson.dumps(event).decode())
+
+    logging.basicConfig(level=logging.INFO)
+    symbols = sorted({symbol.upper() for symbol in args.symbols})
+    with sqlite3.connect(DATABASE_PATH) as conn:
+        states = load_states(conn, symbols)
+    asyncio.run(replay(states))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,11 @@ from pydantic import BaseModel
 import logging
 from datetime import datetime
 from contextlib import asynccontextmanager
-from database import init_database
+from database import init_database, close_pool, get_pool_stats
+from backtest import close_shared_pool
+from cache import result_cache
+from latest_session import SNAPSHOT_ENABLED, latest_sessions
+from realtime import realtime_hub, start_realtime, stop_realtime
 from routers.stocks import router as stocks_router
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -18,8 +22,22 @@ async def lifespan(app: FastAPI):
         logging.info("Database initialized successfully")
     except Exception as e:
         logging.error(f"Failed to initialize database: {e}")
+    if SNAPSHOT_ENABLED:
+        try:
+            sessions = latest_sessions.refresh()
+            logging.info(f"Loaded latest sessions: {', '.join(sorted(sessions)) or 'none'}")
+        except Exception as e:
+            logging.error(f"Failed to load latest sessions: {e}")
+    try:
+        if await start_realtime():
+            logging.info("Realtime feed started")
+    except Exception as e:
+        logging.error(f"Failed to start realtime feed: {e}")
     yield
-    # Shutdown (if needed)
+    # Shutdown
+    await stop_realtime()
+    close_shared_pool()
+    close_pool()
 
 # Create FastAPI instance
 app = FastAPI(
@@ -51,6 +69,26 @@ async def root():
 async def health_check():
     return HealthResponse(status="healthy", message="API is running successfully")
 
+@app.get("/health/db")
+async def database_pool_stats():
+    """Connection pool counters (checked out, waits, wait time) for sizing DATABASE_POOL_SIZE"""
+    return get_pool_stats()
+
+@app.get("/health/cache")
+async def result_cache_stats():
+    """Screener result cache hit/miss, eviction and invalidation counters"""
+    return result_cache.stats()
+
+@app.get("/health/snapshot")
+async def latest_session_stats():
+    """Dates, rows and memory held by the in-memory latest-session snapshot"""
+    return latest_sessions.stats()
+
+@app.get("/health/realtime")
+async def realtime_stats():
+    """Clients, watched and upstream symbols, trades and bar updates of the realtime hub"""
+    return realtime_hub.stats()
+
 # Include stocks router
 app.include_router(stocks_router)
 
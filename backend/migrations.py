@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Schema migrations for existing stock databases.
+
+Fresh databases are created straight from stockdb.sql and stamped with
+SCHEMA_VERSION. Older databases are brought forward step by step, using
+SQLite's PRAGMA user_version to remember which steps already ran.
+
+Usage:
+    python migrations.py                      # apply pending migrations
+    python migrations.py --backfill-prev-close  # recompute prev_close for every row
+    python migrations.py --vacuum             # rebuild the file afterwards to reclaim space
+
+Migrations run against the schema of their own version, so they use their own
+SQL rather than the helpers in database.py, resample.py, rs_rank.py or
+breadth.py, which follow the current schema.
+"""
+
+import argparse
+import logging
+import sqlite3
+import time
+
+def _column_names(conn: sqlite3.Connection, table: str) -> set:
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+def add_prev_close_columns(conn: sqlite3.Connection):
+    """Store the prior bar's close and the derived change on every row"""
+    existing = _column_names(conn, "stock_data_daily")
+    for column in ("prev_close", "price_change", "percent_change"):
+        if column not in existing:
+            conn.execute(f"ALTER TABLE stock_data_daily ADD COLUMN {column} real")
+    cursor = conn.execute("""
+    UPDATE stock_data_daily AS d
+    SET prev_close = p.prev_close,
+        price_change = d.close - p.prev_close,
+        percent_change = CASE
+            WHEN p.prev_close > 0 THEN ((d.close - p.prev_close) / p.prev_close) * 100.0
+            ELSE NULL
+        END
+    FROM (
+        SELECT symbol, date, LAG(close) OVER (PARTITION BY symbol ORDER BY date) AS prev_close
+        FROM stock_data_daily
+    ) AS p
+    WHERE d.symbol = p.symbol AND d.date = p.date
+    """)
+    logging.info(f"Backfilled prev_close for {cursor.rowcount} rows")
+
+def add_indicator_state_table(conn: sqlite3.Connection):
+    """Per-symbol indicator state used by incremental end-of-day updates"""
+    conn.execute("""
+    create table if not exists main.indicator_state
+    (
+        symbol     text    not null primary key,
+        date       text    not null,
+        bars       integer not null,
+        close      real    not null,
+        high       real    not null,
+        low        real    not null,
+        ema_10     real,
+        ema_21     real,
+        ema_50     real,
+        ema_200    real,
+        avg_gain   real,
+        avg_loss   real,
+        atr        real,
+        swing_high real,
+        swing_low  real,
+        signal     integer,
+        highs      blob    not null,
+        lows       blob    not null,
+        volumes    blob    not null,
+        rs_values  blob    not null
+    )
+    """)
+
+def add_data_versions_table(conn: sqlite3.Connection):
+    """Per-date change counter bumped by every writer, used to invalidate cached results"""
+    conn.execute("""
+    create table if not exists main.data_versions
+    (
+        date    text    not null primary key,
+        version integer not null
+    )
+    """)
+    conn.execute("INSERT OR IGNORE INTO data_versions (date, version) SELECT DISTINCT date, 1 FROM stock_data_daily")
+
+def add_data_versions_updated_at(conn: sqlite3.Connection):
+    """Unix time of the last write per date, served as Last-Modified"""
+    if "updated_at" not in _column_names(conn, "data_versions"):
+        conn.execute("ALTER TABLE data_versions ADD COLUMN updated_at real")
+
+def add_rollup_table(conn: sqlite3.Connection):
+    """Weekly and monthly bars materialized from the daily bars (see resample.py)"""
+    # Filled by normalize_symbols, which rebuilds this table keyed by symbol_id
+    conn.execute("""
+    create table if not exists main.stock_data_rollup
+    (
+        symbol    text    not null,
+        interval  text    not null,
+        date      text    not null,
+        last_date text    not null,
+        open      real    not null,
+        high      real    not null,
+        low       real    not null,
+        close     real    not null,
+        volume    integer not null,
+        bars      integer not null,
+        primary key (symbol, interval, date)
+    )
+    """)
+
+def normalize_symbols(conn: sqlite3.Connection):
+    """
+    Move name, type and interval out of stock_data_daily into a symbols
+    table and key the daily bars and rollups by an integer symbol_id.
+    The fact table is copied into a new table since SQLite cannot change a
+    primary key in place; run with --vacuum afterwards to reclaim the space.
+    """
+    conn.execute("""
+    create table if not exists main.symbols
+    (
+        symbol_id integer not null primary key,
+        symbol    text    not null unique,
+        name      text    not null,
+        type      text    not null,
+        exchange  text,
+        interval  text    not null
+    )
+    """)
+    # Metadata is taken from each symbol's latest bar, matching what the feed last reported
+    conn.execute("""
+    INSERT OR IGNORE INTO symbols (symbol, name, type, interval)
+    SELECT d.symbol, d.name, d.type, d.interval
+    FROM stock_data_daily d
+    JOIN (SELECT symbol, MAX(date) AS date FROM stock_data_daily GROUP BY symbol) AS latest
+      ON latest.symbol = d.symbol AND latest.date = d.date
+    ORDER BY d.symbol
+    """)
+
+    # Keep every remaining column with its declared type and position
+    columns = [
+        (row[1], row[2], row[3]) for row in conn.execute("PRAGMA table_info(stock_data_daily)")
+        if row[1] not in ("symbol", "name", "type", "interval")
+    ]
+    definitions = ["symbol_id integer not null references symbols (symbol_id)"] + [
+        f"{name} {declared}{' not null' if not_null else ''}" for name, declared, not_null in columns
+    ]
+    names = ", ".join(name for name, _, _ in columns)
+    conn.execute(f"""
+    create table main.stock_data_daily_new
+    (
+        {", ".join(definitions)},
+        primary key (symbol_id, date)
+    )
+    """)
+    cursor = conn.execute(f"""
+    INSERT INTO stock_data_daily_new (symbol_id, {names})
+    SELECT s.symbol_id, {", ".join(f"d.{name}" for name, _, _ in columns)}
+    FROM stock_data_daily d JOIN symbols s ON s.symbol = d.symbol
+    ORDER BY s.symbol_id, d.date
+    """)
+    conn.execute("DROP TABLE stock_data_daily")
+    conn.execute("ALTER TABLE stock_data_daily_new RENAME TO stock_data_daily")
+    conn.execute("create index if not exists main.stock_data_daily_date on stock_data_daily (date)")
+    logging.info(f"Moved {cursor.rowcount} daily bars to symbol_id keys")
+
+    conn.execute("DROP TABLE IF EXISTS stock_data_rollup")
+    conn.execute("""
+    create table main.stock_data_rollup
+    (
+        symbol_id integer not null,
+        interval  text    not null,
+        date      text    not null,
+        last_date text    not null,
+        open      real    not null,
+        high      real    not null,
+        low       real    not null,
+        close     real    not null,
+        volume    integer not null,
+        bars      integer not null,
+        primary key (symbol_id, interval, date)
+    )
+    """)
+    # The aggregation of resample.AGGREGATE_QUERY over this version's daily bars
+    written = 0
+    for interval, period in (("1w", "date(date, 'weekday 0', '-6 days')"), ("1mo", "date(date, 'start of month')")):
+        cursor = conn.execute(f"""
+        INSERT INTO stock_data_rollup (symbol_id, interval, date, last_date, open, high, low, close, volume, bars)
+        SELECT symbol_id, ?, period, MAX(date),
+               MAX(CASE WHEN is_first = 1 THEN open END), MAX(high), MIN(low),
+               MAX(CASE WHEN is_last = 1 THEN close END), SUM(volume), COUNT(*)
+        FROM (
+            SELECT symbol_id, date, open, high, low, close, volume, period,
+                   ROW_NUMBER() OVER (PARTITION BY symbol_id, period ORDER BY date) AS is_first,
+                   ROW_NUMBER() OVER (PARTITION BY symbol_id, period ORDER BY date DESC) AS is_last
+            FROM (SELECT symbol_id, date, open, high, low, close, volume, {period} AS period FROM stock_data_daily)
+        )
+        GROUP BY symbol_id, period
+        """, (interval,))
+        written += cursor.rowcount
+    logging.info(f"Built {written} rollup bars")
+
+def add_rs_rank_column(conn: sqlite3.Connection):
+    """Cross-sectional percentile rank of rs per date (see rs_rank.py)"""
+    if "rs_rank" not in _column_names(conn, "stock_data_daily"):
+        conn.execute("ALTER TABLE stock_data_daily ADD COLUMN rs_rank integer")
+    # rs_rank.percentile_ranks in SQL: RANK() - 1 counts the strictly lower rs of the date
+    cursor = conn.execute("""
+    UPDATE stock_data_daily AS d
+    SET rs_rank = CASE WHEN r.n >= 2 THEN 1 + CAST(98.0 * r.below / (r.n - 1) + 0.5 AS INTEGER) END
+    FROM (
+        SELECT symbol_id, date,
+               RANK() OVER (PARTITION BY date ORDER BY rs) - 1 AS below,
+               COUNT(*) OVER (PARTITION BY date) AS n
+        FROM stock_data_daily
+        WHERE rs IS NOT NULL
+    ) AS r
+    WHERE d.symbol_id = r.symbol_id AND d.date = r.date
+    """)
+    conn.execute(
+        "UPDATE data_versions SET version = version + 1, updated_at = ? "
+        "WHERE date IN (SELECT date FROM stock_data_daily WHERE rs_rank IS NOT NULL)",
+        (time.time(),),
+    )
+    logging.info(f"Ranked rs on {cursor.rowcount} rows")
+
+def add_breadth_table(conn: sqlite3.Connection):
+    """Daily market breadth counts maintained at ingest (see breadth.py)"""
+    conn.execute("""
+    create table if not exists main.market_breadth
+    (
+        date           text    not null primary key,
+        symbols        integer not null,
+        new_highs_63   integer not null,
+        new_lows_63    integer not null,
+        new_highs_252  integer not null,
+        new_lows_252   integer not null,
+        gap_ups        integer not null,
+        gap_downs      integer not null,
+        above_ema_50   integer not null,
+        with_ema_50    integer not null,
+        above_ema_200  integer not null,
+        with_ema_200   integer not null,
+        buy_signals    integer not null,
+        sell_signals   integer not null
+    )
+    """)
+    # The counts of breadth.COUNT_COLUMNS over this version's daily bars
+    cursor = conn.execute("""
+    INSERT OR REPLACE INTO market_breadth
+    SELECT date, COUNT(*),
+           CAST(TOTAL(is_high_63) AS INTEGER), CAST(TOTAL(is_low_63) AS INTEGER),
+           CAST(TOTAL(is_high_252) AS INTEGER), CAST(TOTAL(is_low_252) AS INTEGER),
+           CAST(TOTAL(is_gap_up) AS INTEGER), CAST(TOTAL(is_gap_down) AS INTEGER),
+           CAST(TOTAL(close > ema_50) AS INTEGER), COUNT(ema_50),
+           CAST(TOTAL(close > ema_200) AS INTEGER), COUNT(ema_200),
+           CAST(TOTAL(buy_signal) AS INTEGER), CAST(TOTAL(sell_signal) AS INTEGER)
+    FROM stock_data_daily
+    GROUP BY date
+    """)
+    logging.info(f"Built breadth for {cursor.rowcount} dates")
+
+# Ordered list of migrations; the position in the list (1-based) is the schema version
+MIGRATIONS = [
+    add_prev_close_columns,
+    add_indicator_state_table,
+    add_data_versions_table,
+    add_data_versions_updated_at,
+    add_rollup_table,
+    normalize_symbols,
+    add_rs_rank_column,
+    add_breadth_table,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+def run_migrations(conn: sqlite3.Connection) -> int:
+    """Apply every migration newer than the database's user_version. Returns the number applied."""
+    current = conn.execute("PRAGMA user_version").fetchone()[0]
+    applied = 0
+    for version, migration in enumerate(MIGRATIONS, start=1):
+        if version <= current:
+            continue
+        logging.info(f"Applying migration {version}: {migration.__name__}")
+        migration(conn)
+        conn.execute(f"PRAGMA user_version = {version}")
+        conn.commit()
+        applied += 1
+    return applied
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate the stock database schema")
+    parser.add_argument("--backfill-prev-close", action="store_true",
+                        help="Recompute prev_close, price_change and percent_change for every row")
+    parser.add_argument("--vacuum", action="store_true",
+                        help="Rebuild the database file afterwards to release space freed by migrations")
+    args = parser.parse_args()
+
+    from database import DATABASE_PATH, refresh_prev_close
+
+    logging.basicConfig(level=logging.INFO)
+    with sqlite3.connect(DATABASE_PATH) as conn:
+        applied = run_migrations(conn)
+        logging.info(f"Applied {applied} migration(s)")
+        if args.backfill_prev_close:
+            updated = refresh_prev_close(conn)
+            conn.commit()
+            logging.info(f"Backfilled prev_close for {updated} rows")
+        if args.vacuum:
+            conn.execute("VACUUM")
+            logging.info("Vacuumed database")
+
+if __name__ == "__main__":
+    main()
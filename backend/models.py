@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Dict, List, Optional
 
 class StockDataDaily(BaseModel):
     """Pydantic model for stock_data_daily table"""
@@ -7,6 +7,7 @@ class StockDataDaily(BaseModel):
     name: str
     type: str
     interval: str
+    exchange: Optional[str] = None
     date: str
     open: float
     high: float
@@ -14,6 +15,9 @@ class StockDataDaily(BaseModel):
     close: float
     adjusted_close: float
     volume: int
+    prev_close: Optional[float] = None
+    price_change: Optional[float] = None
+    percent_change: Optional[float] = None
     avg_volume: Optional[float] = None
     is_swing_high: Optional[int] = None
     swing_high: Optional[float] = None
@@ -24,6 +28,7 @@ class StockDataDaily(BaseModel):
     swing_low_cross_up: Optional[int] = None
     swing_low_cross_down: Optional[int] = None
     rs: Optional[float] = None
+    rs_rank: Optional[int] = None
     is_rs_52_week_high: Optional[int] = None
     atr: Optional[float] = None
     is_gap_up: Optional[int] = None
@@ -51,6 +56,7 @@ class StockDataCreate(BaseModel):
     name: str
     type: str
     interval: str
+    exchange: Optional[str] = None
     date: str
     open: float
     high: float
@@ -86,3 +92,77 @@ class SymbolWithPriceResponse(BaseModel):
     prev_close: Optional[float] = None
     price_change: Optional[float] = None
     percent_change: Optional[float] = None
+    rs_rank: Optional[int] = None
+
+class QuoteResponse(BaseModel):
+    """Model for a symbol's latest bar in the quotes API response"""
+    symbol: str
+    type: str
+    date: str
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: int
+    prev_close: Optional[float] = None
+    price_change: Optional[float] = None
+    percent_change: Optional[float] = None
+
+class ScreenResult(BaseModel):
+    """Model for one screen's members within the batched screens response"""
+    name: str
+    count: int
+    members: List[SymbolWithPriceResponse]
+
+class ScreensResponse(BaseModel):
+    """Model for the batched screens API response"""
+    date: str
+    screens: Dict[str, ScreenResult]
+
+class HorizonStats(BaseModel):
+    """Model for the forward returns of a backtest's entries at one horizon"""
+    trades: int
+    mean: Optional[float] = None
+    median: Optional[float] = None
+    hit_rate: Optional[float] = None
+    best: Optional[float] = None
+    worst: Optional[float] = None
+
+class EquityPoint(BaseModel):
+    """Model for one session of a backtest's equity curve"""
+    date: str
+    equity: float
+    positions: int
+
+class BacktestResponse(BaseModel):
+    """Model for the backtest API response"""
+    screen: str
+    start: str
+    end: str
+    horizons: List[int]
+    hold: int
+    symbols: int
+    sessions: int
+    trades: int
+    forward_returns: Dict[str, HorizonStats]
+    total_return: float
+    max_drawdown: float
+    equity_curve: List[EquityPoint]
+
+class BreadthPoint(BaseModel):
+    """Model for one date of the /breadth series"""
+    date: str
+    symbols: int
+    new_highs_63: int
+    new_lows_63: int
+    net_new_highs_63: int
+    new_highs_252: int
+    new_lows_252: int
+    net_new_highs_252: int
+    gap_ups: int
+    gap_downs: int
+    pct_above_ema_50: Optional[float] = None
+    pct_above_ema_200: Optional[float] = None
+    buy_signals: int
+    sell_signals: int
+    net_signals: int
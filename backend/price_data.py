@@ -0,0 +1,111 @@
+"""
+Price-series windows shared by the price-data endpoints.
+
+A window ends at the latest bar on or before min(end, as_of) and covers the
+last `bars` trading bars, everything from `start`, or `days` calendar days
+back from that last bar. Every bound is a range on the (symbol_id, date)
+primary key; with `bars` SQLite scans it backwards from the upper bound and
+stops after LIMIT rows, so a series costs one index range read.
+"""
+
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+
+from database import SYMBOL_ID
+
+DEFAULT_BARS = 90
+MAX_BARS = 5000
+
+PRICE_COLUMNS = ("time", "open", "high", "low", "close", "volume", "ema_21", "ema_200")
+# Binary column order keeps each column 8-byte aligned: float64 prices and EMAs
+# (NaN for missing), int64 volume, then int32 days since 1970-01-01
+BINARY_LAYOUT = (
+    ("open", "<f8"), ("high", "<f8"), ("low", "<f8"), ("close", "<f8"),
+    ("ema_21", "<f8"), ("ema_200", "<f8"), ("volume", "<i8"), ("time", "date"),
+)
+# Downsampled series (see downsample.py) pack their bars without the lines,
+# then each line in LINE_COLUMNS order as its own (value, time) buffer
+DOWNSAMPLED_BAR_LAYOUT = (
+    ("open", "<f8"), ("high", "<f8"), ("low", "<f8"), ("close", "<f8"), ("volume", "<i8"), ("time", "date"),
+)
+LINE_LAYOUT = (("value", "<f8"), ("time", "date"))
+
+# Columns are selected in CandlestickData order with its names, so rows encode as-is
+SELECT_COLUMNS = "date AS time, open, high, low, close, volume, ema_21, ema_200"
+
+
+def validate_date(value: Optional[str], name: str) -> Optional[str]:
+    if value is None:
+        return None
+    try:
+        datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name} date format. Use YYYY-MM-DD")
+    return value
+
+
+class PriceWindow:
+    """Validated bars/start/end/as_of/days bounds of a price series request"""
+
+    def __init__(self, bars: Optional[int] = None, start: Optional[str] = None, end: Optional[str] = None,
+                 as_of: Optional[str] = None, days: Optional[int] = None):
+        self.start = validate_date(start, "start")
+        self.end = validate_date(end, "end")
+        self.as_of = validate_date(as_of, "as_of")
+        bounds = [d for d in (self.end, self.as_of) if d is not None]
+        self.upper = min(bounds) if bounds else None
+        if self.start is not None and self.upper is not None and self.start > self.upper:
+            raise HTTPException(status_code=400, detail="start must not be after end/as_of")
+        if bars is None and start is None and days is None:
+            bars = DEFAULT_BARS
+        self.bars = bars
+        self.days = days
+
+    def cache_params(self) -> dict:
+        """Request parameters that identify the window in validators and cache keys"""
+        return {"bars": self.bars, "start": self.start, "end": self.end, "days": self.days}
+
+    def query(self, symbol: str, columns: str = SELECT_COLUMNS) -> Tuple[str, List]:
+        """SQL and parameters selecting one symbol's window in ascending date order"""
+        conditions = [f"symbol_id = {SYMBOL_ID}"]
+        params: list = [symbol]
+        if self.upper is not None:
+            conditions.append("date <= ?")
+            params.append(self.upper)
+        if self.start is not None:
+            conditions.append("date >= ?")
+            params.append(self.start)
+        if self.days is not None:
+            anchor = f"SELECT MAX(date) FROM stock_data_daily WHERE symbol_id = {SYMBOL_ID}"
+            anchor_params = [symbol]
+            if self.upper is not None:
+                anchor += " AND date <= ?"
+                anchor_params.append(self.upper)
+            conditions.append(f"date >= date(({anchor}), ?)")
+            params.extend(anchor_params)
+            params.append(f"-{self.days} days")
+
+        query = f"SELECT {columns} FROM stock_data_daily WHERE {' AND '.join(conditions)}"
+        if self.bars is not None:
+            query = f"SELECT * FROM ({query} ORDER BY date DESC LIMIT ?) ORDER BY time ASC"
+            params.append(self.bars)
+        else:
+            query += " ORDER BY date ASC"
+        return query, params
+
+    def batch_query(self, symbols: Sequence[str]) -> Tuple[str, List]:
+        """
+        One statement returning every symbol's window, grouped by symbol in
+        the given order and ascending by date. Each symbol is its own
+        primary-key range read inside a UNION ALL; SQLite does not promise
+        to emit the branches in order, so the result is sorted by position
+        and time (cheap, as each branch is already in date order).
+        """
+        parts, params = [], []
+        for position, symbol in enumerate(symbols):
+            query, symbol_params = self.query(symbol, f"{position} AS position, {SELECT_COLUMNS}")
+            parts.append(f"SELECT * FROM ({query})")
+            params.extend(symbol_params)
+        return f"SELECT * FROM ({' UNION ALL '.join(parts)}) ORDER BY position, time", params
@@ -0,0 +1,673 @@
+#!/usr/bin/env python3
+"""
+Realtime intraday bars from one upstream trade feed.
+
+Instead of every dashboard opening its own WebSocket to the EODHD trade feed
+and building candles in the browser, the backend holds the one upstream
+connection, subscribing each symbol once however many clients watch it,
+folds trades into the current session's OHLCV bar per symbol and fans the
+bars out to clients over /ws/realtime.
+
+A trade only updates its symbol's bar and marks it dirty, which is O(1).
+Every REALTIME_INTERVAL seconds the dirty bars get their live screener
+columns (incremental.advance applied to a copy of the symbol's saved
+indicator state, so they are what the nightly update would write if the
+session closed now), are serialized once and handed to each client
+watching them. A client that has not taken its previous update yet gets the
+newer bar in place of the pending one: slow clients see fewer updates,
+never stale ones, and never hold up the others.
+
+A bar is only known to hold the whole session when its symbol was followed
+from before the session opened (REALTIME_MARKET_OPEN, market time) without
+a break. A bar started mid-session (the hub started or the symbol was
+subscribed late) or interrupted by a feed reconnect is sent with
+"complete": false and without live screener columns, since the trades it
+missed may have set the session's open, high or low; there is no snapshot
+source to seed it from. After an interruption every bar starts over.
+
+Clients can also follow watchlists: the entries and exits of their symbols
+in the live screens (live_screens.py), checked on every trade and sent
+without coalescing. At most MAX_PENDING_EVENTS events wait per watchlist;
+a client that falls further behind loses the oldest.
+
+The feed is the EODHD US trade WebSocket (REALTIME_FEED=eodhd, with
+EODHD_WS_URL and EODHD_API_TOKEN) or a file of recorded trade messages, one
+JSON object per line (REALTIME_FEED=path/to/trades.jsonl), replayed at
+REALTIME_REPLAY_SPEED times the recorded pace (0: as fast as possible).
+Without REALTIME_FEED the endpoint refuses connections.
+
+Usage:
+    python realtime.py trades.jsonl AAPL MSFT   # print the bars a replay builds
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import replace
+from datetime import date as Date, datetime, time as Time, timezone
+from typing import Deque, Dict, Iterable, List, Optional, Set
+from zoneinfo import ZoneInfo
+
+import orjson
+
+from database import get_db_connection, run_in_db_thread
+from incremental import IndicatorState, advance, load_states
+from indicators import BENCHMARK_SYMBOL, HIGH_LOW_PERIODS
+from live_screens import LIVE_SCREENS, LiveScreener
+
+REALTIME_FEED = os.getenv("REALTIME_FEED", "")
+REALTIME_INTERVAL = float(os.getenv("REALTIME_INTERVAL", "0.25"))
+REALTIME_REPLAY_SPEED = float(os.getenv("REALTIME_REPLAY_SPEED", "1"))
+MARKET_TIMEZONE = ZoneInfo(os.getenv("MARKET_TIMEZONE", "America/New_York"))
+MARKET_OPEN = Time.fromisoformat(os.getenv("REALTIME_MARKET_OPEN", "09:30"))
+# Symbols one client may watch at a time
+MAX_CLIENT_SYMBOLS = 100
+# Screen events held per watchlist for a client that has not taken them yet
+MAX_PENDING_EVENTS = 1000
+# First and longest pause before restarting a failed feed, in seconds
+RETRY_DELAY = 1
+MAX_RETRY_DELAY = 60
+
+BAR_FIELDS = ("symbol", "date", "open", "high", "low", "close", "volume", "trades", "start", "time", "complete")
+# Derived columns recomputed live for the bar in progress
+LIVE_COLUMNS = (
+    "prev_close", "price_change", "percent_change", "is_gap_up", "is_gap_down",
+    *(f"is_{kind}_{n}" for n in HIGH_LOW_PERIODS for kind in ("high", "low")),
+    "swing_high", "swing_low",
+    "swing_high_cross_up", "swing_high_cross_down", "swing_low_cross_up", "swing_low_cross_down",
+    "rsi_14", "rs", "is_rs_52_week_high", "signal", "buy_signal", "sell_signal",
+)
+NO_LIVE_COLUMNS = dict.fromkeys(LIVE_COLUMNS)
+
+
+class Trade:
+    """One trade from the feed: price, size and exchange time in milliseconds"""
+
+    __slots__ = ("symbol", "price", "size", "time")
+
+    def __init__(self, symbol: str, price: float, size: float, time: int):
+        self.symbol = symbol
+        self.price = price
+        self.size = size
+        self.time = time
+
+
+def parse_trade(message: dict) -> Optional[Trade]:
+    """The trade in an EODHD US trade message, or None for anything else (status, auth replies)"""
+    try:
+        price = float(message["p"])
+        trade = Trade(str(message["s"]).upper(), price, float(message.get("v") or 0), int(message["t"]))
+    except (KeyError, TypeError, ValueError):
+        return None
+    return trade if price > 0 else None
+
+
+def session_date(time: int) -> str:
+    """Trading date (YYYY-MM-DD, market time zone) of an epoch-milliseconds timestamp"""
+    return datetime.fromtimestamp(time / 1000, timezone.utc).astimezone(MARKET_TIMEZONE).date().isoformat()
+
+
+def session_open(date: str) -> int:
+    """Epoch milliseconds of the opening bell of a trading date"""
+    opened = datetime.combine(Date.fromisoformat(date), MARKET_OPEN, tzinfo=MARKET_TIMEZONE)
+    return int(opened.timestamp() * 1000)
+
+
+class LiveBar:
+    """
+    The current session's bar of one symbol, built from the trades seen so
+    far; `complete` when they are all of the session's trades
+    """
+
+    __slots__ = BAR_FIELDS
+
+    def __init__(self, trade: Trade, date: str, complete: bool = True):
+        self.symbol = trade.symbol
+        self.date = date
+        self.open = self.high = self.low = self.close = trade.price
+        self.volume = 0.0
+        self.trades = 0
+        self.start = self.time = trade.time
+        self.complete = complete
+
+    def add(self, trade: Trade):
+        price = trade.price
+        if price > self.high:
+            self.high = price
+        elif price < self.low:
+            self.low = price
+        self.close = price
+        self.volume += trade.size
+        self.trades += 1
+        self.time = max(self.time, trade.time)
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in BAR_FIELDS}
+
+    def as_row(self) -> dict:
+        """The bar as a raw OHLCV row (StockDataCreate shape)"""
+        return {"symbol": self.symbol, "date": self.date, "open": self.open, "high": self.high, "low": self.low,
+                "close": self.close, "adjusted_close": self.close, "volume": self.volume}
+
+
+class BarAggregator:
+    """
+    Live bars per symbol plus the saved indicator states their live columns
+    start from, and since when (epoch milliseconds) each symbol's trades
+    have all been seen: a symbol without one has been followed throughout
+    """
+
+    def __init__(self):
+        self.bars: Dict[str, LiveBar] = {}
+        self.states: Dict[str, IndicatorState] = {}
+        self.followed: Dict[str, int] = {}
+
+    def follow(self, symbols: Iterable[str], since: int):
+        """Every trade of these symbols from `since` on will be added"""
+        for symbol in symbols:
+            self.followed[symbol] = since
+
+    def add(self, trade: Trade) -> Optional[LiveBar]:
+        """
+        Fold a trade into its symbol's bar. The first trade of a later
+        session starts a new bar, complete when the symbol was followed
+        from before the session opened; trades from an earlier session are
+        dropped (returns None).
+        """
+        date = session_date(trade.time)
+        bar = self.bars.get(trade.symbol)
+        if bar is None or date > bar.date:
+            complete = self.followed.get(trade.symbol, 0) <= session_open(date)
+            bar = self.bars[trade.symbol] = LiveBar(trade, date, complete)
+        elif date < bar.date:
+            return None
+        bar.add(trade)
+        return bar
+
+    def drop(self, symbol: str):
+        self.bars.pop(symbol, None)
+        self.states.pop(symbol, None)
+        self.followed.pop(symbol, None)
+
+    def interrupt(self, since: int):
+        """Trades before `since` may have been missed: every bar starts over, incomplete"""
+        self.bars.clear()
+        self.follow(list(self.followed), since)
+
+    def live_columns(self, bar: LiveBar) -> dict:
+        """
+        LIVE_COLUMNS for the bar, all None for a bar missing part of its
+        session or without a saved state from before it
+        """
+        state = self.states.get(bar.symbol)
+        if not bar.complete or state is None or bar.date <= state.date:
+            return NO_LIVE_COLUMNS
+        benchmark = self.bars.get(BENCHMARK_SYMBOL)
+        benchmark_close = benchmark.close if benchmark is not None and benchmark.date == bar.date else None
+        # advance replaces the state's fields and windows rather than mutating them, so a shallow copy will do
+        row = advance(replace(state), bar.as_row(), benchmark_close)
+        return {name: row[name] for name in LIVE_COLUMNS}
+
+    def payload(self, bar: LiveBar) -> bytes:
+        return orjson.dumps({**bar.to_dict(), **self.live_columns(bar)})
+
+
+# Yielded by a feed after it reconnected: trades of the interruption were missed
+RECONNECTED = {"event": "reconnected"}
+
+
+def _read_states(symbols: List[str]) -> Dict[str, IndicatorState]:
+    with get_db_connection() as conn:
+        return load_states(conn, symbols)
+
+
+class EODHDFeed:
+    """
+    The EODHD US trade WebSocket, reconnecting with backoff and
+    resubscribing after a reconnect (announced by yielding RECONNECTED)
+    """
+
+    def __init__(self, url: str, token: str):
+        self.url = url
+        self.token = token
+        self.symbols: Set[str] = set()
+        self._ws = None
+
+    def clock(self) -> int:
+        """Now, in the epoch milliseconds of trade times"""
+        return int(time.time() * 1000)
+
+    async def _send(self, action: str, symbols: Iterable[str]):
+        if self._ws is not None:
+            await self._ws.send(orjson.dumps({"action": action, "symbols": ",".join(sorted(symbols))}).decode())
+
+    async def subscribe(self, symbols: List[str]):
+        self.symbols.update(symbols)
+        await self._send("subscribe", symbols)
+
+    async def unsubscribe(self, symbols: List[str]):
+        self.symbols.difference_update(symbols)
+        await self._send("unsubscribe", symbols)
+
+    async def messages(self):
+        import websockets
+
+        delay, connected = RETRY_DELAY, False
+        while True:
+            try:
+                async with websockets.connect(f"{self.url}?api_token={self.token}") as ws:
+                    self._ws = ws
+                    delay = RETRY_DELAY
+                    if self.symbols:
+                        await self._send("subscribe", self.symbols)
+                    if connected:
+                        yield RECONNECTED
+                    connected = True
+                    async for raw in ws:
+                        yield orjson.loads(raw)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.warning(f"Realtime feed disconnected: {e}; reconnecting in {delay}s")
+            finally:
+                self._ws = None
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, MAX_RETRY_DELAY)
+
+
+class ReplayFeed:
+    """
+    Recorded trade messages played back like the live feed: nothing flows
+    until the first subscription, then the messages of subscribed symbols
+    follow at `speed` times their recorded pace (0: no pauses).
+    """
+
+    def __init__(self, path: str, speed: float = 0.0):
+        self.path = path
+        self.speed = speed
+        self.symbols: Set[str] = set()
+        self._subscribed = asyncio.Event()
+        self._clock = 0
+
+    def clock(self) -> int:
+        """Time of the latest recorded message played back (0 before the replay starts)"""
+        return self._clock
+
+    async def subscribe(self, symbols: List[str]):
+        self.symbols.update(symbols)
+        self._subscribed.set()
+
+    async def unsubscribe(self, symbols: List[str]):
+        self.symbols.difference_update(symbols)
+
+    async def messages(self):
+        await self._subscribed.wait()
+        previous = None
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                message = orjson.loads(line)
+                time = message.get("t")
+                if self.speed > 0 and previous is not None and time is not None:
+                    await asyncio.sleep(max(0, time - previous) / 1000 / self.speed)
+                else:
+                    # Let the rest of the loop run between messages
+                    await asyncio.sleep(0)
+                if time is not None:
+                    previous = self._clock = time
+                if str(message.get("s", "")).upper() in self.symbols:
+                    yield message
+        logging.info(f"Replay of {self.path} finished")
+
+
+class Watchlist:
+    """A client's named set of symbols and the live screens it follows for them"""
+
+    __slots__ = ("symbols", "screens")
+
+    def __init__(self, symbols: Iterable[str], screens: Iterable[str]):
+        self.symbols = frozenset(symbols)
+        self.screens = frozenset(screens)
+
+
+class Client:
+    """
+    One dashboard connection: the symbols it watches, its watchlists, its
+    not yet sent bars (newest per symbol) and screen events (in order per
+    watchlist, the latest MAX_PENDING_EVENTS of them)
+    """
+
+    __slots__ = ("symbols", "watchlists", "pending", "events", "dropped_events", "ready")
+
+    def __init__(self):
+        self.symbols: Set[str] = set()
+        self.watchlists: Dict[str, Watchlist] = {}
+        self.pending: Dict[str, bytes] = {}
+        self.events: Dict[str, Deque[bytes]] = {}
+        self.dropped_events = 0
+        self.ready = asyncio.Event()
+
+    def push(self, symbol: str, payload: bytes):
+        self.pending[symbol] = payload
+        self.ready.set()
+
+    def push_event(self, watchlist: str, payload: bytes):
+        events = self.events.get(watchlist)
+        if events is None:
+            events = self.events[watchlist] = deque(maxlen=MAX_PENDING_EVENTS)
+        elif len(events) == MAX_PENDING_EVENTS:
+            self.dropped_events += 1
+        events.append(payload)
+        self.ready.set()
+
+    async def next_messages(self) -> List[str]:
+        """
+        Wait for updates and take them all: one {"type": "screens"} message
+        per watchlist with events, then one {"type": "bars"} message
+        """
+        await self.ready.wait()
+        self.ready.clear()
+        pending, self.pending = self.pending, {}
+        events, self.events = self.events, {}
+        # Events first: they are the time-critical part, and a bar sent after them already reflects them
+        messages = [
+            b'{"type":"screens","watchlist":' + orjson.dumps(name) + b',"events":[' + b",".join(payloads) + b"]}"
+            for name, payloads in events.items()
+        ]
+        if pending:
+            messages.append(b'{"type":"bars","bars":[' + b",".join(pending.values()) + b"]}")
+        return [message.decode() for message in messages]
+
+
+class RealtimeHub:
+    """Fans the bars built from one upstream feed out to the clients watching them"""
+
+    def __init__(self):
+        self.feed = None
+        self._reset()
+
+    def _reset(self):
+        self.aggregator = BarAggregator()
+        self.screener = LiveScreener()
+        self.watchers: Dict[str, Set[Client]] = {}
+        # Clients with a watchlist holding the symbol
+        self.listeners: Dict[str, Set[Client]] = {}
+        self.clients: Set[Client] = set()
+        self.upstream: Set[str] = set()
+        self._dirty: Set[str] = set()
+        self._stale: Set[str] = set()
+        self._tasks: List[asyncio.Task] = []
+        self._trades = 0
+        self._updates = 0
+        self._events = 0
+
+    @property
+    def running(self) -> bool:
+        return self.feed is not None
+
+    async def start(self, feed, interval: float = REALTIME_INTERVAL):
+        self._reset()
+        self.feed = feed
+        self._tasks = [asyncio.create_task(self._consume()), asyncio.create_task(self._publish(interval))]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self.feed = None
+        self._reset()
+
+    def connect(self) -> Client:
+        client = Client()
+        self.clients.add(client)
+        return client
+
+    async def disconnect(self, client: Client):
+        self.clients.discard(client)
+        for name in list(client.watchlists):
+            self._remove_watchlist(client, name)
+        await self.unsubscribe(client, list(client.symbols))
+
+    async def subscribe(self, client: Client, symbols: List[str]):
+        """Watch symbols; their current bars are sent right away"""
+        for symbol in symbols:
+            self.watchers.setdefault(symbol, set()).add(client)
+            client.symbols.add(symbol)
+            bar = self.aggregator.bars.get(symbol)
+            if bar is not None:
+                client.push(symbol, self.aggregator.payload(bar))
+        await self._sync_upstream()
+
+    async def unsubscribe(self, client: Client, symbols: List[str]):
+        for symbol in symbols:
+            client.symbols.discard(symbol)
+            client.pending.pop(symbol, None)
+            watchers = self.watchers.get(symbol)
+            if watchers is not None:
+                watchers.discard(client)
+                if not watchers:
+                    del self.watchers[symbol]
+        await self._sync_upstream()
+
+    async def watch(self, client: Client, name: str, symbols: List[str], screens: List[str]):
+        """
+        Follow live screen entries and exits of symbols as watchlist `name`
+        (replacing a watchlist of that name). Current members are sent
+        right away as entries.
+        """
+        self._remove_watchlist(client, name)
+        watchlist = client.watchlists[name] = Watchlist(symbols, screens)
+        for symbol in watchlist.symbols:
+            self.listeners.setdefault(symbol, set()).add(client)
+        for screen in LIVE_SCREENS:
+            if screen not in watchlist.screens:
+                continue
+            for symbol in self.screener.screen_members(screen):
+                bar = self.aggregator.bars.get(symbol)
+                if symbol in watchlist.symbols and bar is not None:
+                    client.push_event(name, orjson.dumps({
+                        "screen": screen, "symbol": symbol, "date": bar.date, "entered": True,
+                        "price": bar.close, "time": bar.time,
+                    }))
+                    self._events += 1
+        await self._sync_upstream()
+
+    async def unwatch(self, client: Client, name: str):
+        self._remove_watchlist(client, name)
+        await self._sync_upstream()
+
+    def _remove_watchlist(self, client: Client, name: str):
+        watchlist = client.watchlists.pop(name, None)
+        client.events.pop(name, None)
+        if watchlist is None:
+            return
+        for symbol in watchlist.symbols:
+            if any(symbol in other.symbols for other in client.watchlists.values()):
+                continue
+            listeners = self.listeners.get(symbol)
+            if listeners is not None:
+                listeners.discard(client)
+                if not listeners:
+                    del self.listeners[symbol]
+
+    def _notify(self, events: List[dict]):
+        """Hand live screen events to the watchlists following their symbol and screen"""
+        for event in events:
+            symbol, screen = event["symbol"], event["screen"]
+            payload = None
+            for client in self.listeners.get(symbol, ()):
+                for name, watchlist in client.watchlists.items():
+                    if symbol in watchlist.symbols and screen in watchlist.screens:
+                        payload = payload or orjson.dumps(event)
+                        client.push_event(name, payload)
+                        self._events += 1
+
+    async def _sync_upstream(self):
+        """Subscribe upstream to exactly the watched symbols, plus the RS benchmark while anything is watched"""
+        wanted = set(self.watchers) | set(self.listeners)
+        if wanted:
+            wanted.add(BENCHMARK_SYMBOL)
+        added, removed = wanted - self.upstream, self.upstream - wanted
+        self.upstream = wanted
+        if removed:
+            # A bar missing the trades of an unwatched stretch would be wrong, so it starts over
+            for symbol in removed:
+                self.aggregator.drop(symbol)
+                self.screener.drop(symbol)
+            await self.feed.unsubscribe(sorted(removed))
+        if added:
+            self.aggregator.follow(added, self.feed.clock())
+            await self.feed.subscribe(sorted(added))
+
+    def _interrupt(self):
+        """The feed missed trades: every bar starts over, and live screen members leave"""
+        for symbol, bar in self.aggregator.bars.items():
+            self._notify(self.screener.exits(bar))
+            self.screener.drop(symbol)
+        self.aggregator.interrupt(self.feed.clock())
+
+    def _add(self, message: dict):
+        if message is RECONNECTED:
+            self._interrupt()
+            return
+        trade = parse_trade(message)
+        if trade is None or trade.symbol not in self.upstream:
+            return
+        self._trades += 1
+        previous = self.aggregator.bars.get(trade.symbol)
+        bar = self.aggregator.add(trade)
+        if bar is None:
+            return
+        if bar is not previous:
+            # New session: the nightly update has moved the saved state on since
+            self.screener.drop(trade.symbol)
+            self._stale.add(trade.symbol)
+        else:
+            events = self.screener.check(bar)
+            if events:
+                self._notify(events)
+        self._dirty.add(trade.symbol)
+
+    async def _consume(self):
+        """Fold the feed's trades into the bars, restarting the feed with backoff when it fails"""
+        delay = RETRY_DELAY
+        while True:
+            try:
+                async for message in self.feed.messages():
+                    delay = RETRY_DELAY
+                    try:
+                        self._add(message)
+                    except Exception as e:
+                        logging.error(f"Error handling realtime message {message}: {e}")
+                logging.info("Realtime feed ended")
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Realtime feed failed: {e}; restarting in {delay}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, MAX_RETRY_DELAY)
+            self._interrupt()
+
+    async def _publish(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if self._stale:
+                    stale, self._stale = sorted(self._stale), set()
+                    states = await run_in_db_thread(_read_states, stale)
+                    self.aggregator.states.update(states)
+                    for symbol, state in states.items():
+                        bar = self.aggregator.bars.get(symbol)
+                        if bar is not None:
+                            self._dirty.add(symbol)
+                            self._notify(self.screener.load(state, bar))
+                self.flush()
+            except Exception as e:
+                logging.error(f"Error publishing realtime bars: {e}")
+
+    def flush(self):
+        """Hand every dirty bar, serialized once, to the clients watching it"""
+        dirty, self._dirty = self._dirty, set()
+        for symbol in dirty:
+            watchers = self.watchers.get(symbol)
+            bar = self.aggregator.bars.get(symbol)
+            if not watchers or bar is None:
+                continue
+            payload = self.aggregator.payload(bar)
+            for client in watchers:
+                client.push(symbol, payload)
+            self._updates += len(watchers)
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "clients": len(self.clients),
+            "watched_symbols": len(self.watchers),
+            "upstream_symbols": len(self.upstream),
+            "bars": len(self.aggregator.bars),
+            "trades": self._trades,
+            "updates": self._updates,
+            "watchlists": sum(len(client.watchlists) for client in self.clients),
+            "screen_events": self._events,
+            "dropped_screen_events": sum(client.dropped_events for client in self.clients),
+        }
+
+
+realtime_hub = RealtimeHub()
+
+
+def feed_from_env():
+    """The feed REALTIME_FEED selects, or None when it is not set"""
+    if not REALTIME_FEED:
+        return None
+    if REALTIME_FEED == "eodhd":
+        url, token = os.getenv("EODHD_WS_URL", ""), os.getenv("EODHD_API_TOKEN", "")
+        if not url or not token:
+            raise ValueError("REALTIME_FEED=eodhd needs EODHD_WS_URL and EODHD_API_TOKEN")
+        return EODHDFeed(url, token)
+    return ReplayFeed(REALTIME_FEED, REALTIME_REPLAY_SPEED)
+
+
+async def start_realtime() -> bool:
+    """Start the hub on the configured feed (application startup). Returns whether one is configured."""
+    feed = feed_from_env()
+    if feed is None:
+        return False
+    await realtime_hub.start(feed)
+    return True
+
+
+async def stop_realtime():
+    if realtime_hub.running:
+        await realtime_hub.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded trades and print the bars they build")
+    parser.add_argument("path", help="Recorded trade messages, one JSON object per line")
+    parser.add_argument("symbols", nargs="+", help="Symbols to aggregate")
+    args = parser.parse_args()
+
+    async def replay():
+        feed = ReplayFeed(args.path)
+        aggregator = BarAggregator()
+        await feed.subscribe([symbol.upper() for symbol in args.symbols])
+        async for message in feed.messages():
+            trade = parse_trade(message)
+            if trade is not None:
+                aggregator.add(trade)
+        return aggregator
+
+    logging.basicConfig(level=logging.INFO)
+    aggregator = asyncio.run(replay())
+    for symbol in sorted(aggregator.bars):
+        print(orjson.dumps(aggregator.bars[symbol].to_dict()).decode())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Weekly and monthly OHLCV bars resampled from stock_data_daily.
+
+A period is a calendar week (starting Monday) or month, labelled with its
+start date. open is the first daily open in the period, close the last daily
+close, high/low the extremes and volume the sum. ema_21/ema_200 are the
+daily EMAs sampled at the period's last bar.
+
+Bars are aggregated in SQL on demand, or read from the stock_data_rollup
+table when ROLLUPS_ENABLED (the default). Writers keep the rollups current
+by calling refresh_rollups for the symbols and dates they touch, the same
+way they call refresh_prev_close. A rollup row always covers every daily bar
+in its period, so for an as_of/end inside a period that period is
+re-aggregated from the daily bars up to that date.
+"""
+
+import os
+import sqlite3
+from datetime import date as Date, timedelta
+from typing import List, Optional
+
+from database import SYMBOL_ID, get_db_connection
+from price_data import PriceWindow
+
+ROLLUPS_ENABLED = os.getenv("ROLLUPS_ENABLED", "1") != "0"
+
+# SQLite expression giving the start of the period containing `date`
+PERIOD_EXPRESSIONS = {
+    "1w": "date(date, 'weekday 0', '-6 days')",
+    "1mo": "date(date, 'start of month')",
+}
+INTERVALS = ("1d",) + tuple(PERIOD_EXPRESSIONS)
+
+# Aggregates the daily rows matching {where} into one row per symbol and period
+AGGREGATE_QUERY = """
+SELECT symbol_id, period AS date, MAX(date) AS last_date,
+       MAX(CASE WHEN is_first = 1 THEN open END) AS open,
+       MAX(high) AS high,
+       MIN(low) AS low,
+       MAX(CASE WHEN is_last = 1 THEN close END) AS close,
+       SUM(volume) AS volume,
+       COUNT(*) AS bars
+FROM (
+    SELECT symbol_id, date, open, high, low, close, volume, period,
+           ROW_NUMBER() OVER (PARTITION BY symbol_id, period ORDER BY date) AS is_first,
+           ROW_NUMBER() OVER (PARTITION BY symbol_id, period ORDER BY date DESC) AS is_last
+    FROM (SELECT symbol_id, date, open, high, low, close, volume, {period} AS period
+          FROM stock_data_daily WHERE {where})
+)
+GROUP BY symbol_id, period
+"""
+
+# Period bars with the daily EMAs at each period's last bar, newest first
+BARS_QUERY = """
+SELECT a.date AS time, a.open, a.high, a.low, a.close, a.volume, d.ema_21, d.ema_200, a.last_date
+FROM ({source}) AS a
+LEFT JOIN stock_data_daily AS d ON d.symbol_id = a.symbol_id AND d.date = a.last_date
+ORDER BY a.date DESC
+"""
+
+ROLLUP_SOURCE = f"""
+SELECT symbol_id, date, last_date, open, high, low, close, volume
+FROM stock_data_rollup WHERE symbol_id = {SYMBOL_ID} AND interval = ?
+"""
+
+
+def period_start(day: str, interval: str) -> str:
+    """Python counterpart of PERIOD_EXPRESSIONS"""
+    d = Date.fromisoformat(day)
+    if interval == "1w":
+        d -= timedelta(days=d.weekday())
+    else:
+        d = d.replace(day=1)
+    return d.isoformat()
+
+
+def _aggregate(conn: sqlite3.Connection, symbol: str, interval: str, lower: Optional[str],
+               upper: Optional[str], limit: Optional[int]) -> List[dict]:
+    where, params = f"symbol_id = {SYMBOL_ID}", [symbol]
+    if lower is not None:
+        where += " AND date >= ?"
+        params.append(lower)
+    if upper is not None:
+        where += " AND date <= ?"
+        params.append(upper)
+    query = BARS_QUERY.format(source=AGGREGATE_QUERY.format(period=PERIOD_EXPRESSIONS[interval], where=where))
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+    return [dict(row) for row in conn.execute(query, params)]
+
+
+def _from_rollups(conn: sqlite3.Connection, symbol: str, interval: str, lower: Optional[str],
+                  upper: Optional[str], limit: Optional[int]) -> List[dict]:
+    source, params = ROLLUP_SOURCE, [symbol, interval]
+    if lower is not None:
+        source += " AND date >= ?"
+        params.append(lower)
+    if upper is not None:
+        source += " AND date <= ?"
+        params.append(upper)
+    query = BARS_QUERY.format(source=source)
+    if limit is not None:
+        # One spare row in case the newest period has no bars up to `upper`
+        query += " LIMIT ?"
+        params.append(limit + 1)
+    rows = [dict(row) for row in conn.execute(query, params)]
+    if rows and upper is not None and rows[0]["last_date"] > upper:
+        rows[:1] = _aggregate(conn, symbol, interval, rows[0]["time"], upper, 1)
+    return rows if limit is None else rows[:limit]
+
+
+def fetch_resampled(symbol: str, interval: str, window: PriceWindow) -> List[dict]:
+    """
+    Period bars for one symbol within `window`, oldest first, shaped like the
+    daily price-data rows. A period is included whole when it contains any
+    bar on or after `start`, and only with its bars up to the upper bound.
+    """
+    lower = period_start(window.start, interval) if window.start is not None else None
+    fetch = _from_rollups if ROLLUPS_ENABLED else _aggregate
+    with get_db_connection() as conn:
+        rows = fetch(conn, symbol, interval, lower, window.upper, window.bars)
+    rows.reverse()
+    for row in rows:
+        del row["last_date"]
+    return rows
+
+
+def refresh_rollups(conn: sqlite3.Connection, symbol: Optional[str] = None, since: Optional[str] = None) -> int:
+    """
+    Re-aggregate stock_data_rollup from the daily bars.
+
+    With no arguments every period is rebuilt. With a symbol (and optionally
+    a date) only that symbol's periods from the one containing `since`
+    onwards are rewritten. A no-op when ROLLUPS_ENABLED is off. Does not
+    commit. Returns the number of rollup rows written.
+    """
+    if not ROLLUPS_ENABLED:
+        return 0
+    written = 0
+    for interval, period in PERIOD_EXPRESSIONS.items():
+        where, params = "1", []
+        if symbol is not None:
+            where, params = f"symbol_id = {SYMBOL_ID}", [symbol]
+            if since is not None:
+                where += " AND date >= ?"
+                params.append(period_start(since, interval))
+        cursor = conn.execute(f"""
+        INSERT OR REPLACE INTO stock_data_rollup (symbol_id, interval, date, last_date, open, high, low, close, volume, bars)
+        SELECT symbol_id, ?, date, last_date, open, high, low, close, volume, bars
+        FROM ({AGGREGATE_QUERY.format(period=period, where=where)})
+        """, [interval] + params)
+        written += cursor.rowcount
+    return written
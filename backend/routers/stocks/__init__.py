@@ -9,6 +9,16 @@ from .get_new_signals import router as get_new_signals_router
 from .get_swing_high_cross import router as get_swing_high_cross_router
 from .get_swing_low_cross import router as get_swing_low_cross_router
 from .get_price_data import router as get_price_data_router
+from .get_price_data_batch import router as get_price_data_batch_router
+from .get_export import router as get_export_router
+from .get_screens import router as get_screens_router
+from .get_quotes import router as get_quotes_router
+from .get_rs_rank import router as get_rs_rank_router
+from .get_backtest import router as get_backtest_router
+from .get_scan import router as get_scan_router
+from .get_breadth import router as get_breadth_router
+from .get_market_hours import router as get_market_hours_router
+from .ws_realtime import router as ws_realtime_router
 
 router = APIRouter()
 
@@ -22,3 +32,13 @@ router.include_router(get_new_signals_router)
 router.include_router(get_swing_high_cross_router)
 router.include_router(get_swing_low_cross_router)
 router.include_router(get_price_data_router)
+router.include_router(get_price_data_batch_router)
+router.include_router(get_export_router)
+router.include_router(get_screens_router)
+router.include_router(get_quotes_router)
+router.include_router(get_rs_rank_router)
+router.include_router(get_backtest_router)
+router.include_router(get_scan_router)
+router.include_router(get_breadth_router)
+router.include_router(get_market_hours_router)
+router.include_router(ws_realtime_router)
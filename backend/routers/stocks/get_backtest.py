@@ -0,0 +1,98 @@
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from datetime import datetime
+from functools import partial
+import asyncio
+import logging
+import database
+from backtest import BACKTEST_MAX_CONCURRENT, DEFAULT_HOLD, DEFAULT_HORIZONS, MAX_HORIZON, run_backtest, shared_pool
+from cache import result_cache
+from database import get_data_versions, run_in_db_thread
+from http_cache import conditional_response
+from models import BacktestResponse
+from screens import MAX_DEFINITION_LENGTH, SCREENS, ScreenError, resolve_screen
+from serialization import json_response
+
+router = APIRouter()
+
+MAX_SYMBOLS = 500
+# Seconds a client is asked to wait when every backtest slot is taken
+RETRY_AFTER = 5
+
+# Backtests running at once; they share the worker pool, so more would only queue behind each other
+_running = asyncio.Semaphore(BACKTEST_MAX_CONCURRENT)
+
+
+@router.get("/backtest", response_model=BacktestResponse)
+async def get_backtest(
+    request: Request,
+    response: Response,
+    screen: str = Query(..., max_length=MAX_DEFINITION_LENGTH,
+                        description=f"Screen whose matches are entries: {', '.join(SCREENS)} or a screen definition"),
+    start: str = Query(..., description="First entry date (YYYY-MM-DD)"),
+    end: str = Query(..., description="Last entry date (YYYY-MM-DD)"),
+    horizons: str = Query(",".join(map(str, DEFAULT_HORIZONS)),
+                          description=f"Comma-separated forward return horizons in sessions (1-{MAX_HORIZON})"),
+    hold: int = Query(DEFAULT_HOLD, ge=1, le=MAX_HORIZON, description="Sessions each entry is held in the equity curve"),
+    symbols: str = Query(None, description=f"Comma-separated symbols (at most {MAX_SYMBOLS}); default the whole universe")
+):
+    """
+    Backtest a screen: every row passing it from start to end is an entry at
+    that day's close. Returns forward return statistics per horizon and the
+    equity curve of holding each entry for `hold` sessions.
+
+    Responds 503 with Retry-After when BACKTEST_MAX_CONCURRENT backtests are
+    already running (cached reports are still served).
+    """
+    try:
+        try:
+            datetime.strptime(start, "%Y-%m-%d")
+            datetime.strptime(end, "%Y-%m-%d")
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+        if start > end:
+            raise HTTPException(status_code=400, detail="start must not be after end")
+        try:
+            # Built-in screens keep their id; definitions are normalized for the cache key
+            screen = screen if screen in SCREENS else resolve_screen(screen).definition
+        except ScreenError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid screen: {e}")
+        try:
+            periods = sorted({int(h) for h in horizons.split(",") if h.strip()})
+        except ValueError:
+            raise HTTPException(status_code=400, detail="horizons must be comma-separated integers")
+        if not periods or periods[0] < 1 or periods[-1] > MAX_HORIZON:
+            raise HTTPException(status_code=400, detail=f"horizons must be between 1 and {MAX_HORIZON}")
+        requested = None
+        if symbols is not None:
+            requested = sorted({s.strip().upper() for s in symbols.split(",") if s.strip()})
+            if not requested or len(requested) > MAX_SYMBOLS:
+                raise HTTPException(status_code=400, detail=f"Between 1 and {MAX_SYMBOLS} symbols per request")
+
+        params = dict(screen=screen, start=start, horizons=",".join(map(str, periods)), hold=hold,
+                      symbols=",".join(requested) if requested else None)
+        not_modified = await conditional_response(request, response, "backtest", as_of=end, **params)
+        if not_modified:
+            return not_modified
+
+        # A backtest reads many dates, so it is cached against the overall data generation
+        key = ("backtest", end, tuple(sorted(params.items())))
+        version = (await run_in_db_thread(get_data_versions)).generation
+        found, report = result_cache.get(key, version)
+        if not found:
+            if _running.locked():
+                raise HTTPException(status_code=503, detail="Too many backtests running, retry later",
+                                    headers={"Retry-After": str(RETRY_AFTER)})
+            async with _running:
+                report = await run_in_db_thread(partial(
+                    run_backtest, database.DATABASE_PATH, screen, start, end, periods, hold, requested,
+                    pool=shared_pool()
+                ))
+            result_cache.put(key, report, version)
+        if report["sessions"] == 0:
+            raise HTTPException(status_code=404, detail=f"No data between {start} and {end}")
+        return json_response(report, response)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error running backtest: {e}")
+        raise HTTPException(status_code=500, detail="Error running backtest")
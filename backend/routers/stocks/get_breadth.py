@@ -0,0 +1,45 @@
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from typing import List
+import logging
+from breadth import breadth_series
+from database import run_in_db_thread
+from http_cache import conditional_response
+from models import BreadthPoint
+from screener import validate_date
+from serialization import json_response
+
+router = APIRouter()
+
+
+@router.get("/breadth", response_model=List[BreadthPoint])
+async def get_breadth(
+    request: Request,
+    response: Response,
+    start: str = Query(None, description="First date (YYYY-MM-DD); default the earliest"),
+    end: str = Query(None, description="Last date (YYYY-MM-DD); default the latest")
+):
+    """
+    Market breadth from start to end, oldest first: new 63/252-day highs and
+    lows, gap ups and downs, the share of symbols above their 50/200-day EMA
+    and new buy/sell signals for every date.
+    """
+    try:
+        for day in (start, end):
+            if day is not None:
+                validate_date(day)
+        if start is not None and end is not None and start > end:
+            raise HTTPException(status_code=400, detail="start must not be after end")
+
+        not_modified = await conditional_response(request, response, "breadth", as_of=end, start=start)
+        if not_modified:
+            return not_modified
+
+        series = await run_in_db_thread(breadth_series, start, end)
+        if not series:
+            raise HTTPException(status_code=404, detail="No breadth data in the requested range")
+        return json_response(series, response)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error fetching breadth: {e}")
+        raise HTTPException(status_code=500, detail="Error fetching breadth")
@@ -0,0 +1,105 @@
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, List, Optional
+import csv
+import io
+import logging
+from database import SYMBOL_COLUMNS, stream_query_async
+from http_cache import conditional_response
+from models import StockDataDaily
+from price_data import validate_date
+from serialization import dumps
+
+router = APIRouter()
+
+EXPORT_COLUMNS = tuple(StockDataDaily.model_fields)
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+# Symbol metadata lives in the symbols table, everything else in stock_data_daily
+EXPORT_SYMBOL_COLUMNS = set(SYMBOL_COLUMNS) | {"exchange"}
+
+
+def _qualified(column: str) -> str:
+    return f"s.{column}" if column in EXPORT_SYMBOL_COLUMNS else f"d.{column}"
+
+
+async def _encode(batches: AsyncIterator[List[dict]], columns: List[str], format: str) -> AsyncIterator[bytes]:
+    """One chunk per fetched batch: NDJSON lines, or CSV after a header row"""
+    if format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        async for rows in batches:
+            writer.writerows([row[column] for column in columns] for row in rows)
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode()
+    else:
+        async for rows in batches:
+            yield b"".join(dumps(row) + b"\n" for row in rows)
+
+
+@router.get("/export")
+async def export_stock_data(
+    request: Request,
+    response: Response,
+    symbols: Optional[str] = Query(None, description="Comma-separated symbols. If not set, export every symbol."),
+    start: Optional[str] = Query(None, description="First date to include (YYYY-MM-DD)"),
+    end: Optional[str] = Query(None, description="Last date to include (YYYY-MM-DD)"),
+    columns: Optional[str] = Query(None, description="Comma-separated stock_data_daily columns. If not set, export all."),
+    format: str = Query("ndjson", description="ndjson (one JSON object per line) or csv")
+):
+    """
+    Stream stock_data_daily rows ordered by symbol and date.
+    Rows are read from the database in batches and written out as they arrive,
+    so memory stays flat for full-universe and full-history exports.
+    """
+    try:
+        start = validate_date(start, "start")
+        end = validate_date(end, "end")
+        if format not in EXPORT_MEDIA_TYPES:
+            raise HTTPException(status_code=400, detail="format must be ndjson or csv")
+        if columns:
+            selected = list(dict.fromkeys(c.strip() for c in columns.split(",") if c.strip()))
+            unknown = [c for c in selected if c not in EXPORT_COLUMNS]
+            if unknown:
+                raise HTTPException(status_code=400, detail=f"Unknown columns: {', '.join(unknown)}")
+        else:
+            selected = list(EXPORT_COLUMNS)
+        requested = list(dict.fromkeys(s.strip().upper() for s in symbols.split(",") if s.strip())) if symbols else []
+
+        not_modified = await conditional_response(
+            request, response, "export", as_of=end, symbols=",".join(requested),
+            start=start, end=end, columns=",".join(selected), format=format
+        )
+        if not_modified:
+            return not_modified
+
+        conditions, params = [], []
+        if requested:
+            conditions.append(f"s.symbol IN ({', '.join('?' * len(requested))})")
+            params.extend(requested)
+        if start is not None:
+            conditions.append("d.date >= ?")
+            params.append(start)
+        if end is not None:
+            conditions.append("d.date <= ?")
+            params.append(end)
+        query = (f"SELECT {', '.join(_qualified(c) for c in selected)} "
+                 "FROM symbols s JOIN stock_data_daily d ON d.symbol_id = s.symbol_id")
+        if conditions:
+            query += f" WHERE {' AND '.join(conditions)}"
+        # symbols is walked through its unique symbol index and each symbol's
+        # bars through the (symbol_id, date) primary key, so no sort step is needed
+        query += " ORDER BY s.symbol, d.date"
+
+        headers = dict(response.headers)
+        headers["Content-Disposition"] = f'attachment; filename="stock_data_daily.{format}"'
+        return StreamingResponse(_encode(stream_query_async(query, tuple(params)), selected, format),
+                                 media_type=EXPORT_MEDIA_TYPES[format], headers=headers)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error exporting stock data: {e}")
+        raise HTTPException(status_code=500, detail="Error exporting stock data")
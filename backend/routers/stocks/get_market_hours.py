@@ -0,0 +1,50 @@
+from fastapi import APIRouter, HTTPException, Response
+import asyncio
+import logging
+import os
+import time
+import urllib.request
+import orjson
+from serialization import json_response
+
+router = APIRouter()
+
+EXCHANGE_DETAILS_URL = "https://eodhd.com/api/exchange-details/{exchange}?api_token={token}&fmt=json"
+EXCHANGE_CODE = os.getenv("EODHD_EXCHANGE_CODE", "US")
+# Sessions and holidays change rarely; browsers may keep them for an hour
+CACHE_SECONDS = 24 * 60 * 60
+MAX_AGE = 60 * 60
+
+# (fetched at, exchange details)
+_cached = (0.0, None)
+
+
+def fetch_exchange_details(exchange: str, token: str) -> dict:
+    """EODHD exchange details (trading hours, timezone, holidays). Blocking."""
+    with urllib.request.urlopen(EXCHANGE_DETAILS_URL.format(exchange=exchange, token=token), timeout=10) as reply:
+        return orjson.loads(reply.read())
+
+
+@router.get("/market-hours")
+async def get_market_hours(response: Response):
+    """
+    Trading sessions, timezone and holidays of the exchange, as EODHD's
+    exchange details. Fetched with the server's EODHD_API_TOKEN and kept for
+    a day, so browsers never hold the token.
+    """
+    global _cached
+    token = os.getenv("EODHD_API_TOKEN", "")
+    if not token:
+        raise HTTPException(status_code=503, detail="Market hours are not configured")
+    fetched, details = _cached
+    if details is None or time.time() - fetched > CACHE_SECONDS:
+        try:
+            details = await asyncio.to_thread(fetch_exchange_details, EXCHANGE_CODE, token)
+        except Exception as e:
+            logging.error(f"Error fetching exchange details: {e}")
+            if details is None:
+                raise HTTPException(status_code=502, detail="Error fetching market hours")
+        else:
+            _cached = (time.time(), details)
+    response.headers["Cache-Control"] = f"public, max-age={MAX_AGE}"
+    return json_response(details, response)
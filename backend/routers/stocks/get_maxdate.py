@@ -1,13 +1,21 @@
-from fastapi import APIRouter, HTTPException
-from database import execute_query
+from fastapi import APIRouter, HTTPException, Request, Response
+from database import SYMBOL_ID, execute_query_async
+from http_cache import conditional_response
+from latest_session import latest_date
 
 router = APIRouter()
 
 @router.get("/maxdate", response_model=str)
-async def get_maxdate():
+async def get_maxdate(request: Request, response: Response):
     try:
-        query = "SELECT MAX(date) as max_date FROM stock_data_daily WHERE symbol = 'SPY'"
-        results = execute_query(query)
+        not_modified = await conditional_response(request, response, "maxdate")
+        if not_modified:
+            return not_modified
+        max_date = await latest_date("SPY")
+        if max_date is not None:
+            return max_date
+        query = f"SELECT MAX(date) as max_date FROM stock_data_daily WHERE symbol_id = {SYMBOL_ID}"
+        results = await execute_query_async(query, ("SPY",))
         if not results or not results[0]["max_date"]:
             raise HTTPException(status_code=404, detail="No date found for SPY")
         return results[0]["max_date"]
@@ -1,8 +1,13 @@
-from fastapi import APIRouter, HTTPException, Query
-from datetime import datetime, timedelta
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 from typing import List, Optional
 import logging
-from database import execute_query
+from database import execute_query_async, run_in_db_thread
+from http_cache import conditional_response
+from price_data import BINARY_LAYOUT, DOWNSAMPLED_BAR_LAYOUT, LINE_LAYOUT, MAX_BARS, PRICE_COLUMNS, PriceWindow
+from resample import INTERVALS, fetch_resampled
+from downsample import LINE_COLUMNS, OHLCV_COLUMNS, downsample_rows
+from serialization import (BINARY_MEDIA_TYPE, COLUMNS_MEDIA_TYPE, concat_packed, encoded_response, dumps,
+                           json_response, pack_columns, to_columns)
 from pydantic import BaseModel
 
 router = APIRouter()
@@ -17,30 +22,95 @@ class CandlestickData(BaseModel):
     ema_21: Optional[float] = None
     ema_200: Optional[float] = None
 
+FORMATS = ("rows", "columns", "binary")
+
+
+def _negotiate_format(format: Optional[str], accept: str) -> str:
+    """An explicit format parameter wins; otherwise pick from the Accept header"""
+    if format is not None:
+        if format not in FORMATS:
+            raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(FORMATS)}")
+        return format
+    if BINARY_MEDIA_TYPE in accept:
+        return "binary"
+    if COLUMNS_MEDIA_TYPE in accept:
+        return "columns"
+    return "rows"
+
+
 @router.get("/price-data/{symbol}", response_model=List[CandlestickData])
 async def get_price_data(
+    request: Request,
+    response: Response,
     symbol: str,
-    days: int = Query(default=90, description="Number of days of data to return", ge=1)
+    bars: Optional[int] = Query(default=None, description="Number of trading bars to return, ending at the upper bound", ge=1, le=MAX_BARS),
+    start: Optional[str] = Query(default=None, description="First date to include (YYYY-MM-DD)"),
+    end: Optional[str] = Query(default=None, description="Last date to include (YYYY-MM-DD)"),
+    as_of: Optional[str] = Query(default=None, description="Return data as it stood on this date (YYYY-MM-DD)"),
+    days: Optional[int] = Query(default=None, description="Calendar days back from the last available bar, not from today (legacy; prefer bars)", ge=1),
+    interval: str = Query(default="1d", description="Bar size: 1d (daily), 1w (weekly) or 1mo (monthly)"),
+    max_points: Optional[int] = Query(default=None, description="Downsample to at most this many bars for display (values above MAX_BARS are clamped to it)", ge=10),
+    format: Optional[str] = Query(default=None, description="rows (default), columns (parallel JSON arrays) or binary (packed columns)")
 ):
     """
     Get OHLCV price data for a specific symbol
     Returns data in format compatible with TradingView Lightweight Charts
-    If requested days exceed available data, returns all available data
+
+    The window ends at the latest bar on or before min(end, as_of) and covers
+    the last `bars` trading bars, everything from `start`, or `days` calendar
+    days back from that last bar (see price_data.PriceWindow). Without bars,
+    start or days the last 90 bars are returned. If fewer bars exist, returns
+    all available data.
+
+    Changed from earlier versions: `days` used to count back from today's
+    date and defaulted to 90, so a stale database or a holiday returned fewer
+    bars or none. It now counts back from the last bar on or before the
+    upper bound, and the default window is the last 90 trading bars rather
+    than 90 calendar days.
+
+    interval=1w or 1mo returns weekly or monthly bars resampled on the server
+    (see resample.py); `bars` then counts periods. max_points caps the number
+    of bars returned by merging neighbouring bars into min/max OHLC buckets,
+    and the points of each EMA by LTTB (see downsample.py). A max_points
+    above MAX_BARS is treated as MAX_BARS. With max_points the payload is
+    {"bars": [{time, open, high, low, close, volume}], "lines": {"ema_21":
+    [{time, value}], "ema_200": [...]}}, each line point at its own bar's date.
+
+    The payload is an array of bars by default. format=columns (or Accept:
+    application/vnd.columns+json) returns {column: [values...]}, and
+    format=binary (or Accept: application/octet-stream) returns the columns
+    packed as in BINARY_LAYOUT after an 8-byte "COL1" + uint32 count header.
+    Downsampled, format=columns turns the bars and each line into columns,
+    and format=binary packs the bars as in DOWNSAMPLED_BAR_LAYOUT followed by
+    each line as in LINE_LAYOUT, every buffer with its own header and padded
+    to a multiple of 8 bytes.
     """
     try:
-        # Calculate the start date based on days parameter
-        end_date = datetime.now().date()
-        start_date = end_date - timedelta(days=days)
-        
-        query = """
-        SELECT date, open, high, low, close, volume, ema_21, ema_200
-        FROM stock_data_daily
-        WHERE symbol = ? AND date >= ? AND date <= ?
-        ORDER BY date ASC
-        """
-        
-        params = (symbol.upper(), start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'))
-        results = execute_query(query, params)
+        symbol = symbol.upper()
+        window = PriceWindow(bars, start, end, as_of, days)
+        if interval not in INTERVALS:
+            raise HTTPException(status_code=400, detail=f"interval must be one of: {', '.join(INTERVALS)}")
+        if interval != "1d" and days is not None:
+            raise HTTPException(status_code=400, detail="days is only supported for daily bars; use bars or start")
+        format = _negotiate_format(format, request.headers.get("accept", ""))
+        # A chart may ask for one bar per pixel; no window holds more than MAX_BARS bars
+        if max_points is not None:
+            max_points = min(max_points, MAX_BARS)
+
+        response.headers["Vary"] = "Accept"
+        not_modified = await conditional_response(
+            request, response, "price-data", as_of=window.upper,
+            symbol=symbol, format=format, interval=interval, max_points=max_points, **window.cache_params()
+        )
+        if not_modified:
+            not_modified.headers["Vary"] = "Accept"
+            return not_modified
+
+        if interval == "1d":
+            query, params = window.query(symbol)
+            results = await execute_query_async(query, tuple(params))
+        else:
+            results = await run_in_db_thread(fetch_resampled, symbol, interval, window)
         
         if not results:
             raise HTTPException(
@@ -48,21 +118,24 @@ async def get_price_data(
                 detail=f"No price data found for symbol {symbol}"
             )
         
-        # Convert to CandlestickData format
-        candlestick_data = []
-        for row in results:
-            candlestick_data.append(CandlestickData(
-                time=row['date'],
-                open=float(row['open']),
-                high=float(row['high']),
-                low=float(row['low']),
-                close=float(row['close']),
-                volume=int(row['volume']),
-                ema_21=float(row['ema_21']) if row['ema_21'] is not None else None,
-                ema_200=float(row['ema_200']) if row['ema_200'] is not None else None
-            ))
-        
-        return candlestick_data
+        if max_points is not None:
+            sampled = downsample_rows(results, max_points)
+            bars, lines = sampled["bars"], sampled["lines"]
+            if format == "binary":
+                body = concat_packed([pack_columns(bars, DOWNSAMPLED_BAR_LAYOUT)] +
+                                     [pack_columns(lines[name], LINE_LAYOUT) for name in LINE_COLUMNS])
+                return encoded_response(body, BINARY_MEDIA_TYPE, response)
+            if format == "columns":
+                columns = {"bars": to_columns(bars, OHLCV_COLUMNS),
+                           "lines": {name: to_columns(points, ("time", "value")) for name, points in lines.items()}}
+                return encoded_response(dumps(columns), COLUMNS_MEDIA_TYPE, response)
+            return json_response(sampled, response)
+
+        if format == "binary":
+            return encoded_response(pack_columns(results, BINARY_LAYOUT), BINARY_MEDIA_TYPE, response)
+        if format == "columns":
+            return encoded_response(dumps(to_columns(results, PRICE_COLUMNS)), COLUMNS_MEDIA_TYPE, response)
+        return json_response(results, response)
         
     except HTTPException:
         raise
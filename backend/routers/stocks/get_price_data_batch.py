@@ -0,0 +1,92 @@
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, Dict, List, Optional
+import logging
+from database import stream_query_async
+from http_cache import conditional_response
+from price_data import MAX_BARS, PRICE_COLUMNS, PriceWindow
+from serialization import dumps, to_columns
+from .get_price_data import CandlestickData
+
+router = APIRouter()
+
+# Each symbol is one term of a UNION ALL; SQLite allows 500 by default
+MAX_SYMBOLS = 200
+BATCH_FORMATS = ("rows", "columns")
+
+
+async def _stream_series(first: List[dict], batches: AsyncIterator[List[dict]],
+                         symbols: List[str], format: str) -> AsyncIterator[bytes]:
+    """
+    Emit {"SYMBOL": series, ...} one symbol per chunk as the cursor reaches the
+    next symbol; symbols without data are left out.
+    """
+    async def rows():
+        yield first
+        async for batch in batches:
+            yield batch
+
+    def encode(position: int, bars: List[dict]) -> bytes:
+        series = to_columns(bars, PRICE_COLUMNS) if format == "columns" else bars
+        return dumps(symbols[position]) + b":" + dumps(series)
+
+    yield b"{"
+    current, bars, separator = None, [], b""
+    async for batch in rows():
+        for row in batch:
+            if row["position"] != current:
+                if bars:
+                    yield separator + encode(current, bars)
+                    separator = b","
+                current, bars = row["position"], []
+            bars.append({column: row[column] for column in PRICE_COLUMNS})
+    if bars:
+        yield separator + encode(current, bars)
+    yield b"}"
+
+
+@router.get("/price-data", response_model=Dict[str, List[CandlestickData]])
+async def get_price_data_batch(
+    request: Request,
+    response: Response,
+    symbols: str = Query(..., description=f"Comma-separated symbols (at most {MAX_SYMBOLS})"),
+    bars: Optional[int] = Query(default=None, description="Number of trading bars per symbol, ending at the upper bound", ge=1, le=MAX_BARS),
+    start: Optional[str] = Query(default=None, description="First date to include (YYYY-MM-DD)"),
+    end: Optional[str] = Query(default=None, description="Last date to include (YYYY-MM-DD)"),
+    as_of: Optional[str] = Query(default=None, description="Return data as it stood on this date (YYYY-MM-DD)"),
+    format: str = Query(default="rows", description="rows (array of bars per symbol) or columns (parallel arrays per symbol)")
+):
+    """
+    Get OHLCV price data for several symbols from one query on one connection.
+    Returns {symbol: series} in request order, streamed from the cursor one symbol at a time,
+    with the same window rules and series shapes as /price-data/{symbol}.
+    """
+    try:
+        requested = list(dict.fromkeys(s.strip().upper() for s in symbols.split(",") if s.strip()))
+        if not requested:
+            raise HTTPException(status_code=400, detail="At least one symbol is required")
+        if len(requested) > MAX_SYMBOLS:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_SYMBOLS} symbols per request")
+        if format not in BATCH_FORMATS:
+            raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(BATCH_FORMATS)}")
+        window = PriceWindow(bars, start, end, as_of)
+
+        not_modified = await conditional_response(
+            request, response, "price-data-batch", as_of=window.upper,
+            symbols=",".join(requested), format=format, **window.cache_params()
+        )
+        if not_modified:
+            return not_modified
+
+        query, params = window.batch_query(requested)
+        batches = stream_query_async(query, tuple(params))
+        first = await anext(batches, [])
+        if not first:
+            raise HTTPException(status_code=404, detail="No price data found for the requested symbols")
+        return StreamingResponse(_stream_series(first, batches, requested, format),
+                                 media_type="application/json", headers=dict(response.headers))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error fetching batch price data: {e}")
+        raise HTTPException(status_code=500, detail="Error fetching price data")
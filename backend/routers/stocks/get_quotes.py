@@ -0,0 +1,56 @@
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from typing import List
+import logging
+from database import execute_query_async
+from http_cache import conditional_response
+from latest_session import QUOTE_COLUMNS, latest_quotes
+from models import QuoteResponse
+from serialization import json_response
+
+router = APIRouter()
+
+MAX_SYMBOLS = 500
+
+
+@router.get("/quotes", response_model=List[QuoteResponse])
+async def get_quotes(
+    request: Request,
+    response: Response,
+    symbols: str = Query(..., description=f"Comma-separated symbols (at most {MAX_SYMBOLS})")
+):
+    """
+    Latest bar of each symbol, in the order requested; unknown symbols are left out.
+    Symbols that traded in the latest sessions are answered from memory,
+    the rest from each symbol's newest row in the database.
+    """
+    try:
+        requested = list(dict.fromkeys(s.strip().upper() for s in symbols.split(",") if s.strip()))
+        if not requested:
+            raise HTTPException(status_code=400, detail="At least one symbol is required")
+        if len(requested) > MAX_SYMBOLS:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_SYMBOLS} symbols per request")
+        not_modified = await conditional_response(request, response, "quotes", symbols=",".join(requested))
+        if not_modified:
+            return not_modified
+
+        quotes = await latest_quotes(requested)
+        missing = [symbol for symbol in requested if symbol not in quotes]
+        if missing:
+            query = f"""
+            SELECT s.symbol, s.type, d.date, {", ".join(f"d.{c}" for c in QUOTE_COLUMNS)}
+            FROM symbols s
+            JOIN stock_data_daily d ON d.symbol_id = s.symbol_id
+                AND d.date = (SELECT MAX(date) FROM stock_data_daily WHERE symbol_id = s.symbol_id)
+            WHERE s.symbol IN ({", ".join("?" for _ in missing)})
+            """
+            for row in await execute_query_async(query, tuple(missing)):
+                quotes[row["symbol"]] = row
+        results = [quotes[symbol] for symbol in requested if symbol in quotes]
+        if not results:
+            raise HTTPException(status_code=404, detail="No quotes found for the requested symbols")
+        return json_response(results, response)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error fetching quotes: {e}")
+        raise HTTPException(status_code=500, detail="Error fetching quotes")
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Query, Request, Response
+from typing import List
+from models import SymbolWithPriceResponse
+from screener import screen_response
+from screens import rs_leaderboard
+
+router = APIRouter()
+
+@router.get("/rs-rank", response_model=List[SymbolWithPriceResponse])
+async def get_rs_rank(
+    request: Request,
+    response: Response,
+    date: str = Query(..., description="Date to rank (YYYY-MM-DD)"),
+    min_rank: int = Query(1, ge=1, le=99, description="Lowest rs_rank to include (1-99)"),
+    limit: int = Query(None, description="Maximum number of records to return. If not set, return all.")
+):
+    """
+    RS leaderboard: every symbol with an rs_rank of at least min_rank on the date,
+    strongest relative strength first.
+    """
+    return await screen_response(
+        request, response, "rs-rank", rs_leaderboard(min_rank), date, limit,
+        not_found=f"No ranked symbols found for {date}", error="Error fetching RS ranks", min_rank=min_rank,
+    )
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from typing import List
+from models import SymbolWithPriceResponse
+from screener import screen_response, validate_date
+from screens import MAX_DEFINITION_LENGTH, ScreenError, resolve_screen
+
+router = APIRouter()
+
+@router.get("/scan", response_model=List[SymbolWithPriceResponse])
+async def get_scan(
+    request: Request,
+    response: Response,
+    date: str = Query(..., description="Date to scan (YYYY-MM-DD)"),
+    screen: str = Query(..., max_length=MAX_DEFINITION_LENGTH,
+                        description="A screen id, or a definition such as 'is_gap_up = 1 AND rsi_14 < 70 ORDER BY rs DESC'"),
+    limit: int = Query(None, description="Maximum number of records to return. If not set, return all.")
+):
+    """
+    Members of a built-in screen or of a screen defined in the request (see screens.py
+    for the language), sorted like the built-in screeners.
+    """
+    validate_date(date)
+    try:
+        compiled = resolve_screen(screen)
+    except ScreenError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid screen: {e}")
+    return await screen_response(
+        request, response, "scan", compiled, date, limit,
+        not_found=f"No matches found for {date}", error="Error running scan", definition=compiled.definition,
+    )
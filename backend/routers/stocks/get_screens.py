@@ -0,0 +1,69 @@
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from datetime import datetime
+import logging
+from cache import cached_query
+from http_cache import conditional_response
+from latest_session import get_session
+from models import ScreensResponse
+from serialization import json_response
+from screens import SCREENS, evaluate_screens, screen_columns
+
+router = APIRouter()
+
+@router.get("/screens", response_model=ScreensResponse)
+async def get_screens(
+    request: Request,
+    response: Response,
+    date: str = Query(..., description="Date to evaluate the screens for (YYYY-MM-DD)"),
+    screens: str = Query(None, description="Comma-separated screen ids (e.g. 'gapup,new-highs-63'). If not set, return all."),
+    limit: int = Query(None, description="Maximum number of members per screen. If not set, return all.")
+):
+    """
+    Evaluate several screens (watchlists) for one date from a single scan of that day's rows.
+    Each screen reports its total match count and its members sorted the same way as its own endpoint.
+    """
+    try:
+        try:
+            datetime.strptime(date, "%Y-%m-%d")
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+        if screens:
+            ids = [s.strip() for s in screens.split(",") if s.strip()]
+            unknown = [s for s in ids if s not in SCREENS]
+            if unknown:
+                raise HTTPException(status_code=400, detail=f"Unknown screens: {', '.join(unknown)}")
+        else:
+            ids = list(SCREENS)
+        selected = [SCREENS[s] for s in dict.fromkeys(ids)]
+        not_modified = await conditional_response(request, response, "screens", date, screens=",".join(s.id for s in selected), limit=limit)
+        if not_modified:
+            return not_modified
+        session = await get_session(date)
+        if session is not None:
+            return json_response({"date": date, "screens": session.evaluate(selected, limit)}, response)
+        # One scan of the day's rows serves every screen; it is cached per date with all columns any screen needs
+        columns = screen_columns(SCREENS.values())
+        query = f"""
+        SELECT 
+            s.symbol, 
+            s.type, 
+            d.close as last_price,
+            d.prev_close,
+            d.price_change,
+            d.percent_change,
+            d.rs_rank,
+            {", ".join(f"d.{c}" for c in columns)}
+        FROM stock_data_daily d
+        JOIN symbols s ON s.symbol_id = d.symbol_id
+        WHERE d.date = ?
+        ORDER BY d.symbol_id
+        """
+        rows = await cached_query("screens", date, query, (date,))
+        if not rows:
+            raise HTTPException(status_code=404, detail=f"No data found for {date}")
+        return json_response({"date": date, "screens": evaluate_screens(rows, selected, limit)}, response)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error evaluating screens: {e}")
+        raise HTTPException(status_code=500, detail="Error evaluating screens")
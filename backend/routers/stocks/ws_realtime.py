@@ -0,0 +1,109 @@
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+import asyncio
+import logging
+import orjson
+from live_screens import LIVE_SCREENS
+from realtime import MAX_CLIENT_SYMBOLS, Client, realtime_hub
+
+router = APIRouter()
+
+
+def _names(value, field: str) -> list:
+    if isinstance(value, str):
+        value = value.split(",")
+    if not isinstance(value, list):
+        raise ValueError(f"{field} must be a list or a comma-separated string")
+    return sorted({str(s).strip() for s in value if str(s).strip()})
+
+
+def _symbols(value) -> list:
+    return sorted({s.upper() for s in _names(value, "symbols")})
+
+
+def _watched(client: Client) -> set:
+    symbols = set(client.symbols)
+    for watchlist in client.watchlists.values():
+        symbols |= watchlist.symbols
+    return symbols
+
+
+async def _send_updates(websocket: WebSocket, client: Client):
+    while True:
+        for message in await client.next_messages():
+            await websocket.send_text(message)
+
+
+async def _receive_actions(websocket: WebSocket, client: Client):
+    while True:
+        try:
+            message = orjson.loads(await websocket.receive_text())
+            action, symbols = message.get("action"), _symbols(message.get("symbols", []))
+            if action == "subscribe":
+                if len(_watched(client) | set(symbols)) > MAX_CLIENT_SYMBOLS:
+                    raise ValueError(f"At most {MAX_CLIENT_SYMBOLS} symbols per connection")
+                await realtime_hub.subscribe(client, symbols)
+            elif action == "unsubscribe":
+                await realtime_hub.unsubscribe(client, symbols)
+            elif action in ("watch", "unwatch"):
+                name = message.get("watchlist")
+                if not isinstance(name, str) or not name:
+                    raise ValueError("watchlist must be a non-empty string")
+                if action == "unwatch":
+                    await realtime_hub.unwatch(client, name)
+                    continue
+                screens = _names(message.get("screens", list(LIVE_SCREENS)), "screens")
+                unknown = sorted(set(screens) - set(LIVE_SCREENS))
+                if unknown:
+                    raise ValueError(f"Not live screens: {', '.join(unknown)}; choose from {', '.join(LIVE_SCREENS)}")
+                others = {s for other, watchlist in client.watchlists.items() if other != name
+                          for s in watchlist.symbols}
+                if len(client.symbols | others | set(symbols)) > MAX_CLIENT_SYMBOLS:
+                    raise ValueError(f"At most {MAX_CLIENT_SYMBOLS} symbols per connection")
+                await realtime_hub.watch(client, name, symbols, screens)
+            else:
+                raise ValueError("action must be subscribe, unsubscribe, watch or unwatch")
+        except (ValueError, AttributeError) as e:
+            await websocket.send_text(orjson.dumps({"type": "error", "detail": str(e)}).decode())
+
+
+@router.websocket("/ws/realtime")
+async def realtime(websocket: WebSocket):
+    """
+    Live bars of the current session. Send {"action": "subscribe" | "unsubscribe",
+    "symbols": "AAPL,MSFT"} (or a list); the bars of watched symbols arrive as
+    {"type": "bars", "bars": [...]}, each with OHLCV, trade count and the live
+    screener columns, at most once per update interval. A bar with
+    "complete": false started after the session opened or lived through a
+    feed interruption; its live screener columns are null.
+
+    Send {"action": "watch", "watchlist": "tech", "symbols": ..., "screens": ...}
+    (screens default to every live screen) to follow live screen entries and
+    exits as {"type": "screens", "watchlist": "tech", "events": [...]}, and
+    {"action": "unwatch", "watchlist": "tech"} to stop.
+    """
+    await websocket.accept()
+    if not realtime_hub.running:
+        await websocket.close(code=1013, reason="Realtime feed is not configured")
+        return
+    client = realtime_hub.connect()
+    receiver = asyncio.create_task(_receive_actions(websocket, client))
+    sender = asyncio.create_task(_send_updates(websocket, client))
+    try:
+        # Either side ending (disconnect or failure) ends the connection
+        await asyncio.wait((receiver, sender), return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        receiver.cancel()
+        sender.cancel()
+        results = await asyncio.gather(receiver, sender, return_exceptions=True)
+        failed = False
+        for task, result in zip(("handling requests", "sending updates"), results):
+            # Cancellation is not an Exception; a disconnect is the normal end
+            if isinstance(result, Exception) and not isinstance(result, WebSocketDisconnect):
+                logging.error(f"Error {task} on realtime connection: {result}")
+                failed = True
+        await realtime_hub.disconnect(client)
+        if failed:
+            try:
+                await websocket.close(code=1011)
+            except Exception:
+                pass  # the connection is already gone
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Cross-sectional relative-strength percentile ranks.
+
+rs (100 * adjusted_close / SPY adjusted_close, see indicators.py) measures a
+symbol against the benchmark; rs_rank places it within the universe on the
+same date, from 1 (weakest) to 99 (strongest):
+
+    rs_rank = 1 + floor(98 * below / (n - 1) + 0.5)
+
+where n is the number of symbols with an rs on that date and `below` how
+many of them have a strictly lower rs, so tied symbols share a rank. Dates
+with fewer than two ranked symbols, and rows without rs, have no rank.
+
+rs and is_rs_52_week_high are time-series indicators and stay with the
+per-symbol panel in indicators.py; ranks need every symbol of a date, so
+they are computed here on a (dates, symbols) rs matrix, a chunk of dates
+at a time, with one sort along the symbol axis. Writers call
+refresh_rs_ranks for the dates whose rs they changed.
+
+Usage:
+    python rs_rank.py                     # rank every date
+    python rs_rank.py --since 2025-06-02  # rank dates from this one on
+"""
+
+import argparse
+import logging
+import sqlite3
+from typing import Optional
+
+import numpy as np
+
+from database import bump_data_versions
+
+RANK_CHUNK_DATES = 250
+
+
+def percentile_ranks(rs: np.ndarray) -> np.ndarray:
+    """rs_rank for a (dates, symbols) rs matrix; NaN where rs is NaN or a date has fewer than two values"""
+    order = np.argsort(rs, axis=1, kind="stable")
+    ordered = np.take_along_axis(rs, order, axis=1)
+    positions = np.broadcast_to(np.arange(rs.shape[1]), rs.shape)
+    # Position of the first of each run of equal values = number of strictly lower values
+    run_start = np.ones(rs.shape, dtype=bool)
+    run_start[:, 1:] = ordered[:, 1:] != ordered[:, :-1]
+    below_sorted = np.maximum.accumulate(np.where(run_start, positions, 0), axis=1)
+    below = np.empty_like(below_sorted)
+    np.put_along_axis(below, order, below_sorted, axis=1)
+
+    counts = np.count_nonzero(~np.isnan(rs), axis=1)[:, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ranks = 1 + np.floor(98 * below / (counts - 1) + 0.5)
+    return np.where(np.isnan(rs) | (counts < 2), np.nan, ranks)
+
+
+def refresh_rs_ranks(conn: sqlite3.Connection, since: Optional[str] = None) -> int:
+    """
+    Recompute rs_rank for every date (or every date from `since` on) and
+    write the ranks that changed, bumping those dates' data versions.
+    Does not commit. Returns the number of rows updated.
+    """
+    query, params = "SELECT DISTINCT date FROM stock_data_daily", []
+    if since is not None:
+        query += " WHERE date >= ?"
+        params.append(since)
+    dates = [row[0] for row in conn.execute(query + " ORDER BY date", params)]
+
+    updated, changed_dates = 0, set()
+    for start in range(0, len(dates), RANK_CHUNK_DATES):
+        chunk = np.array(dates[start:start + RANK_CHUNK_DATES])
+        rows = conn.execute(
+            "SELECT date, symbol_id, rs, rs_rank FROM stock_data_daily WHERE date >= ? AND date <= ?",
+            (chunk[0], chunk[-1]),
+        ).fetchall()
+        date_col, id_col, rs_col, rank_col = zip(*rows)
+        date_index = np.searchsorted(chunk, np.array(date_col))
+        ids, symbol_index = np.unique(np.array(id_col), return_inverse=True)
+        matrix = np.full((len(chunk), len(ids)), np.nan)
+        matrix[date_index, symbol_index] = np.array(rs_col, dtype=np.float64)
+
+        ranks = percentile_ranks(matrix)[date_index, symbol_index]
+        current = np.array(rank_col, dtype=np.float64)
+        changed = np.flatnonzero(~((ranks == current) | (np.isnan(ranks) & np.isnan(current))))
+        conn.executemany(
+            "UPDATE stock_data_daily SET rs_rank = ? WHERE symbol_id = ? AND date = ?",
+            [(None if ranks[i] != ranks[i] else int(ranks[i]), id_col[i], date_col[i]) for i in changed.tolist()],
+        )
+        changed_dates.update(date_col[i] for i in changed.tolist())
+        updated += len(changed)
+    bump_data_versions(conn, changed_dates)
+    return updated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompute cross-sectional RS percentile ranks")
+    parser.add_argument("--since", default=None, help="First date to rank (YYYY-MM-DD); default every date")
+    args = parser.parse_args()
+
+    from database import DATABASE_PATH
+
+    logging.basicConfig(level=logging.INFO)
+    with sqlite3.connect(DATABASE_PATH) as conn:
+        updated = refresh_rs_ranks(conn, args.since)
+        conn.commit()
+    logging.info(f"Updated rs_rank on {updated} rows")
+
+
+if __name__ == "__main__":
+    main()
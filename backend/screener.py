@@ -0,0 +1,53 @@
+"""
+Shared request handling for the screener endpoints.
+
+Every screener answers the same way: validate the date, honour conditional
+requests, take the members from the in-memory latest sessions when the date
+is held, otherwise run the screen's compiled SQL through the result cache.
+Endpoints differ only in which screen they pick and their error texts.
+"""
+
+import logging
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException, Request, Response
+
+from cache import cached_query
+from http_cache import conditional_response
+from latest_session import screen_members
+from screens import Screen
+from serialization import json_response
+
+
+def validate_date(date: str):
+    try:
+        datetime.strptime(date, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+
+
+async def screen_response(request: Request, response: Response, endpoint: str, screen: Screen, date: str,
+                          limit: Optional[int], not_found: str, error: str, **params) -> Response:
+    """
+    Members of `screen` on `date` as a JSON response. `params` are the
+    endpoint's own request parameters, part of its ETag and cache key.
+    Responds 404 with `not_found` when nothing matches and 500 with `error`
+    on failure.
+    """
+    try:
+        validate_date(date)
+        not_modified = await conditional_response(request, response, endpoint, date, **params, limit=limit)
+        if not_modified:
+            return not_modified
+        results = await screen_members(date, screen, limit)
+        if results is None:
+            results = await cached_query(endpoint, date, screen.query, screen.bind(date, limit), **params, limit=limit)
+        if not results:
+            raise HTTPException(status_code=404, detail=not_found)
+        return json_response(results, response)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"{error}: {e}")
+        raise HTTPException(status_code=500, detail=error)
@@ -0,0 +1,347 @@
+"""
+Registry of the dashboard's screens (watchlists) and the screen language.
+
+A screen is a filter over one trading day's stock_data_daily rows plus a
+sort order, written as a small SQL-like expression:
+
+    is_gap_up = 1 AND rsi_14 < 70 AND close > ema_50 ORDER BY rs DESC
+
+    expression   predicate combined with AND, OR, NOT and parentheses
+    predicate    operand (= | != | <> | < | <= | > | >=) operand, or column IS [NOT] NULL
+    operand      a column from SCREEN_COLUMNS or a number; every comparison names a column
+    ORDER BY     one column, ASC or DESC (default DESC); rs DESC when omitted
+
+NULLs follow SQL: a comparison with NULL is unknown, and a row passes only
+when the whole expression is true. Rows sort with NULLs last and ties in
+symbol_id order (descending for descending screens), which is also the
+order of the flag screeners' index scans.
+
+Each screen is parsed and validated once, against an allow-list of columns,
+and compiled to a fixed SQL statement in which every number is a bound
+parameter, so user-defined screens never reach the SQL text and the
+statement is prepared once per pooled connection. The one exception is
+`flag = 1` on a flag with a partial index (indexes.py): that literal stays
+in the SQL so the planner can prove the index applies. The same parsed
+expression is evaluated on NumPy columns for the in-memory latest sessions
+and for /screens, so both give the SQL answer.
+
+The built-in screens use the ids of the frontend sidebar watchlists.
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from indexes import FLAG_COLUMNS as INDEXED_FLAGS
+from indicators import FLAG_COLUMNS, FLOAT_COLUMNS, INT_COLUMNS
+
+# stock_data_daily columns a screen can filter or sort on
+REAL_COLUMNS = ("open", "high", "low", "close", "adjusted_close") + FLOAT_COLUMNS
+INTEGER_COLUMNS = ("volume", "rs_rank") + INT_COLUMNS + FLAG_COLUMNS
+SCREEN_COLUMNS = frozenset(REAL_COLUMNS + INTEGER_COLUMNS)
+
+# Columns returned for each member of a screen
+MEMBER_COLUMNS = ("symbol", "type", "last_price", "prev_close", "price_change", "percent_change", "rs_rank")
+
+MAX_DEFINITION_LENGTH = 1000
+COMPILED_SCREEN_CACHE_SIZE = 256
+
+_TOKEN = re.compile(r"\s*(?:(?P<number>\d+(?:\.\d*)?|\.\d+)|(?P<word>[A-Za-z_]\w*)|(?P<op><=|>=|!=|<>|=|<|>)|(?P<punct>[()-]))")
+_KEYWORDS = {"AND", "OR", "NOT", "IS", "NULL", "ORDER", "BY", "ASC", "DESC"}
+_COMPARISONS = {
+    "=": np.equal, "!=": np.not_equal, "<": np.less, "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal,
+}
+
+
+class ScreenError(ValueError):
+    """A screen definition that does not parse or names an unknown column"""
+
+
+def _tokenize(text: str) -> List[Tuple[str, object]]:
+    tokens, position = [], 0
+    text = text.rstrip()
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if match is None:
+            raise ScreenError(f"Unexpected character at position {position}: {text[position]!r}")
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "number":
+            value = float(value) if "." in value else int(value)
+        elif kind == "word" and value.upper() in _KEYWORDS:
+            kind, value = "keyword", value.upper()
+        elif kind == "word":
+            value = value.lower()
+            if value not in SCREEN_COLUMNS:
+                raise ScreenError(f"Unknown column: {value}")
+        tokens.append((kind, value))
+        position = match.end()
+    return tokens
+
+
+class _Parser:
+    """Recursive descent over the tokens; the expression becomes nested tuples"""
+
+    def __init__(self, text: str):
+        self.tokens = _tokenize(text)
+        self.position = 0
+
+    def peek(self, kind: str, value=None) -> bool:
+        if self.position >= len(self.tokens):
+            return False
+        token_kind, token_value = self.tokens[self.position]
+        return token_kind == kind and (value is None or token_value == value)
+
+    def take(self, kind: str, value=None):
+        if not self.peek(kind, value):
+            found = self.tokens[self.position][1] if self.position < len(self.tokens) else "end of screen"
+            raise ScreenError(f"Expected {value or kind}, found {found}")
+        self.position += 1
+        return self.tokens[self.position - 1][1]
+
+    def screen(self) -> Tuple[Optional[tuple], str, bool]:
+        where = None if self.peek("keyword", "ORDER") or not self.tokens else self.expression()
+        order_by, descending = "rs", True
+        if self.peek("keyword", "ORDER"):
+            self.take("keyword", "ORDER")
+            self.take("keyword", "BY")
+            order_by = self.take("word")
+            if self.peek("keyword", "ASC") or self.peek("keyword", "DESC"):
+                descending = self.take("keyword") == "DESC"
+        if self.position < len(self.tokens):
+            raise ScreenError(f"Unexpected {self.tokens[self.position][1]}")
+        return where, order_by, descending
+
+    def expression(self) -> tuple:
+        terms = [self.conjunction()]
+        while self.peek("keyword", "OR"):
+            self.take("keyword")
+            terms.append(self.conjunction())
+        return terms[0] if len(terms) == 1 else ("or", terms)
+
+    def conjunction(self) -> tuple:
+        factors = [self.factor()]
+        while self.peek("keyword", "AND"):
+            self.take("keyword")
+            factors.append(self.factor())
+        return factors[0] if len(factors) == 1 else ("and", factors)
+
+    def factor(self) -> tuple:
+        if self.peek("keyword", "NOT"):
+            self.take("keyword")
+            return ("not", self.factor())
+        if self.peek("punct", "("):
+            self.take("punct")
+            inner = self.expression()
+            self.take("punct", ")")
+            return inner
+        return self.predicate()
+
+    def operand(self) -> tuple:
+        if self.peek("word"):
+            return ("column", self.take("word"))
+        negative = self.peek("punct", "-")
+        if negative:
+            self.take("punct")
+        value = self.take("number")
+        return ("number", -value if negative else value)
+
+    def predicate(self) -> tuple:
+        left = self.operand()
+        if self.peek("keyword", "IS"):
+            self.take("keyword")
+            negated = self.peek("keyword", "NOT")
+            if negated:
+                self.take("keyword")
+            self.take("keyword", "NULL")
+            if left[0] != "column":
+                raise ScreenError("IS NULL applies to a column")
+            return ("null", left[1], negated)
+        op = self.take("op")
+        right = self.operand()
+        if left[0] != "column" and right[0] != "column":
+            raise ScreenError("A comparison must name a column")
+        return ("compare", "!=" if op == "<>" else op, left, right)
+
+
+def _columns(node: Optional[tuple]) -> set:
+    if node is None:
+        return set()
+    kind = node[0]
+    if kind in ("and", "or"):
+        return set().union(*(_columns(child) for child in node[1]))
+    if kind == "not":
+        return _columns(node[1])
+    if kind == "null":
+        return {node[1]}
+    return {operand[1] for operand in node[2:] if operand[0] == "column"}
+
+
+def _sql(node: tuple, params: list) -> str:
+    """SQL for an expression over `d` (stock_data_daily), appending its numbers to params"""
+    kind = node[0]
+    if kind == "and":
+        return " AND ".join(_sql(child, params) for child in node[1])
+    if kind == "or":
+        # Always grouped, so the condition can follow `d.date = ? AND`
+        return f"({' OR '.join(_sql(child, params) for child in node[1])})"
+    if kind == "not":
+        return f"NOT ({_sql(node[1], params)})"
+    if kind == "null":
+        return f"d.{node[1]} IS {'NOT ' if node[2] else ''}NULL"
+    _, op, left, right = node
+    if op == "=" and left[0] == "column" and left[1] in INDEXED_FLAGS and right == ("number", 1):
+        return f"d.{left[1]} = 1"
+    sides = []
+    for operand in (left, right):
+        if operand[0] == "column":
+            sides.append(f"d.{operand[1]}")
+        else:
+            params.append(operand[1])
+            sides.append("?")
+    return f"{sides[0]} {op} {sides[1]}"
+
+
+def _evaluate(node: tuple, columns: Mapping[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """(true, known) masks of an expression under SQL's three-valued logic; NaN is NULL"""
+    kind = node[0]
+    if kind in ("and", "or"):
+        results = [_evaluate(child, columns) for child in node[1]]
+        values = np.logical_and.reduce([v for v, _ in results]) if kind == "and" else np.logical_or.reduce([v for v, _ in results])
+        all_known = np.logical_and.reduce([k for _, k in results])
+        if kind == "and":
+            # False as soon as any term is known to be false
+            return values, all_known | np.logical_or.reduce([k & ~v for v, k in results])
+        return values, all_known | values
+    if kind == "not":
+        value, known = _evaluate(node[1], columns)
+        return known & ~value, known
+    if kind == "null":
+        missing = np.isnan(columns[node[1]])
+        return (~missing if node[2] else missing), np.ones_like(missing)
+    _, op, left, right = node
+    a, b = (columns[side[1]] if side[0] == "column" else side[1] for side in (left, right))
+    known = ~(np.isnan(a) | np.isnan(b))
+    with np.errstate(invalid="ignore"):
+        return _COMPARISONS[op](a, b) & known, known
+
+
+class Screen:
+    """A named, compiled screen definition"""
+
+    def __init__(self, id: str, name: str, definition: str):
+        if len(definition) > MAX_DEFINITION_LENGTH:
+            raise ScreenError(f"Screen definitions are limited to {MAX_DEFINITION_LENGTH} characters")
+        self.id = id
+        self.name = name
+        self.definition = definition
+        try:
+            self.where, self.order_by, self.descending = _Parser(definition).screen()
+        except RecursionError:
+            raise ScreenError("Screen is nested too deeply")
+        self.columns = sorted(_columns(self.where) | {self.order_by})
+
+        params: list = []
+        self.condition = _sql(self.where, params) if self.where is not None else None
+        self.params = tuple(params)
+        direction = "DESC" if self.descending else "ASC"
+        self.query = f"""
+        SELECT
+            s.symbol,
+            s.type,
+            d.close as last_price,
+            d.prev_close,
+            d.price_change,
+            d.percent_change,
+            d.rs_rank
+        FROM stock_data_daily d
+        JOIN symbols s ON s.symbol_id = d.symbol_id
+        WHERE d.date = ?{f" AND {self.condition}" if self.condition else ""}
+        ORDER BY d.{self.order_by} {direction} NULLS LAST, d.symbol_id {direction}
+        LIMIT ?
+        """
+
+    def bind(self, date: str, limit: Optional[int] = None) -> tuple:
+        """Parameters for `query`; without a limit (or with a negative one, as in SQL) every member"""
+        return (date,) + self.params + (-1 if limit is None else limit,)
+
+    def mask(self, columns: Mapping[str, np.ndarray]) -> np.ndarray:
+        """Rows passing the screen, given float64 columns with NaN for NULL"""
+        if self.where is None:
+            return np.ones(len(columns[self.order_by]), dtype=bool)
+        return _evaluate(self.where, columns)[0]
+
+    def select(self, columns: Mapping[str, np.ndarray]) -> np.ndarray:
+        """
+        Positions of the passing rows, in screen order, for columns in
+        symbol_id order: NULLs of the sort column last, ties as in `query`
+        """
+        index = np.flatnonzero(self.mask(columns))
+        keys = columns[self.order_by]
+        if self.descending:
+            index = index[::-1]
+            return index[np.argsort(-keys[index], kind="stable")]
+        return index[np.argsort(keys[index], kind="stable")]
+
+
+def compile_screen(definition: str) -> Screen:
+    """A user-defined screen, compiled once per distinct definition. Raises ScreenError."""
+    return _compile_screen(" ".join(definition.split()))
+
+
+@lru_cache(maxsize=COMPILED_SCREEN_CACHE_SIZE)
+def _compile_screen(definition: str) -> Screen:
+    return Screen(definition, definition, definition)
+
+
+def resolve_screen(screen: str) -> Screen:
+    """A built-in screen by id, otherwise the screen defined by the text. Raises ScreenError."""
+    return SCREENS.get(screen) or compile_screen(screen)
+
+
+SCREENS: Dict[str, Screen] = {screen.id: screen for screen in (
+    Screen("swing-high-cross-up", "Swing High Cross Up", "swing_high_cross_up = 1"),
+    Screen("swing-high-cross-down", "Swing High Cross Down", "swing_high_cross_down = 1"),
+    Screen("swing-low-cross-down", "Swing Low Cross Down", "swing_low_cross_down = 1"),
+    Screen("swing-low-cross-up", "Swing Low Cross Up", "swing_low_cross_up = 1"),
+    Screen("52-week-rs", "52 Week High RS", "is_rs_52_week_high = 1"),
+    Screen("gapup", "Gap Up", "is_gap_up = 1"),
+    Screen("gapdown", "Gap Down", "is_gap_down = 1 ORDER BY rs ASC"),
+    Screen("new-highs-63", "Three Month High", "is_high_63 = 1"),
+    Screen("new-lows-63", "Three Month Low", "is_low_63 = 1 ORDER BY rs ASC"),
+    Screen("new-highs-252", "One Year High", "is_high_252 = 1"),
+    Screen("new-lows-252", "One Year Low", "is_low_252 = 1 ORDER BY rs ASC"),
+    Screen("new-buys", "New Buys", "signal_change = 1 AND signal = 1"),
+    Screen("new-sells", "New Sells", "signal_change = 1 AND signal = -1"),
+)}
+
+
+def rs_leaderboard(min_rank: int) -> Screen:
+    """Every symbol ranked at least min_rank, by rs; too large to be one of the default screens"""
+    return compile_screen(f"rs_rank >= {int(min_rank)} ORDER BY rs DESC")
+
+
+def screen_columns(screens: Iterable[Screen]) -> List[str]:
+    """Every column the given screens filter or sort on"""
+    return sorted(set().union(*(screen.columns for screen in screens)))
+
+
+def evaluate_screens(rows: List[dict], screens: Iterable[Screen], limit: Optional[int] = None) -> Dict[str, dict]:
+    """Apply each screen to the same rows (in symbol_id order). Returns {screen id: {name, count, members}}."""
+    screens = list(screens)
+    columns = {
+        column: np.array([row[column] for row in rows], dtype=np.float64)
+        for column in screen_columns(screens)
+    }
+    results = {}
+    for screen in screens:
+        matched = screen.select(columns)
+        members = matched if limit is None else matched[:limit]
+        results[screen.id] = {
+            "name": screen.name,
+            "count": len(matched),
+            "members": [{column: rows[i][column] for column in MEMBER_COLUMNS} for i in members.tolist()],
+        }
+    return results
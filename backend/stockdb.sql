@@ -1,9 +1,16 @@
+create table if not exists main.symbols
+(
+    symbol_id integer not null primary key,
+    symbol    text    not null unique,
+    name      text    not null,
+    type      text    not null,
+    exchange  text,
+    interval  text    not null
+);
+
 create table if not exists main.stock_data_daily
 (
-    symbol                text    not null,
-    name                  text    not null,
-    type                  text    not null,
-    interval              text    not null,
+    symbol_id             integer not null references symbols (symbol_id),
     date                  text    not null,
     open                  real    not null,
     high                  real    not null,
@@ -11,6 +18,9 @@ create table if not exists main.stock_data_daily
     close                 real    not null,
     adjusted_close        real    not null,
     volume                integer not null,
+    prev_close            real,
+    price_change          real,
+    percent_change        real,
     avg_volume            real,
     is_swing_high         integer,
     swing_high            real,
@@ -21,6 +31,7 @@ create table if not exists main.stock_data_daily
     swing_low_cross_up    integer,
     swing_low_cross_down  integer,
     rs                    real,
+    rs_rank               integer,
     is_rs_52_week_high    integer,
     atr                   real,
     is_gap_up             integer,
@@ -41,9 +52,72 @@ create table if not exists main.stock_data_daily
     sell_signal           integer,
     signal                integer,
     signal_change         integer,
-    primary key (symbol, date)
+    primary key (symbol_id, date)
 );
 
 create index main.stock_data_daily_date on stock_data_daily (date);
-create index stock_data_daily_symbol_idx on stock_data_daily (symbol);
 
+
+create table if not exists main.indicator_state
+(
+    symbol     text    not null primary key,
+    date       text    not null,
+    bars       integer not null,
+    close      real    not null,
+    high       real    not null,
+    low        real    not null,
+    ema_10     real,
+    ema_21     real,
+    ema_50     real,
+    ema_200    real,
+    avg_gain   real,
+    avg_loss   real,
+    atr        real,
+    swing_high real,
+    swing_low  real,
+    signal     integer,
+    highs      blob    not null,
+    lows       blob    not null,
+    volumes    blob    not null,
+    rs_values  blob    not null
+);
+
+create table if not exists main.data_versions
+(
+    date       text    not null primary key,
+    version    integer not null,
+    updated_at real
+);
+
+create table if not exists main.stock_data_rollup
+(
+    symbol_id integer not null,
+    interval  text    not null,
+    date      text    not null,
+    last_date text    not null,
+    open      real    not null,
+    high      real    not null,
+    low       real    not null,
+    close     real    not null,
+    volume    integer not null,
+    bars      integer not null,
+    primary key (symbol_id, interval, date)
+);
+
+create table if not exists main.market_breadth
+(
+    date           text    not null primary key,
+    symbols        integer not null,
+    new_highs_63   integer not null,
+    new_lows_63    integer not null,
+    new_highs_252  integer not null,
+    new_lows_252   integer not null,
+    gap_ups        integer not null,
+    gap_downs      integer not null,
+    above_ema_50   integer not null,
+    with_ema_50    integer not null,
+    above_ema_200  integer not null,
+    with_ema_200   integer not null,
+    buy_signals    integer not null,
+    sell_signals   integer not null
+);
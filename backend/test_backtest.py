@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Tests for the vectorized backtest: it must agree with a per-trade loop over
+the same rows, whether the symbols are evaluated in one process or several
+"""
+
+import asyncio
+import sqlite3
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+
+import backtest
+import database
+from backtest import run_backtest
+from bulk_load import bulk_load
+from conftest import make_rows
+from main import app
+from routers.stocks import get_backtest
+from screens import resolve_screen
+
+
+@pytest.fixture
+def backtest_db(db_path):
+    database.init_database()
+    rows = []
+    for seed, symbol in enumerate(("SPY", "AAA", "BBB", "CCC")):
+        rows += make_rows(symbol, 300, seed=seed)
+    # A symbol that lists later and skips sessions
+    rows += [row for i, row in enumerate(make_rows("DDD", 200, seed=9, start=date(2020, 4, 1))) if i % 17 != 5]
+    bulk_load(rows, indicators="full")
+    return db_path
+
+
+def reference_backtest(path, screen, start, end, horizons, hold):
+    """Trade-by-trade version of run_backtest"""
+    with sqlite3.connect(path) as conn:
+        calendar = [row[0] for row in conn.execute("SELECT DISTINCT date FROM stock_data_daily ORDER BY date")]
+        rows = conn.execute(f"""
+            SELECT s.symbol, d.date, d.adjusted_close, ({screen.condition}) IS 1
+            FROM stock_data_daily d JOIN symbols s ON s.symbol_id = d.symbol_id
+        """, screen.params).fetchall()
+    position = {day: i for i, day in enumerate(calendar)}
+    prices, trades = {}, []
+    for symbol, day, close, passed in rows:
+        prices.setdefault(symbol, {})[position[day]] = close
+        if start <= day <= end and passed:
+            trades.append((symbol, position[day]))
+
+    returns = {h: [] for h in horizons}
+    for symbol, entered in trades:
+        for h in horizons:
+            later = prices[symbol].get(entered + h)
+            if later is not None:
+                returns[h].append(later / prices[symbol][entered] - 1)
+
+    def last_price(symbol, i):
+        while i >= 0 and i not in prices[symbol]:
+            i -= 1
+        return prices[symbol].get(i)
+
+    equity, curve = 1.0, {}
+    for i in range(len(calendar)):
+        lots = [(symbol, entered) for symbol, entered in trades if entered < i <= entered + hold]
+        moves = []
+        for symbol, _ in lots:
+            before, now = last_price(symbol, i - 1), last_price(symbol, i)
+            moves.append(now / before - 1 if before is not None and now is not None else 0.0)
+        if moves:
+            equity *= 1 + sum(moves) / len(moves)
+        curve[calendar[i]] = (equity, len(lots))
+    return len(trades), returns, curve
+
+
+@pytest.mark.parametrize("screen_id", ["new-buys", "gapup", "new-highs-63", "close > ema_50 AND NOT rsi_14 >= 60"])
+def test_matches_reference(backtest_db, screen_id):
+    start, end, horizons, hold = "2020-02-01", "2020-09-30", [1, 5, 20], 10
+    report = run_backtest(backtest_db, screen_id, start, end, horizons, hold)
+    trades, returns, curve = reference_backtest(backtest_db, resolve_screen(screen_id), start, end, horizons, hold)
+
+    assert report["trades"] == trades > 0
+    for h in horizons:
+        stats = report["forward_returns"][str(h)]
+        assert stats["trades"] == len(returns[h])
+        assert stats["mean"] == pytest.approx(sum(returns[h]) / len(returns[h]), rel=1e-9)
+        assert stats["hit_rate"] == pytest.approx(sum(r > 0 for r in returns[h]) / len(returns[h]))
+        assert stats["worst"] == pytest.approx(min(returns[h]), rel=1e-9)
+    for point in report["equity_curve"]:
+        equity, positions = curve[point["date"]]
+        assert point["positions"] == positions
+        assert point["equity"] == pytest.approx(equity, rel=1e-9)
+    peak, drawdown = 0.0, 0.0
+    for point in report["equity_curve"]:
+        peak = max(peak, point["equity"])
+        drawdown = max(drawdown, 1 - point["equity"] / peak)
+    assert report["max_drawdown"] == pytest.approx(drawdown)
+
+
+def test_worker_processes_match_one_process(backtest_db):
+    serial = run_backtest(backtest_db, "new-sells", "2020-01-01", "2020-12-31", chunk_symbols=2)
+    parallel = run_backtest(backtest_db, "new-sells", "2020-01-01", "2020-12-31", chunk_symbols=2, workers=2)
+    assert parallel == serial
+
+
+def test_shared_pool_matches_one_process(backtest_db, monkeypatch):
+    monkeypatch.setattr(backtest, "BACKTEST_WORKERS", 2)
+    try:
+        pool = backtest.shared_pool()
+        assert backtest.shared_pool() is pool
+        shared = run_backtest(backtest_db, "new-buys", "2020-01-01", "2020-12-31", chunk_symbols=2, pool=pool)
+    finally:
+        backtest.close_shared_pool()
+    assert shared == run_backtest(backtest_db, "new-buys", "2020-01-01", "2020-12-31", chunk_symbols=2)
+
+
+def test_backtest_endpoint_saturated(backtest_db, monkeypatch):
+    url = "/backtest?screen=gapup&start=2020-01-01&end=2020-12-31"
+    with TestClient(app) as client:
+        assert client.get(url).status_code == 200
+        monkeypatch.setattr(get_backtest, "_running", asyncio.Semaphore(0))
+        busy = client.get(url.replace("gapup", "gapdown"))
+        assert busy.status_code == 503 and busy.headers["retry-after"] == str(get_backtest.RETRY_AFTER)
+        # A cached report needs no slot
+        assert client.get(url).status_code == 200
+
+
+def test_backtest_endpoint(backtest_db):
+    with TestClient(app) as client:
+        response = client.get("/backtest?screen=new-buys&start=2020-01-01&end=2020-12-31&horizons=5,1&symbols=aaa,bbb")
+        assert response.status_code == 200
+        report = response.json()
+        assert report["horizons"] == [1, 5] and report["symbols"] == 2
+        assert report == run_backtest(backtest_db, "new-buys", "2020-01-01", "2020-12-31", [1, 5], symbols=["AAA", "BBB"])
+
+        cached = client.get(response.request.url, headers={"If-None-Match": response.headers["etag"]})
+        assert cached.status_code == 304
+        assert client.get("/backtest?screen=nope&start=2020-01-01&end=2020-12-31").status_code == 400
+        assert client.get("/backtest?screen=gapup&start=2020-01-01&end=2020-12-31&horizons=0").status_code == 400
+        assert client.get("/backtest?screen=gapup&start=2030-01-01&end=2030-12-31").status_code == 404
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Tests for market breadth: the materialized table, the inline aggregate and a
+per-row count agree, and writers keep the table current
+"""
+
+import sqlite3
+from datetime import date
+
+import pytest
+
+import breadth
+import database
+from breadth import breadth_series
+from conftest import make_rows
+
+SYMBOLS = ("SPY", "AAA", "BBB", "CCC", "DDD")
+
+
+def reference_breadth():
+    """Breadth counted row by row"""
+    with sqlite3.connect(database.DATABASE_PATH) as conn:
+        conn.row_factory = sqlite3.Row
+        rows = conn.execute("SELECT * FROM stock_data_daily ORDER BY date").fetchall()
+    series = {}
+    for row in rows:
+        point = series.setdefault(row["date"], dict.fromkeys(breadth.COUNT_COLUMNS, 0))
+        point["symbols"] += 1
+        for field, flag in (("new_highs_63", "is_high_63"), ("new_lows_63", "is_low_63"),
+                            ("new_highs_252", "is_high_252"), ("new_lows_252", "is_low_252"),
+                            ("gap_ups", "is_gap_up"), ("gap_downs", "is_gap_down"),
+                            ("buy_signals", "buy_signal"), ("sell_signals", "sell_signal")):
+            point[field] += bool(row[flag])
+        for period in (50, 200):
+            if row[f"ema_{period}"] is not None:
+                point[f"with_ema_{period}"] += 1
+                point[f"above_ema_{period}"] += row["close"] > row[f"ema_{period}"]
+    return series
+
+
+def test_series_matches_reference(client, monkeypatch):
+    series = breadth_series()
+    expected = reference_breadth()
+    assert [point["date"] for point in series] == sorted(expected)
+    for point in series:
+        counts = expected[point["date"]]
+        for field in ("symbols", "new_highs_63", "new_lows_252", "gap_ups", "gap_downs", "buy_signals", "sell_signals"):
+            assert point[field] == counts[field], field
+        assert point["net_new_highs_63"] == counts["new_highs_63"] - counts["new_lows_63"]
+        assert point["net_signals"] == counts["buy_signals"] - counts["sell_signals"]
+        if counts["with_ema_200"]:
+            assert point["pct_above_ema_200"] == pytest.approx(100 * counts["above_ema_200"] / counts["with_ema_200"])
+        else:
+            assert point["pct_above_ema_200"] is None
+    assert any(point["new_highs_63"] for point in series) and any(point["buy_signals"] for point in series)
+
+    # The inline aggregate serves the same series as the table
+    monkeypatch.setattr(breadth, "BREADTH_ENABLED", False)
+    assert breadth_series() == series
+    assert breadth_series("2020-03-02", "2020-04-30") == [p for p in series if "2020-03-02" <= p["date"] <= "2020-04-30"]
+
+
+def test_writes_refresh_breadth(client):
+    latest = client.get("/maxdate").json()
+    before = breadth_series(latest, latest)[0]
+    database.upsert_stock_data(make_rows("ZZZ", 1, seed=42, start=date.fromisoformat(latest)))
+    assert breadth_series(latest, latest)[0]["symbols"] == before["symbols"] + 1
+
+
+def test_rebuild_revalidates_responses(client):
+    response = client.get("/breadth?start=2020-06-01")
+    # A rebuild on its own, as `python breadth.py --since` runs it
+    with sqlite3.connect(database.DATABASE_PATH) as conn:
+        conn.execute("UPDATE stock_data_daily SET is_gap_up = 1 - COALESCE(is_gap_up, 0) WHERE date = '2020-06-15'")
+        breadth.refresh_breadth(conn, "2020-06-01")
+        conn.commit()
+    revalidated = client.get(response.request.url, headers={"If-None-Match": response.headers["etag"]})
+    assert revalidated.status_code == 200
+    assert revalidated.json() == breadth_series("2020-06-01") != response.json()
+
+
+def test_breadth_endpoint(client):
+    response = client.get("/breadth?start=2020-06-01&end=2020-06-30")
+    assert response.status_code == 200
+    assert response.json() == breadth_series("2020-06-01", "2020-06-30")
+    cached = client.get(response.request.url, headers={"If-None-Match": response.headers["etag"]})
+    assert cached.status_code == 304
+
+    assert len(client.get("/breadth").json()) == 300
+    assert client.get("/breadth?start=2020-13-01").status_code == 400
+    assert client.get("/breadth?start=2020-06-30&end=2020-06-01").status_code == 400
+    assert client.get("/breadth?start=2030-01-01").status_code == 404
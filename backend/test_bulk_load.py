@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Tests for the bulk loader: vendor header aliases, idempotent reruns, index
+rebuilds after a full reload and the incremental indicator mode
+"""
+
+import csv
+import json
+import sqlite3
+
+import database
+from bulk_load import bulk_load, iter_file_rows
+from conftest import make_rows
+from indicators import DERIVED_COLUMNS
+
+
+def _indexes(path):
+    with sqlite3.connect(path) as conn:
+        return sorted(conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = 'stock_data_daily' AND sql IS NOT NULL"
+        ))
+
+
+def test_file_aliases(tmp_path):
+    with open(tmp_path / "AAPL.US.csv", "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Date", "Open", "High", "Low", "Close", "Adj_Close", "Volume"])
+        writer.writerow(["2024-01-02", "10", "11", "9", "10.5", "10.4", "1000"])
+        writer.writerow(["2024-01-03", "10.5", "12", "10", "11.5", "", "2000"])
+    with open(tmp_path / "mixed.ndjson", "w") as f:
+        f.write(json.dumps({"Ticker": "msft", "date": "2024-01-02", "open": 1, "high": 2, "low": 1, "close": 2,
+                            "AdjClose": 1.9, "volume": 5}) + "\n\n")
+        f.write(json.dumps({"code": "IBM", "name": "IBM Corp", "date": "2024-01-02", "open": 1, "high": 2,
+                            "low": 1, "close": 2, "volume": 5}) + "\n")
+
+    csv_rows = list(iter_file_rows(str(tmp_path / "AAPL.US.csv")))
+    assert [(r["symbol"], r["name"], r["adjusted_close"]) for r in csv_rows] == [("AAPL", "AAPL", "10.4"), ("AAPL", "AAPL", "11.5")]
+    ndjson_rows = list(iter_file_rows(str(tmp_path / "mixed.ndjson")))
+    assert [(r["symbol"], r["name"], r["adjusted_close"]) for r in ndjson_rows] == [("MSFT", "msft", 1.9), ("IBM", "IBM Corp", 2)]
+
+
+def test_rerun_upserts(db_path):
+    database.init_database()
+    rows = make_rows("SPY", 30, seed=1) + make_rows("AAA", 30, seed=2)
+    assert bulk_load(rows, batch_size=7, transaction_size=20).rows == 60
+    corrected = [{**row, "close": 1.0} if row["date"] == "2020-01-10" else row for row in rows]
+    bulk_load(corrected, batch_size=7, transaction_size=20)
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM stock_data_daily").fetchone()[0] == 60
+        assert conn.execute("SELECT COUNT(*) FROM stock_data_daily WHERE date = '2020-01-10' AND close = 1.0").fetchone()[0] == 2
+        # The next bar's previous close follows the correction
+        assert conn.execute("SELECT DISTINCT prev_close FROM stock_data_daily WHERE date = '2020-01-11'").fetchall() == [(1.0,)]
+
+
+def test_full_reload_rebuilds_indexes(db_path):
+    database.init_database()
+    before = _indexes(db_path)
+    assert before
+    bulk_load(make_rows("SPY", 40, seed=1), full_reload=True, batch_size=9)
+    assert _indexes(db_path) == before
+
+
+def test_incremental_mode_matches_full_recompute(db_path, tmp_path, monkeypatch):
+    import bulk_load as bulk_load_module
+    import incremental
+
+    bumps = []
+    monkeypatch.setattr(incremental, "bump_data_versions", lambda conn, dates: bumps.append(("incremental", set(dates))))
+    bump = bulk_load_module.bump_data_versions
+    monkeypatch.setattr(bulk_load_module, "bump_data_versions",
+                        lambda conn, dates: bumps.append(("bulk_load", set(dates))) or bump(conn, dates))
+    refresh = bulk_load_module.refresh_breadth
+    monkeypatch.setattr(bulk_load_module, "refresh_breadth",
+                        lambda conn, since: bumps.append(("breadth", since)) or refresh(conn, since))
+    database.init_database()
+    rows = make_rows("SPY", 300, seed=4) + make_rows("AAA", 300, seed=5)
+    history = [r for r in rows if r["date"] < "2020-10-20"]
+    latest = [r for r in rows if r["date"] >= "2020-10-20"]
+    bulk_load(history, indicators="full")
+    # Several days per symbol across batches, committed every other batch
+    bumps.clear()
+    bulk_load(latest, indicators="incremental", batch_size=3, transaction_size=6)
+    # The loaded dates are bumped once, by the loader rather than per batch, after the derived tables
+    assert bumps == [("breadth", "2020-10-20"), ("bulk_load", {r["date"] for r in latest})]
+
+    full_path = str(tmp_path / "full.sqlite")
+    with sqlite3.connect(full_path) as conn:
+        conn.executescript(open("stockdb.sql").read())
+    bulk_load(rows, db_path=full_path, indicators="full")
+
+    query = f"SELECT {', '.join(DERIVED_COLUMNS)} FROM stock_data_daily WHERE date >= '2020-10-20' ORDER BY symbol_id, date"
+    with sqlite3.connect(db_path) as conn, sqlite3.connect(full_path) as full:
+        actual, expected = conn.execute(query).fetchall(), full.execute(query).fetchall()
+    assert len(actual) == len(latest)
+    for want, got in zip(expected, actual):
+        for col, a, b in zip(DERIVED_COLUMNS, want, got):
+            assert (a is None and b is None) or abs(a - b) < 1e-9, col
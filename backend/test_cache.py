@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Tests for the screener result cache: a cached result is served again, a
+write to its date evicts it, and entries are bounded by TTL, count and size
+"""
+
+import sqlite3
+
+import cache
+import database
+from cache import ResultCache, estimate_size, result_cache
+
+SYMBOLS = ("SPY", "AAA", "BBB", "CCC", "DDD", "EEE", "FFF", "GGG")
+BARS = 200
+
+
+def historical_new_high():
+    """A date before the in-memory sessions with a 63-bar new high, and one of its symbols"""
+    with sqlite3.connect(database.DATABASE_PATH) as conn:
+        return conn.execute(
+            "SELECT d.date, s.symbol FROM stock_data_daily d JOIN symbols s USING (symbol_id) "
+            "WHERE d.is_high_63 AND d.date < date((SELECT MAX(date) FROM stock_data_daily), '-5 days') "
+            "ORDER BY d.date DESC LIMIT 1"
+        ).fetchone()
+
+
+def test_cached_result_served_until_its_date_is_written(client, monkeypatch):
+    date, symbol = historical_new_high()
+    url = f"/new-highs?date={date}&period=63"
+    before = result_cache.stats()
+    first = client.get(url)
+    assert first.status_code == 200
+    stats = result_cache.stats()
+    assert stats["entries"] == 1 and stats["misses"] == before["misses"] + 1
+
+    # Served from the cache: no query runs
+    queries = []
+    run_query = cache.execute_query_async
+
+    async def recording_query(query, params):
+        queries.append(params)
+        return await run_query(query, params)
+
+    monkeypatch.setattr(cache, "execute_query_async", recording_query)
+    second = client.get(url)
+    assert second.json() == first.json()
+    assert result_cache.stats()["hits"] == before["hits"] + 1 and queries == []
+
+    # Rewriting a bar of that date bumps its version, so the entry is dropped and the query runs again
+    with sqlite3.connect(database.DATABASE_PATH) as conn:
+        conn.row_factory = sqlite3.Row
+        row = dict(conn.execute(
+            "SELECT d.* FROM stock_data_daily d JOIN symbols s USING (symbol_id) WHERE s.symbol = ? AND d.date = ?",
+            (symbol, date),
+        ).fetchone())
+    # A higher close and high keep the symbol a new high at a new last price
+    high = row["high"] * 1.01
+    row.update(symbol=symbol, name=symbol, type="stock", interval="1day", high=high, close=high, adjusted_close=high)
+    database.upsert_stock_data([row])
+    third = client.get(url)
+    assert third.status_code == 200
+    assert len(queries) == 1
+    stats = result_cache.stats()
+    assert stats["invalidations"] == before["invalidations"] + 1 and stats["entries"] == 1
+    assert next(r for r in third.json() if r["symbol"] == symbol)["last_price"] == high
+
+
+def test_ttl_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    results = ResultCache(max_entries=10, max_bytes=1 << 20, ttl=60)
+    results.put("key", [1], version=3)
+    assert results.get("key", 3) == (True, [1])
+    # A different version is a miss that drops the entry
+    assert results.get("key", 4) == (False, None)
+    assert results.stats()["invalidations"] == 1
+
+    results.put("key", [1], version=3)
+    now[0] += 59
+    assert results.get("key", 3) == (True, [1])
+    now[0] += 2
+    assert results.get("key", 3) == (False, None)
+    assert results.stats()["entries"] == 0
+
+
+def test_lru_bounds():
+    results = ResultCache(max_entries=2, max_bytes=1 << 20, ttl=60)
+    results.put("a", [1], 1)
+    results.put("b", [2], 1)
+    results.get("a", 1)
+    # "b" is the least recently used
+    results.put("c", [3], 1)
+    assert results.get("b", 1) == (False, None)
+    assert results.get("a", 1) == (True, [1]) and results.get("c", 1) == (True, [3])
+    assert results.stats()["evictions"] == 1
+
+    rows = [{"symbol": "AAA", "close": 1.0}] * 10
+    size = estimate_size(rows)
+    results = ResultCache(max_entries=100, max_bytes=2 * size, ttl=60)
+    for key in "abc":
+        results.put(key, rows, 1)
+    stats = results.stats()
+    assert stats["entries"] == 2 and stats["bytes"] <= 2 * size
+    assert results.get("a", 1) == (False, None)
+    # A value larger than the whole budget is not stored
+    results.put("big", rows * 10, 1)
+    assert results.get("big", 1) == (False, None)
@@ -4,7 +4,7 @@ Test script to verify SQLite database connection and basic operations
 """
 
 import sqlite3
-from database import init_database, execute_query, execute_insert
+from database import init_database, execute_query, execute_insert, upsert_stock_data
 from models import StockDataCreate
 
 def test_database_connection():
@@ -17,7 +17,7 @@ def test_database_connection():
         print("✅ Database initialized successfully")
 
         # Test basic query
-        symbols = execute_query("SELECT DISTINCT symbol FROM stock_data_daily LIMIT 5")
+        symbols = execute_query("SELECT symbol FROM symbols ORDER BY symbol LIMIT 5")
         print(f"✅ Query executed successfully. Found {len(symbols)} symbols")
 
         # If we have existing data, show some samples
@@ -44,14 +44,17 @@ def test_database_connection():
                 "volume": 1000000
             }
 
+            execute_insert(
+                "INSERT OR IGNORE INTO symbols (symbol, name, type, interval) VALUES (?, ?, ?, ?)",
+                (sample_data["symbol"], sample_data["name"], sample_data["type"], sample_data["interval"])
+            )
             query = """
             INSERT OR REPLACE INTO stock_data_daily 
-            (symbol, name, type, interval, date, open, high, low, close, adjusted_close, volume)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            (symbol_id, date, open, high, low, close, adjusted_close, volume)
+            VALUES ((SELECT symbol_id FROM symbols WHERE symbol = ?), ?, ?, ?, ?, ?, ?, ?)
             """
             params = (
-                sample_data["symbol"], sample_data["name"], sample_data["type"],
-                sample_data["interval"], sample_data["date"], sample_data["open"],
+                sample_data["symbol"], sample_data["date"], sample_data["open"],
                 sample_data["high"], sample_data["low"], sample_data["close"],
                 sample_data["adjusted_close"], sample_data["volume"]
             )
@@ -60,7 +63,7 @@ def test_database_connection():
             print("✅ Sample data inserted successfully")
 
             # Verify the insert
-            test_result = execute_query("SELECT * FROM stock_data_daily WHERE symbol = ?", ("TEST",))
+            test_result = execute_query("SELECT * FROM stock_data_daily d JOIN symbols s ON s.symbol_id = d.symbol_id WHERE s.symbol = ?", ("TEST",))
             if test_result:
                 print(f"✅ Data verification successful: {test_result[0]['symbol']} - {test_result[0]['date']}")
 
@@ -71,5 +74,20 @@ def test_database_connection():
         print(f"❌ Database test failed: {e}")
         return False
 
+def test_upsert_stock_data_fills_previous_close(db_path):
+    """upsert_stock_data derives the previous-close columns and updates rows in place on a rerun"""
+    init_database()
+    bar = {"symbol": "TEST", "name": "Test Stock", "type": "stock", "interval": "1day",
+           "open": 100.0, "high": 105.0, "low": 98.0, "adjusted_close": 103.0, "volume": 1000000}
+    assert upsert_stock_data([{**bar, "date": "2024-01-02", "close": 110.0},
+                              {**bar, "date": "2024-01-01", "close": 100.0}]) == 2
+    rows = execute_query("SELECT date, close, prev_close, price_change, percent_change FROM stock_data_daily ORDER BY date")
+    assert [(r["prev_close"], r["price_change"], r["percent_change"]) for r in rows] == [(None, None, None), (100.0, 10.0, 10.0)]
+
+    # Correcting the earlier bar moves the next bar's previous close with it
+    upsert_stock_data([StockDataCreate(**bar, date="2024-01-01", close=88.0).model_dump()])
+    rows = execute_query("SELECT date, prev_close, price_change FROM stock_data_daily ORDER BY date")
+    assert len(rows) == 2 and (rows[1]["prev_close"], rows[1]["price_change"]) == (88.0, 22.0)
+
 if __name__ == "__main__":
     test_database_connection()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Tests for chart downsampling: bucket bars keep the price extremes and
+volume, line points are picked by LTTB at their own bar's time and keep the
+line's turning points, and short series keep every bar and value
+"""
+
+import numpy as np
+import pytest
+
+from conftest import make_rows
+from downsample import bucket_starts, downsample_rows, lttb
+
+
+def price_rows(bars):
+    rows = make_rows("AAA", bars, seed=3)
+    for i, row in enumerate(rows):
+        row["time"] = row["date"]
+        row["volume"] += 0.6  # fractional, as a feed may report it
+        # Distinct, non-monotonic line values so any misalignment shows; a warm-up gap like the EMA's
+        row["ema_21"] = None if i < 20 else 100.0 + (i * 37) % 11
+        row["ema_200"] = None
+    return rows
+
+
+@pytest.mark.parametrize("bars, points", [(500, 40), (101, 100), (37, 10), (1000, 997)])
+def test_buckets(bars, points):
+    rows = price_rows(bars)
+    out = downsample_rows(rows, points)["bars"]
+    assert len(out) == points
+    starts = bucket_starts(bars, points)
+    assert len(set(starts.tolist())) == points and starts[0] == 0 and starts[-1] == bars - 1
+
+    by_time = {row["time"]: row for row in rows}
+    assert out[0]["time"] == rows[0]["time"] and out[-1]["time"] == rows[-1]["time"]
+    assert all(bar["open"] == by_time[bar["time"]]["open"] for bar in out)
+    assert all("ema_21" not in bar for bar in out)
+
+    # Buckets cover every bar once: extremes and total volume are preserved
+    assert max(bar["high"] for bar in out) == max(row["high"] for row in rows)
+    assert min(bar["low"] for bar in out) == min(row["low"] for row in rows)
+    # Each volume is rounded before the sum, not truncated
+    assert sum(bar["volume"] for bar in out) == sum(round(row["volume"]) for row in rows)
+    assert out[-1]["close"] == rows[-1]["close"]
+
+
+@pytest.mark.parametrize("bars, points", [(500, 40), (37, 10)])
+def test_lines_at_their_own_time(bars, points):
+    rows = price_rows(bars)
+    lines = downsample_rows(rows, points)["lines"]
+    by_time = {row["time"]: row for row in rows}
+    times = [point["time"] for point in lines["ema_21"]]
+    # One point per bucket with a value, in time order, each the value of the bar at its time
+    assert times == sorted(set(times)) and len(times) <= points
+    assert all(point["value"] == by_time[point["time"]]["ema_21"] for point in lines["ema_21"])
+    assert times[-1] == rows[-1]["time"]
+    # No value is made up for the warm-up or a line that never starts
+    assert all(by_time[t]["ema_21"] is not None for t in times)
+    assert lines["ema_200"] == []
+
+
+def test_lttb_keeps_turning_points():
+    # A peak in the middle of a bucket: the bucket's first bar would miss it
+    y = 10 - 0.2 * np.abs(np.arange(100) - 44.0)
+    starts = bucket_starts(len(y), 10)
+    assert 44 not in starts
+    chosen = lttb(y, starts)
+    assert y[chosen].max() == y.max()
+    assert y[starts].max() < y.max()
+    assert chosen[0] == 0 and chosen[-1] == len(y) - 1
+
+
+@pytest.mark.parametrize("bars", [1, 10, 40])
+def test_short_series_keep_every_bar(bars):
+    rows = price_rows(bars)
+    out = downsample_rows(rows, 40)
+    assert [bar["time"] for bar in out["bars"]] == [row["time"] for row in rows]
+    assert out["lines"]["ema_21"] == [{"time": row["time"], "value": row["ema_21"]}
+                                      for row in rows if row["ema_21"] is not None]
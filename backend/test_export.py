@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Tests for the streaming export: the CSV header and rows, NDJSON line framing
+across fetch batches, and an empty result set
+"""
+
+import csv
+import io
+import sqlite3
+
+import orjson
+import pytest
+
+import database
+from routers.stocks import get_export
+
+SYMBOLS = ("SPY", "AAA", "BBB")
+BARS = 40
+
+
+@pytest.fixture
+def small_batches(client, monkeypatch):
+    """Stream in batches of 7 rows so every export spans several chunks"""
+    stream = get_export.stream_query_async
+    monkeypatch.setattr(get_export, "stream_query_async", lambda query, params: stream(query, params, batch_size=7))
+    return client
+
+
+def stored_rows(columns):
+    with sqlite3.connect(database.DATABASE_PATH) as conn:
+        conn.row_factory = sqlite3.Row
+        rows = conn.execute(
+            "SELECT s.symbol, d.* FROM stock_data_daily d JOIN symbols s USING (symbol_id) "
+            "WHERE d.date >= '2020-01-10' ORDER BY s.symbol, d.date"
+        ).fetchall()
+    return [{column: row[column] for column in columns} for row in rows]
+
+
+def test_csv_export(small_batches):
+    columns = ["symbol", "date", "close", "volume", "ema_200"]
+    response = small_batches.get(f"/export?format=csv&start=2020-01-10&columns={','.join(columns)}")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.headers["content-disposition"] == 'attachment; filename="stock_data_daily.csv"'
+    assert "etag" in response.headers
+
+    lines = list(csv.reader(io.StringIO(response.text)))
+    assert lines[0] == columns
+    expected = stored_rows(columns)
+    assert len(lines) == len(expected) + 1 == len(SYMBOLS) * 31 + 1
+    for line, row in zip(lines[1:], expected):
+        # csv writes None as an empty field and floats with repr
+        assert line == ["" if row[c] is None else str(row[c]) for c in columns]
+
+
+def test_ndjson_export(small_batches):
+    response = small_batches.get("/export?symbols=bbb,aaa&start=2020-01-10")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    body = response.content
+    assert body.endswith(b"\n")
+    lines = body.split(b"\n")[:-1]
+    rows = [orjson.loads(line) for line in lines]
+    assert [(row["symbol"], row["date"]) for row in rows] == [
+        (row["symbol"], row["date"]) for row in stored_rows(["symbol", "date"]) if row["symbol"] != "SPY"
+    ]
+    assert list(rows[0]) == list(get_export.EXPORT_COLUMNS)
+
+
+@pytest.mark.parametrize("format", ["csv", "ndjson"])
+def test_empty_export(client, format):
+    response = client.get(f"/export?format={format}&symbols=NOPE&columns=symbol,date")
+    assert response.status_code == 200
+    # CSV still starts with its header row
+    assert response.text == ("symbol,date\r\n" if format == "csv" else "")
+    assert client.get(f"/export?format={format}&columns=nope").status_code == 400
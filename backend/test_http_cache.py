@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Tests for the conditional request validators: a current ETag is answered
+with 304, a write to the data changes it, and the version lookup stays off
+the event loop
+"""
+
+import threading
+from datetime import date
+
+import database
+import http_cache
+from conftest import make_rows
+
+SYMBOLS = ("SPY", "AAA", "BBB")
+BARS = 120
+
+
+def test_etag_revalidation(client):
+    response = client.get("/maxdate")
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert response.headers["cache-control"] == "no-cache"
+
+    cached = client.get("/maxdate", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag
+    assert client.get("/maxdate", headers={"If-None-Match": f'W/{etag}, "other"'}).status_code == 304
+
+    # Writing the latest session changes the validator, so the old copy is refetched
+    latest = response.json()
+    database.upsert_stock_data(make_rows("ZZZ", 1, seed=7, start=date.fromisoformat(latest)))
+    refreshed = client.get("/maxdate", headers={"If-None-Match": etag})
+    assert refreshed.status_code == 200
+    assert refreshed.headers["etag"] != etag
+    assert client.get("/maxdate", headers={"If-None-Match": refreshed.headers["etag"]}).status_code == 304
+
+
+def test_version_lookup_runs_on_query_executor(client, monkeypatch):
+    threads = []
+    lookup = http_cache.get_data_versions
+
+    def recording_lookup():
+        threads.append(threading.current_thread().name)
+        return lookup()
+
+    monkeypatch.setattr(http_cache, "get_data_versions", recording_lookup)
+    assert client.get("/maxdate").status_code == 200
+    assert threads and all(name.startswith("sqlite") for name in threads)
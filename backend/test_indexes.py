@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Query plan regression tests for the flag screener indexes: every flag
+screener must read its own partial covering index without a sort step
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+import cache
+import database
+from indexes import FLAG_COLUMNS, index_name
+from main import app
+
+# Screener request -> flag whose index it should read
+SCREENER_FLAGS = [
+    ("/gapup?date=2024-01-02", "is_gap_up"),
+    ("/gapdown?date=2024-01-02", "is_gap_down"),
+    ("/new-highs?date=2024-01-02&period=63", "is_high_63"),
+    ("/new-highs?date=2024-01-02&period=252&limit=5", "is_high_252"),
+    ("/new-lows?date=2024-01-02&period=63", "is_low_63"),
+    ("/new-lows?date=2024-01-02&period=252", "is_low_252"),
+    ("/52-week-relative-strength?date=2024-01-02", "is_rs_52_week_high"),
+    ("/swing-high-cross?date=2024-01-02&direction=up", "swing_high_cross_up"),
+    ("/swing-high-cross?date=2024-01-02&direction=down", "swing_high_cross_down"),
+    ("/swing-low-cross?date=2024-01-02&direction=up", "swing_low_cross_up"),
+    ("/swing-low-cross?date=2024-01-02&direction=down", "swing_low_cross_down"),
+    ("/new-signals?date=2024-01-02&signal=buy", "signal_change"),
+]
+
+
+@pytest.fixture
+def recording_client(db_path, monkeypatch):
+    """App on an empty database that records the SQL each screener runs"""
+    queries = []
+
+    async def recording_query(query, params=()):
+        queries.append((query, params))
+        return await database.execute_query_async(query, params)
+
+    monkeypatch.setattr(cache, "execute_query_async", recording_query)
+    with TestClient(app) as test_client:
+        yield test_client, queries
+
+
+def test_every_flag_has_a_screener():
+    assert sorted(flag for _, flag in SCREENER_FLAGS) == sorted(FLAG_COLUMNS)
+
+
+@pytest.mark.parametrize("url,flag", SCREENER_FLAGS)
+def test_screener_reads_its_covering_index(recording_client, url, flag):
+    test_client, queries = recording_client
+    assert test_client.get(url).status_code == 404
+    [(query, params)] = queries
+
+    with database.get_db_connection() as conn:
+        plan = [row["detail"] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params)]
+    assert any(f"USING COVERING INDEX {index_name(flag)} " in step for step in plan), plan
+    assert not any("TEMP B-TREE" in step for step in plan), plan
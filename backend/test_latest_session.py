@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Tests for the in-memory latest-session snapshot: answers must match the SQL
+path, and a write to a held date must be visible on the next request
+"""
+
+import numpy as np
+
+import database
+import latest_session
+from cache import result_cache
+from screens import SCREENS
+
+SCREENER_URLS = [
+    "/gapup", "/gapdown", "/new-highs?period=63", "/new-highs?period=252&limit=3", "/new-lows?period=63",
+    "/52-week-relative-strength", "/swing-high-cross?direction=up", "/swing-low-cross?direction=down",
+    "/new-signals?signal=buy", "/new-signals?signal=sell", "/screens", "/screens?limit=2",
+    "/rs-rank", "/rs-rank?min_rank=50&limit=3",
+]
+
+
+def _responses(test_client, date):
+    urls = [f"{url}{'&' if '?' in url else '?'}date={date}" for url in SCREENER_URLS]
+    urls += ["/maxdate", "/quotes?symbols=SPY,AAA,ZZZ"]
+    return {url: (response.status_code, response.content) for url, response in ((url, test_client.get(url)) for url in urls)}
+
+
+def test_snapshot_matches_sql(client, monkeypatch):
+    latest = client.get("/maxdate").json()
+    assert sorted(latest_session.latest_sessions.stats()["dates"])[-1] == latest
+
+    from_memory = _responses(client, latest)
+    monkeypatch.setattr(latest_session, "SNAPSHOT_ENABLED", False)
+    result_cache.clear()
+    assert _responses(client, latest) == from_memory
+    assert any(status == 200 for status, _ in from_memory.values())
+
+
+def test_write_reloads_snapshot(client):
+    latest = client.get("/maxdate").json()
+    [quote] = client.get("/quotes?symbols=AAA").json()
+    assert quote["date"] == latest
+
+    loads = latest_session.latest_sessions.loads
+    row = {"symbol": "AAA", "name": "AAA", "type": "stock", "interval": "1day", "date": latest,
+           "open": 1.0, "high": 2.0, "low": 0.5, "close": 1.5, "adjusted_close": 1.5, "volume": 7}
+    database.upsert_stock_data([row])
+
+    [quote] = client.get("/quotes?symbols=AAA").json()
+    assert (quote["close"], quote["volume"]) == (1.5, 7)
+    assert latest_session.latest_sessions.loads == loads + 1
+
+
+def test_members_follow_screen_order(client):
+    latest = client.get("/maxdate").json()
+    session = latest_session.latest_sessions.refresh().get(latest)
+    for screen in SCREENS.values():
+        rs = session.columns["rs"][session.match(screen)]
+        present = rs[~np.isnan(rs)]
+        assert list(present) == sorted(present, reverse=screen.descending)
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Tests for the live screens: after every trade a symbol's membership is what
+incremental.advance computes for the session so far, and watchlists receive
+exactly the entries and exits of their symbols and screens
+"""
+
+import random
+import sqlite3
+from dataclasses import replace
+from datetime import datetime, timezone
+
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+
+import database
+from incremental import advance, load_states, update_latest
+from live_screens import LIVE_SCREENS, SCREEN_FLAGS, LiveScreener
+from main import app
+from realtime import BarAggregator, parse_trade, session_open
+
+SYMBOLS = ("SPY", "AAA", "BBB", "CCC", "DDD", "EEE", "FFF")
+SESSION = "2020-10-27"  # the day after the loaded history
+
+
+@pytest.fixture
+def states(loaded_db):
+    with sqlite3.connect(loaded_db) as conn:
+        return load_states(conn, list(SYMBOLS))
+
+
+def session_trades(states, count, seed=0):
+    """Trade messages for the session, each symbol opening with a gap and wandering widely"""
+    rng = random.Random(seed)
+    opened = int(datetime(2020, 10, 27, 13, 30, tzinfo=timezone.utc).timestamp() * 1000)
+    prices = {symbol: state.close * (1 + rng.choice((-0.06, -0.02, 0.02, 0.06))) for symbol, state in states.items()}
+    messages = []
+    for i in range(count):
+        symbol = rng.choice(sorted(states))
+        prices[symbol] *= 1 + rng.gauss(0, 0.01)
+        messages.append({"s": symbol, "p": round(prices[symbol], 4), "v": rng.randint(1, 500), "t": opened + 1000 * i})
+    return messages
+
+
+def test_membership_matches_advance_after_every_trade(states):
+    aggregator, screener = BarAggregator(), LiveScreener()
+    members = {}
+    for message in session_trades(states, 2000):
+        trade = parse_trade(message)
+        previous = aggregator.bars.get(trade.symbol)
+        bar = aggregator.add(trade)
+        events = screener.load(states[bar.symbol], bar) if bar is not previous else screener.check(bar)
+        for event in events:
+            members[event["screen"], event["symbol"]] = event["entered"]
+
+        row = advance(replace(states[bar.symbol]), bar.as_row(), None)
+        for screen in LIVE_SCREENS:
+            assert members.get((screen, bar.symbol), False) == bool(row[SCREEN_FLAGS[screen]]), (screen, message)
+    entered = {screen for (screen, _), member in members.items() if member}
+    assert len(entered) >= 4
+    for screen in LIVE_SCREENS:
+        assert screener.screen_members(screen) == sorted(s for (sc, s), m in members.items() if sc == screen and m)
+
+
+def test_trades_starting_mid_session(states):
+    # Followed only after the open: the range screens stay empty, the swing crosses still follow advance
+    aggregator, screener = BarAggregator(), LiveScreener()
+    aggregator.follow(states, session_open(SESSION) + 60_000)
+    range_screens = LIVE_SCREENS[:6]
+    members, full_range = {}, set()
+    for message in session_trades(states, 2000, seed=2)[60:]:
+        trade = parse_trade(message)
+        previous = aggregator.bars.get(trade.symbol)
+        bar = aggregator.add(trade)
+        assert not bar.complete
+        events = screener.load(states[bar.symbol], bar) if bar is not previous else screener.check(bar)
+        for event in events:
+            assert event["screen"] not in range_screens
+            members[event["screen"], event["symbol"]] = event["entered"]
+
+        row = advance(replace(states[bar.symbol]), bar.as_row(), None)
+        full_range.update(screen for screen in range_screens if row[SCREEN_FLAGS[screen]])
+        for screen in LIVE_SCREENS[6:]:
+            assert members.get((screen, bar.symbol), False) == bool(row[SCREEN_FLAGS[screen]]), (screen, message)
+    # The partial bars would have passed some range screens had they been taken as whole sessions
+    assert full_range and any(members.values())
+    assert all(screener.screen_members(screen) == [] for screen in range_screens)
+
+
+def test_watchlist_events_match_nightly_update(states, replay_path):
+    messages = session_trades(states, 1500, seed=1)
+    replay_path.write_bytes(b"\n".join(map(orjson.dumps, messages)))
+    watched, screens = ["AAA", "BBB", "CCC", "DDD"], ["gapup", "gapdown", "new-highs-63", "new-lows-63"]
+    trades = {symbol: sum(m["s"] == symbol for m in messages) for symbol in SYMBOLS}
+
+    members, bars, received = {}, {}, 0
+    with TestClient(app) as client:
+        with client.websocket_connect("/ws/realtime") as ws:
+            # Every replayed symbol is subscribed before the replay starts, so the watchlist adds none
+            ws.send_json({"action": "subscribe", "symbols": list(SYMBOLS)})
+            ws.send_json({"action": "watch", "watchlist": "mine", "symbols": watched, "screens": screens})
+            while any(bars.get(s, {}).get("trades") != trades[s] or bars[s]["prev_close"] is None for s in SYMBOLS):
+                message = ws.receive_json()
+                if message["type"] == "screens":
+                    assert message["watchlist"] == "mine"
+                    for event in message["events"]:
+                        assert event["symbol"] in watched and event["screen"] in screens
+                        members[event["screen"], event["symbol"]] = event["entered"]
+                        received += 1
+                for bar in message.get("bars", []):
+                    bars[bar["symbol"]] = bar
+            ws.send_json({"action": "watch", "watchlist": "x", "screens": "new-buys"})
+            assert "Not live screens" in ws.receive_json()["detail"]
+        assert client.get("/health/realtime").json()["screen_events"] == received
+
+    update_latest(sqlite3.connect(database.DATABASE_PATH), [
+        {"symbol": s, "name": s, "type": "stock", "interval": "1day", "date": SESSION, "open": bar["open"],
+         "high": bar["high"], "low": bar["low"], "close": bar["close"], "adjusted_close": bar["close"],
+         "volume": bar["volume"]}
+        for s, bar in bars.items()
+    ])
+    with sqlite3.connect(database.DATABASE_PATH) as conn:
+        for symbol in watched:
+            row = dict(zip(screens, conn.execute(f"""
+                SELECT {", ".join(SCREEN_FLAGS[screen] for screen in screens)} FROM stock_data_daily
+                WHERE symbol_id = {database.SYMBOL_ID} AND date = ?
+            """, (symbol, SESSION)).fetchone()))
+            for screen in screens:
+                assert members.get((screen, symbol), False) == bool(row[screen]), (screen, symbol)
+    assert any(members.values())
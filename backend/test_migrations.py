@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Tests for schema migrations: a database in the original schema migrates
+straight to the current one, with the same derived data as a fresh load
+"""
+
+import sqlite3
+
+import pytest
+
+import database
+from migrations import SCHEMA_VERSION
+
+SYMBOLS = ("SPY", "AAA", "BBB", "CCC")
+BARS = 120
+
+# stockdb.sql as first released, before any migration
+BASELINE_SCHEMA = """
+create table if not exists main.stock_data_daily
+(
+    symbol                text    not null,
+    name                  text    not null,
+    type                  text    not null,
+    interval              text    not null,
+    date                  text    not null,
+    open                  real    not null,
+    high                  real    not null,
+    low                   real    not null,
+    close                 real    not null,
+    adjusted_close        real    not null,
+    volume                integer not null,
+    avg_volume            real,
+    is_swing_high         integer,
+    swing_high            real,
+    swing_high_cross_up   integer,
+    swing_high_cross_down integer,
+    is_swing_low          integer,
+    swing_low             real,
+    swing_low_cross_up    integer,
+    swing_low_cross_down  integer,
+    rs                    real,
+    is_rs_52_week_high    integer,
+    atr                   real,
+    is_gap_up             integer,
+    is_gap_down           integer,
+    is_doji_bar           integer,
+    is_bull_bar           integer,
+    is_bear_bar           integer,
+    ema_10                real,
+    ema_21                real,
+    ema_50                real,
+    ema_200               real,
+    rsi_14                real,
+    is_high_63            integer,
+    is_high_252           integer,
+    is_low_63             integer,
+    is_low_252            integer,
+    buy_signal            integer,
+    sell_signal           integer,
+    signal                integer,
+    signal_change         integer,
+    primary key (symbol, date)
+);
+
+create index main.stock_data_daily_date on stock_data_daily (date);
+create index stock_data_daily_symbol_idx on stock_data_daily (symbol);
+"""
+
+# Tables whose contents the migrations derive from the daily bars
+DERIVED_TABLES = {
+    "stock_data_daily": "SELECT s.symbol, d.* FROM stock_data_daily d JOIN symbols s USING (symbol_id)",
+    "stock_data_rollup": "SELECT s.symbol, r.* FROM stock_data_rollup r JOIN symbols s USING (symbol_id)",
+    "market_breadth": "SELECT * FROM market_breadth",
+    "symbols": "SELECT symbol, name, type, exchange, interval FROM symbols",
+}
+
+
+def columns(conn, table):
+    return {row[1:4] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def contents(conn, table):
+    conn.row_factory = sqlite3.Row
+    rows = [dict(row) for row in conn.execute(DERIVED_TABLES[table])]
+    for row in rows:
+        row.pop("symbol_id", None)
+    return sorted(rows, key=lambda row: tuple(str(value) for value in row.values()))
+
+
+@pytest.fixture
+def baseline_db(loaded_db, tmp_path, monkeypatch):
+    """A copy of the loaded bars in the original schema, with the database path pointing at it"""
+    path = str(tmp_path / "baseline.sqlite")
+    with sqlite3.connect(path) as conn:
+        conn.executescript(BASELINE_SCHEMA)
+        conn.execute("ATTACH DATABASE ? AS current", (loaded_db,))
+        names = [row[1] for row in conn.execute("PRAGMA main.table_info(stock_data_daily)")]
+        selected = ", ".join(f"s.{name}" if name in ("symbol", "name", "type", "interval") else f"d.{name}"
+                             for name in names)
+        conn.execute(f"""
+        INSERT INTO main.stock_data_daily ({", ".join(names)})
+        SELECT {selected} FROM current.stock_data_daily d JOIN current.symbols s USING (symbol_id)
+        """)
+        conn.commit()
+        conn.execute("DETACH DATABASE current")
+    monkeypatch.setattr(database, "DATABASE_PATH", path)
+    return path
+
+
+def test_baseline_migrates_to_head(loaded_db, baseline_db):
+    database.init_database()
+    with sqlite3.connect(loaded_db) as fresh, sqlite3.connect(baseline_db) as migrated:
+        assert migrated.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+
+        tables = "SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name"
+        assert migrated.execute(tables).fetchall() == fresh.execute(tables).fetchall()
+        for (table,) in fresh.execute(tables).fetchall():
+            assert columns(migrated, table) == columns(fresh, table), table
+
+        for table in DERIVED_TABLES:
+            expected, actual = contents(fresh, table), contents(migrated, table)
+            assert len(actual) == len(expected) > 0, table
+            for got, want in zip(actual, expected):
+                assert got == pytest.approx(want), table
+
+        # Every loaded date has a version, and the ranked ones were bumped
+        versions = dict(migrated.execute("SELECT date, version FROM data_versions"))
+        assert set(versions) == {row["date"] for row in contents(fresh, "market_breadth")}
+        assert max(versions.values()) == 2
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Tests for the price-data window parameters: bars, start, end, as_of and
+days select the documented bars, out-of-range values are rejected with 422,
+and max_points is clamped to MAX_BARS
+"""
+
+import sqlite3
+
+import database
+from price_data import DEFAULT_BARS, MAX_BARS
+
+SYMBOLS = ("SPY", "AAA", "BBB")
+BARS = 200
+
+
+def dates(symbol):
+    with sqlite3.connect(database.DATABASE_PATH) as conn:
+        return [d for (d,) in conn.execute(
+            "SELECT date FROM stock_data_daily JOIN symbols USING (symbol_id) WHERE symbol = ? ORDER BY date",
+            (symbol,),
+        )]
+
+
+def times(response):
+    assert response.status_code == 200, response.text
+    return [bar["time"] for bar in response.json()]
+
+
+def test_window_parameters(client):
+    all_dates = dates("AAA")
+    assert times(client.get("/price-data/aaa")) == all_dates[-DEFAULT_BARS:]
+    assert times(client.get("/price-data/AAA?bars=30")) == all_dates[-30:]
+    assert times(client.get(f"/price-data/AAA?bars={MAX_BARS}")) == all_dates
+
+    end = all_dates[120]
+    assert times(client.get(f"/price-data/AAA?bars=10&end={end}")) == all_dates[111:121]
+    # as_of and end bound the window together: the earlier one wins
+    assert times(client.get(f"/price-data/AAA?bars=10&end={all_dates[150]}&as_of={end}")) == all_dates[111:121]
+    assert times(client.get(f"/price-data/AAA?start={all_dates[100]}&end={end}")) == all_dates[100:121]
+    assert times(client.get(f"/price-data/AAA?days=9&as_of={end}")) == all_dates[111:121]
+
+    batch = client.get(f"/price-data?symbols=AAA,SPY&bars=5&end={end}")
+    assert batch.status_code == 200
+    assert [bar["time"] for bar in batch.json()["AAA"]] == all_dates[116:121]
+    assert list(batch.json()) == ["AAA", "SPY"]
+    # Without bars the windows are start/end ranges, still grouped by symbol in request order
+    batch = client.get(f"/price-data?symbols=BBB,AAA,SPY&start={all_dates[100]}&end={end}")
+    assert list(batch.json()) == ["BBB", "AAA", "SPY"]
+    for series in batch.json().values():
+        assert [bar["time"] for bar in series] == all_dates[100:121]
+
+
+def test_parameter_bounds(client):
+    for query in ("bars=0", f"bars={MAX_BARS + 1}", "days=0", "max_points=9"):
+        assert client.get(f"/price-data/AAA?{query}").status_code == 422, query
+    for query in ("bars=0", f"bars={MAX_BARS + 1}"):
+        assert client.get(f"/price-data?symbols=AAA&{query}").status_code == 422, query
+
+    assert client.get("/price-data/AAA?start=2020-13-01").status_code == 400
+    assert client.get("/price-data/AAA?start=2020-05-01&end=2020-04-01").status_code == 400
+    assert client.get("/price-data/AAA?interval=1w&days=30").status_code == 400
+
+
+def test_max_points(client):
+    all_dates = dates("AAA")
+    downsampled = client.get("/price-data/AAA?bars=150&max_points=40").json()
+    assert len(downsampled["bars"]) == 40 and downsampled["bars"][0]["time"] == all_dates[-150]
+    assert all(len(points) <= 40 for points in downsampled["lines"].values())
+
+    # One bar per pixel of a wide chart is clamped to MAX_BARS rather than rejected
+    wide = client.get(f"/price-data/AAA?bars=150&max_points={MAX_BARS * 2}")
+    assert [bar["time"] for bar in wide.json()["bars"]] == all_dates[-150:]
+    clamped = client.get(f"/price-data/AAA?bars=150&max_points={MAX_BARS}", headers={"If-None-Match": wide.headers["etag"]})
+    assert clamped.status_code == 304
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Tests for the realtime hub: trades replayed from a recording build the same
+bars as a direct fold, and a session's live screener columns are what the
+nightly update writes for its finished bar
+"""
+
+import asyncio
+import random
+import sqlite3
+from datetime import datetime, timezone
+
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+
+import database
+import realtime
+from incremental import load_states, update_latest
+from main import app
+from realtime import (LIVE_COLUMNS, BarAggregator, Client, RealtimeHub, ReplayFeed, parse_trade, session_date,
+                      session_open)
+
+SYMBOLS = ("SPY", "AAA", "BBB")
+SESSION = "2020-10-27"  # the day after the loaded history
+
+
+def record_trades(path, symbols, count, seed=0):
+    """A session of trade messages, interleaved across symbols, each symbol's last trade after the benchmark's"""
+    rng = random.Random(seed)
+    opened = int(datetime(2020, 10, 27, 13, 30, tzinfo=timezone.utc).timestamp() * 1000)
+    prices = {symbol: 100.0 for symbol in symbols}
+    messages = [{"s": "SPY", "ms": "open"}]  # not a trade
+    for i in range(count):
+        symbol = rng.choice(symbols)
+        prices[symbol] *= 1 + rng.gauss(0, 0.01)
+        messages.append({"s": symbol, "p": round(prices[symbol], 4), "v": rng.randint(1, 500),
+                         "c": [12], "dp": False, "ms": "open", "t": opened + 1000 * i})
+    for j, symbol in enumerate(s for s in symbols if s != "SPY"):
+        messages.append({"s": symbol, "p": round(prices[symbol], 4), "v": 100, "t": opened + 1000 * (count + j)})
+    path.write_bytes(b"\n".join(map(orjson.dumps, messages)))
+    return messages
+
+
+def reference_bars(messages, symbols):
+    bars = {}
+    for message in messages:
+        if message.get("s") in symbols and "p" in message:
+            bar = bars.setdefault(message["s"], {"open": message["p"], "high": message["p"], "low": message["p"],
+                                                 "volume": 0, "trades": 0})
+            bar["high"], bar["low"] = max(bar["high"], message["p"]), min(bar["low"], message["p"])
+            bar["close"] = message["p"]
+            bar["volume"] += message["v"]
+            bar["trades"] += 1
+    return bars
+
+
+def test_aggregator_folds_trades():
+    assert parse_trade({"status_code": 200, "message": "Authorized"}) is None
+    assert parse_trade({"s": "AAA", "p": "0", "t": 1}) is None
+    aggregator = BarAggregator()
+    day = int(datetime(2020, 10, 27, 15, tzinfo=timezone.utc).timestamp() * 1000)
+    for price, size, time in ((10.0, 5, day), (12.0, 1, day + 1), (9.0, 2, day + 2), (11.0, 1, day + 3)):
+        aggregator.add(parse_trade({"s": "aaa", "p": price, "v": size, "t": time}))
+    bar = aggregator.bars["AAA"]
+    assert (bar.date, bar.open, bar.high, bar.low, bar.close, bar.volume, bar.trades) == (SESSION, 10, 12, 9, 11, 9, 4)
+    assert aggregator.live_columns(bar) == realtime.NO_LIVE_COLUMNS
+
+    # Late trades of the previous session are dropped; the next session starts a new bar
+    assert aggregator.add(parse_trade({"s": "AAA", "p": 50, "v": 1, "t": day - 86_400_000})) is None
+    assert aggregator.add(parse_trade({"s": "AAA", "p": 20, "v": 3, "t": day + 86_400_000})).to_dict()["open"] == 20
+    assert session_date(int(datetime(2020, 10, 28, 2, tzinfo=timezone.utc).timestamp() * 1000)) == SESSION
+
+
+def test_bars_started_mid_session(loaded_db):
+    with sqlite3.connect(loaded_db) as conn:
+        states = load_states(conn, ["AAA", "BBB"])
+    opened = session_open(SESSION)
+    aggregator = BarAggregator()
+    aggregator.states.update(states)
+    aggregator.follow(["AAA"], opened - 60_000)
+    aggregator.follow(["BBB"], opened + 5_000)
+    for symbol in ("AAA", "BBB"):
+        aggregator.add(parse_trade({"s": symbol, "p": 100, "v": 1, "t": opened + 10_000}))
+    full, late = aggregator.bars["AAA"], aggregator.bars["BBB"]
+    assert full.complete and full.to_dict()["complete"]
+    assert aggregator.live_columns(full)["prev_close"] is not None
+    # Trades before the subscription may have set the open, high or low
+    assert not late.complete and aggregator.live_columns(late) == realtime.NO_LIVE_COLUMNS
+    # The next session was followed from its start
+    assert aggregator.add(parse_trade({"s": "BBB", "p": 99, "v": 1, "t": opened + 86_400_000})).complete
+
+    # After an interruption every bar starts over, incomplete for the rest of its session
+    aggregator.interrupt(opened + 86_400_000 + 60_000)
+    assert aggregator.bars == {}
+    assert not aggregator.add(parse_trade({"s": "AAA", "p": 98, "v": 1, "t": opened + 86_400_000 + 90_000})).complete
+
+
+def test_client_events_bounded(monkeypatch):
+    monkeypatch.setattr(realtime, "MAX_PENDING_EVENTS", 5)
+
+    async def run():
+        client = Client()
+        for i in range(8):
+            client.push_event("mine", orjson.dumps({"n": i}))
+        client.push_event("other", b"{}")
+        return client.dropped_events, [orjson.loads(m) for m in await client.next_messages()]
+
+    dropped, messages = asyncio.run(run())
+    assert dropped == 3
+    assert [event["n"] for event in messages[0]["events"]] == [3, 4, 5, 6, 7]
+    assert messages[1] == {"type": "screens", "watchlist": "other", "events": [{}]}
+
+
+class FlakyFeed:
+    """Fails after its first trade, then after a restart reconnects once more in the middle of the session"""
+
+    def __init__(self, messages):
+        self.messages_ = messages
+        self.symbols = set()
+        self.starts = 0
+
+    def clock(self):
+        return self.messages_[-1]["t"]
+
+    async def subscribe(self, symbols):
+        self.symbols.update(symbols)
+
+    async def unsubscribe(self, symbols):
+        self.symbols.difference_update(symbols)
+
+    async def messages(self):
+        self.starts += 1
+        if self.starts == 1:
+            yield self.messages_[0]
+            raise ConnectionError("feed dropped")
+        for i, message in enumerate(self.messages_):
+            if i == 2:
+                yield realtime.RECONNECTED
+            yield message
+            await asyncio.sleep(0)
+
+
+def test_consume_restarts_failed_feed(monkeypatch, caplog):
+    monkeypatch.setattr(realtime, "RETRY_DELAY", 0.001)
+    opened = session_open(SESSION)
+    messages = [{"s": "AAA", "p": 10 + i, "v": 1, "t": opened + 1000 * i} for i in range(5)]
+
+    async def run():
+        feed, hub = FlakyFeed(messages), RealtimeHub()
+        await hub.start(feed, interval=0.001)
+        client = hub.connect()
+        await hub.subscribe(client, ["AAA"])
+        while feed.starts < 2 or hub.aggregator.bars.get("AAA") is None or hub.aggregator.bars["AAA"].close != 14:
+            await asyncio.sleep(0.001)
+        bar = hub.aggregator.bars["AAA"]
+        await hub.stop()
+        return bar
+
+    bar = asyncio.run(run())
+    assert "Realtime feed failed: feed dropped" in caplog.text
+    # The bar restarted at the reconnect, so it only holds the trades after it
+    assert (bar.open, bar.trades, bar.complete) == (12, 3, False)
+
+
+def test_failed_sender_closes_connection(loaded_db, replay_path, monkeypatch, caplog):
+    record_trades(replay_path, list(SYMBOLS), 50)
+
+    async def failing(self):
+        raise RuntimeError("send failed")
+
+    monkeypatch.setattr(realtime.Client, "next_messages", failing)
+    with TestClient(app) as client:
+        with client.websocket_connect("/ws/realtime") as ws:
+            assert ws.receive() == {"type": "websocket.close", "code": 1011, "reason": ""}
+        assert client.get("/health/realtime").json()["clients"] == 0
+    assert "Error sending updates on realtime connection: send failed" in caplog.text
+
+
+def test_hub_fans_out_by_subscription(tmp_path):
+    messages = record_trades(tmp_path / "trades.jsonl", ["SPY", "AAA", "BBB"], 400)
+    expected = reference_bars(messages, {"AAA", "BBB"})
+
+    async def run():
+        feed, hub = ReplayFeed(str(tmp_path / "trades.jsonl")), RealtimeHub()
+        hub._read = None
+        await hub.start(feed, interval=0.001)
+        first, second = hub.connect(), hub.connect()
+        received = {first: {}, second: {}}
+        await hub.subscribe(first, ["AAA", "BBB"])
+        await hub.subscribe(second, ["BBB"])
+        assert feed.symbols == {"SPY", "AAA", "BBB"}
+        while any(received[c].get(s, {}).get("trades") != expected[s]["trades"]
+                  for c, symbols in ((first, ["AAA", "BBB"]), (second, ["BBB"])) for s in symbols):
+            for client in (first, second):
+                if client.ready.is_set():
+                    for message in await client.next_messages():
+                        for bar in orjson.loads(message)["bars"]:
+                            received[client][bar["symbol"]] = bar
+            await asyncio.sleep(0.001)
+        await hub.disconnect(first)
+        assert feed.symbols == {"SPY", "BBB"}
+        await hub.disconnect(second)
+        assert feed.symbols == set() and hub.stats()["watched_symbols"] == 0
+        await hub.stop()
+        return received[first], received[second]
+
+    first, second = asyncio.run(run())
+    assert set(second) == {"BBB"}
+    for symbol, bar in first.items():
+        assert {k: bar[k] for k in expected[symbol]} == pytest.approx(expected[symbol])
+    assert second["BBB"] == first["BBB"]
+
+
+def test_live_columns_match_nightly_update(loaded_db, replay_path):
+    messages = record_trades(replay_path, list(SYMBOLS), 300, seed=3)
+    expected = reference_bars(messages, {"AAA", "BBB"})
+    with TestClient(app) as client:
+        live = {}
+        with client.websocket_connect("/ws/realtime") as ws:
+            ws.send_json({"action": "subscribe", "symbols": "aaa,bbb"})
+            while any(live.get(s, {}).get("trades") != expected[s]["trades"] or live[s]["prev_close"] is None
+                      for s in expected):
+                message = ws.receive_json()
+                for bar in message.get("bars", []):
+                    live[bar["symbol"]] = bar
+            for message in ({"action": "dance"}, {"action": "subscribe", "symbols": 5}, [1]):
+                ws.send_json(message)
+                assert ws.receive_json()["type"] == "error"
+        assert client.get("/health/realtime").json()["trades"] == len(messages) - 1
+        assert all(bar["rs"] is not None and bar["rsi_14"] is not None for bar in live.values())
+
+        bars = reference_bars(messages, {"SPY", "AAA", "BBB"})
+        update_latest(sqlite3.connect(database.DATABASE_PATH), [
+            {"symbol": s, "name": s, "type": "stock", "interval": "1day", "date": SESSION,
+             "adjusted_close": bar["close"], **bar} for s, bar in bars.items()
+        ])
+        with database.get_db_connection() as conn:
+            for symbol, bar in live.items():
+                row = conn.execute(f"""
+                    SELECT {", ".join(LIVE_COLUMNS)} FROM stock_data_daily
+                    WHERE symbol_id = {database.SYMBOL_ID} AND date = ?
+                """, (symbol, SESSION)).fetchone()
+                assert {name: bar[name] for name in LIVE_COLUMNS} == pytest.approx(dict(row))
+
+
+def test_refused_without_feed(db_path, monkeypatch):
+    monkeypatch.setattr(realtime, "REALTIME_FEED", "")
+    with TestClient(app) as client:
+        with client.websocket_connect("/ws/realtime") as ws:
+            assert ws.receive()["code"] == 1013
+
+
+def test_market_hours_keep_token_on_server(db_path, monkeypatch):
+    from routers.stocks import get_market_hours
+
+    fetched = []
+    details = {"Code": "US", "TradingHours": {"timezone": "America/New_York"}, "holidays": []}
+    monkeypatch.setattr(get_market_hours, "_cached", (0.0, None))
+    monkeypatch.setattr(get_market_hours, "fetch_exchange_details",
+                        lambda exchange, token: fetched.append((exchange, token)) or details)
+    with TestClient(app) as client:
+        monkeypatch.delenv("EODHD_API_TOKEN", raising=False)
+        assert client.get("/market-hours").status_code == 503
+        monkeypatch.setenv("EODHD_API_TOKEN", "secret-token")
+        for _ in range(2):
+            response = client.get("/market-hours")
+            assert response.json() == details and "secret-token" not in response.text
+    # Fetched once with the server's token, then served from memory
+    assert fetched == [("US", "secret-token")]
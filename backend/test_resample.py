@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Tests for weekly and monthly bars: rollups and on-demand aggregation match a
+reference resample of the daily rows, including periods cut by start and
+as_of, and refresh_rollups rewrites only the periods from `since` on
+"""
+
+import sqlite3
+from itertools import groupby
+
+import pytest
+
+import database
+import resample
+from price_data import PriceWindow
+from resample import fetch_resampled, period_start, refresh_rollups
+
+SYMBOLS = ("SPY", "AAA", "BBB")
+BARS = 150
+
+
+def reference(symbol, interval, start=None, upper=None):
+    """Resample the daily rows in Python, with the window rules of fetch_resampled"""
+    with sqlite3.connect(database.DATABASE_PATH) as conn:
+        conn.row_factory = sqlite3.Row
+        daily = conn.execute(
+            "SELECT d.* FROM stock_data_daily d JOIN symbols s USING (symbol_id) WHERE s.symbol = ? ORDER BY date",
+            (symbol,),
+        ).fetchall()
+    lower = period_start(start, interval) if start else ""
+    daily = [row for row in daily if row["date"] >= lower and (upper is None or row["date"] <= upper)]
+    bars = []
+    for period, rows in groupby(daily, key=lambda row: period_start(row["date"], interval)):
+        rows = list(rows)
+        bars.append({
+            "time": period, "open": rows[0]["open"], "high": max(r["high"] for r in rows),
+            "low": min(r["low"] for r in rows), "close": rows[-1]["close"],
+            "volume": sum(r["volume"] for r in rows), "ema_21": rows[-1]["ema_21"], "ema_200": rows[-1]["ema_200"],
+        })
+    return bars
+
+
+@pytest.fixture(params=[True, False], ids=["rollups", "aggregate"])
+def source(loaded_db, monkeypatch, request):
+    monkeypatch.setattr(resample, "ROLLUPS_ENABLED", request.param)
+    return request.param
+
+
+@pytest.mark.parametrize("interval", ["1w", "1mo"])
+def test_partial_periods(source, interval):
+    # 2020-01-01 is a Wednesday: the first week and every month boundary are partial periods
+    assert fetch_resampled("AAA", interval, PriceWindow(start="2020-01-01")) == reference("AAA", interval)
+
+    # A start inside a period includes that period whole
+    assert fetch_resampled("AAA", interval, PriceWindow(start="2020-02-19")) == reference("AAA", interval, "2020-02-19")
+
+    # as_of inside a period truncates it to the bars up to that date; end and as_of both bound the window
+    for as_of in ("2020-03-18", "2020-03-31", "2020-04-01"):
+        expected = reference("AAA", interval, "2020-01-01", as_of)
+        assert fetch_resampled("AAA", interval, PriceWindow(start="2020-01-01", as_of=as_of)) == expected
+        assert fetch_resampled("AAA", interval, PriceWindow(bars=3, end="2020-05-31", as_of=as_of)) == expected[-3:]
+
+
+def test_partial_period_endpoint(client):
+    response = client.get("/price-data/AAA?interval=1w&start=2020-02-19&as_of=2020-03-18")
+    assert response.status_code == 200
+    bars = response.json()
+    assert bars == reference("AAA", "1w", "2020-02-19", "2020-03-18")
+    # The week of 2020-03-16 ends early, on the Wednesday
+    assert bars[0]["time"] == "2020-02-17" and bars[-1]["time"] == "2020-03-16"
+
+
+def test_refresh_rewrites_affected_periods_only(loaded_db):
+    since = "2020-04-15"
+    with sqlite3.connect(database.DATABASE_PATH) as conn:
+        symbol_id = conn.execute("SELECT symbol_id FROM symbols WHERE symbol = 'AAA'").fetchone()[0]
+        # Mark every rollup row, then change the daily volumes from `since` on
+        conn.execute("UPDATE stock_data_rollup SET bars = -1")
+        conn.execute("UPDATE stock_data_daily SET volume = volume + 1000000 WHERE symbol_id = ? AND date >= ?",
+                     (symbol_id, since))
+        written = refresh_rollups(conn, "AAA", since)
+        conn.commit()
+        rows = conn.execute("SELECT symbol_id, interval, date, bars FROM stock_data_rollup").fetchall()
+
+    rewritten = {(interval, date) for symbol, interval, date, bars in rows if bars != -1}
+    expected = {(interval, period_start(f"2020-{month:02d}-{day:02d}", interval))
+                for interval in ("1w", "1mo") for month in (4, 5) for day in range(1, 31)
+                if f"2020-{month:02d}-{day:02d}" >= since}
+    # Only AAA's periods containing `since` or later were written
+    assert {symbol for symbol, _, _, bars in rows if bars != -1} == {symbol_id}
+    assert rewritten == expected and written == len(expected)
+
+    for interval in ("1w", "1mo"):
+        bars = {bar["time"]: bar for bar in fetch_resampled("AAA", interval, PriceWindow(start="2020-01-01"))}
+        for bar in reference("AAA", interval):
+            if bar["time"] >= period_start(since, interval):
+                assert bars[bar["time"]] == bar
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Tests for the screen language: definitions are validated before any SQL is
+built, and the compiled SQL, the NumPy evaluation and /scan agree, NULLs
+included
+"""
+
+import sqlite3
+from urllib.parse import quote
+
+import pytest
+
+import database
+import latest_session
+from cache import result_cache
+from screens import MEMBER_COLUMNS, SCREEN_COLUMNS, SCREENS, ScreenError, compile_screen, evaluate_screens
+
+SYMBOLS = ("SPY", "AAA", "BBB", "CCC", "DDD", "EEE", "FFF", "GGG")
+BARS = 260
+
+DEFINITIONS = [
+    "is_gap_up = 1 AND rsi_14 < 70 AND close > ema_50 ORDER BY rs DESC",
+    "NOT rsi_14 < 50",
+    "ema_200 IS NULL OR close > ema_200 ORDER BY rsi_14 ASC",
+    "(is_bull_bar = 1 OR is_doji_bar = 1) AND NOT (signal = -1 AND rsi_14 > 60) ORDER BY volume",
+    "percent_change >= -1.5 AND percent_change <> 0 ORDER BY percent_change ASC",
+    "ORDER BY rs_rank DESC",
+]
+
+
+def test_invalid_definitions_are_rejected():
+    for definition in (
+        "is_gap_up = 1; DROP TABLE symbols",
+        "close > 'a'",
+        "rs_rank >= 50) OR (1 = 1",
+        "symbol = 1",
+        "sqlite_master = 1",
+        "1 = 1",
+        "close >",
+        "rsi_14 < 70 ORDER BY rs SIDEWAYS",
+        "ORDER BY",
+        "x" * 2000,
+        "(" * 400 + "rs > 1" + ")" * 400,
+    ):
+        with pytest.raises(ScreenError):
+            compile_screen(definition)
+
+
+def test_compiled_sql_binds_numbers():
+    screen = compile_screen("is_gap_up = 1 AND (rsi_14 < 70 OR close > ema_50) AND signal = -1 ORDER BY rs ASC")
+    assert screen.condition == "d.is_gap_up = 1 AND (d.rsi_14 < ? OR d.close > d.ema_50) AND d.signal = ?"
+    assert screen.params == (70, -1)
+    assert "ORDER BY d.rs ASC NULLS LAST, d.symbol_id ASC" in screen.query
+    assert compile_screen("is_gap_up  =  1") is compile_screen("is_gap_up = 1")
+
+
+def test_screen_columns_exist():
+    with sqlite3.connect(":memory:") as conn:
+        conn.executescript(open("stockdb.sql").read())
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(stock_data_daily)")}
+    assert SCREEN_COLUMNS <= columns
+
+
+@pytest.mark.parametrize("date", ["2020-03-01", "2020-09-15"])
+def test_sql_matches_numpy_evaluation(client, date):
+    screens = [compile_screen(definition) for definition in DEFINITIONS] + list(SCREENS.values())
+    with database.get_db_connection() as conn:
+        rows = [dict(row) for row in conn.execute(f"""
+            SELECT s.symbol, s.type, d.close AS last_price, {", ".join(f"d.{c}" for c in sorted(SCREEN_COLUMNS))}
+            FROM stock_data_daily d JOIN symbols s ON s.symbol_id = d.symbol_id
+            WHERE d.date = ? ORDER BY d.symbol_id
+        """, (date,))]
+        evaluated = evaluate_screens(rows, screens)
+        for screen in screens:
+            from_sql = [dict(row) for row in conn.execute(screen.query, screen.bind(date))]
+            assert from_sql == evaluated[screen.id]["members"], screen.definition
+    assert any(evaluated[compile_screen(d).id]["count"] for d in DEFINITIONS)
+
+
+def test_scan_snapshot_matches_sql(client, monkeypatch):
+    latest = client.get("/maxdate").json()
+    urls = [f"/scan?date={latest}&screen={quote(definition)}&limit=3" for definition in DEFINITIONS]
+    urls += [f"/scan?date={latest}&screen=gapdown"]
+    from_memory = [(r.status_code, r.content) for r in map(client.get, urls)]
+    monkeypatch.setattr(latest_session, "SNAPSHOT_ENABLED", False)
+    result_cache.clear()
+    assert [(r.status_code, r.content) for r in map(client.get, urls)] == from_memory
+    assert sum(status == 200 for status, _ in from_memory) >= 3
+    assert all(set(member) == set(MEMBER_COLUMNS) for member in client.get(urls[-1]).json())
+
+    invalid = client.get(f"/scan?date={latest}&screen={quote('close > 1 OR 1 = 1')}")
+    assert invalid.status_code == 400 and "must name a column" in invalid.json()["detail"]
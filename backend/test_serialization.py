@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Tests for the packed columnar payload: decoding format=binary gives the same
+bars (and downsampled lines) as the JSON rows, and integer columns round
+rather than truncate
+"""
+
+import struct
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from downsample import LINE_COLUMNS
+from price_data import BINARY_LAYOUT, DOWNSAMPLED_BAR_LAYOUT, LINE_LAYOUT
+from serialization import BINARY_MAGIC, pack_columns
+
+SYMBOLS = ("SPY", "AAA")
+BARS = 260
+
+EPOCH = date(1970, 1, 1)
+
+
+def unpack_columns(payload: bytes, layout) -> list:
+    """Decode a pack_columns buffer back into rows, as the frontend's decodePriceData does"""
+    assert payload[:4] == BINARY_MAGIC
+    (count,) = struct.unpack_from("<I", payload, 4)
+    offset, columns = 8, {}
+    for name, dtype in layout:
+        dtype = np.dtype("<i4" if dtype == "date" else dtype)
+        column = np.frombuffer(payload, dtype=dtype, count=count, offset=offset)
+        offset += column.nbytes
+        if name == "time":
+            columns[name] = [(EPOCH + timedelta(days=int(d))).isoformat() for d in column]
+        elif dtype.kind == "f":
+            columns[name] = [None if np.isnan(v) else float(v) for v in column]
+        else:
+            columns[name] = [int(v) for v in column]
+    assert offset == len(payload)
+    return [{name: columns[name][i] for name, _ in layout} for i in range(count)]
+
+
+def split_packed(payload: bytes, layouts) -> list:
+    """Cut a concat_packed body into its buffers, one per layout"""
+    buffers, offset = [], 0
+    for layout in layouts:
+        (count,) = struct.unpack_from("<I", payload, offset + 4)
+        size = 8 + count * sum(4 if dtype == "date" else np.dtype(dtype).itemsize for _, dtype in layout)
+        buffers.append(payload[offset:offset + size])
+        offset += size + -size % 8
+    assert offset == len(payload)
+    return buffers
+
+
+@pytest.mark.parametrize("params", ["bars=260", "interval=1w&bars=30"])
+def test_binary_round_trip_matches_json(client, params):
+    rows = client.get(f"/price-data/AAA?{params}")
+    packed = client.get(f"/price-data/AAA?{params}&format=binary")
+    assert packed.headers["content-type"] == "application/octet-stream"
+    decoded = unpack_columns(packed.content, BINARY_LAYOUT)
+    expected = rows.json()
+    assert len(decoded) == len(expected) > 0
+    # Missing EMAs travel as NaN
+    assert any(row["ema_200"] is None for row in expected)
+    for bar, row in zip(decoded, expected):
+        assert bar == {name: row.get(name) for name, _ in BINARY_LAYOUT}
+
+
+@pytest.mark.parametrize("params", ["bars=120&max_points=51", "bars=120&max_points=200"])
+def test_downsampled_binary_matches_json(client, params):
+    expected = client.get(f"/price-data/AAA?{params}").json()
+    packed = client.get(f"/price-data/AAA?{params}&format=binary").content
+    layouts = [DOWNSAMPLED_BAR_LAYOUT] + [LINE_LAYOUT] * len(LINE_COLUMNS)
+    bars, *lines = [unpack_columns(buffer, layout) for buffer, layout in zip(split_packed(packed, layouts), layouts)]
+    assert bars == expected["bars"]
+    assert dict(zip(LINE_COLUMNS, lines)) == expected["lines"]
+    # The lines skip the EMA warm-up instead of sending NaN
+    assert 0 < len(expected["lines"]["ema_200"]) < len(expected["lines"]["ema_21"])
+
+
+def test_integer_columns_round():
+    rows = [
+        {"time": "2024-01-02", "volume": 1500.7, "close": 1.0},
+        {"time": "2024-01-03", "volume": 1500.2, "close": None},
+        {"time": "2024-01-04", "volume": 7, "close": 2.5},
+    ]
+    layout = (("close", "<f8"), ("volume", "<i8"), ("time", "date"))
+    decoded = unpack_columns(pack_columns(rows, layout), layout)
+    assert [bar["volume"] for bar in decoded] == [1501, 1500, 7]
+    assert [bar["close"] for bar in decoded] == [1.0, None, 2.5]
+    assert [bar["time"] for bar in decoded] == ["2024-01-02", "2024-01-03", "2024-01-04"]
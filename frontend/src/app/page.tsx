@@ -21,6 +21,12 @@ export default function Home() {
     price_change?: number;
     percent_change?: number;
   }> | null>(null);
+  // Members of every screen for the date, keyed by watchlist id
+  const [screens, setScreens] = useState<Record<string, {
+    name: string;
+    count: number;
+    members: NonNullable<typeof watchlistData>;
+  }> | null>(null);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
   const [date, setDate] = useState<string>("");
@@ -338,92 +344,40 @@ export default function Home() {
       .catch(e => console.error('Failed to fetch max date:', e));
   }, [isRealTimeEnabled, userApiKey]);
 
+  // Every watchlist of the date comes from one /screens call, so switching watchlists needs no request
   useEffect(() => {
-    if (!date || !selectedWatchlistId) return;
+    if (!date) return;
 
     setLoading(true);
     setError(null);
-    setSelectedSymbol(null); // Clear selected symbol when watchlist changes
-    setSortColumn(null); // Clear sorting when watchlist changes to preserve server order
-    setSortDirection('asc');
-    
-    let baseUrl = '';
-    const additionalParams: Record<string, string> = { date };
-    
-    switch (selectedWatchlistId) {
-      case 'new-highs-63':
-        baseUrl = API_ENDPOINTS.newHighs;
-        additionalParams.period = '63';
-        break;
-      case 'new-highs-252':
-        baseUrl = API_ENDPOINTS.newHighs;
-        additionalParams.period = '252';
-        break;
-      case 'new-lows-63':
-        baseUrl = API_ENDPOINTS.newLows;
-        additionalParams.period = '63';
-        break;
-      case 'new-lows-252':
-        baseUrl = API_ENDPOINTS.newLows;
-        additionalParams.period = '252';
-        break;
-      case 'gapup':
-        baseUrl = API_ENDPOINTS.gapup;
-        break;
-      case 'gapdown':
-        baseUrl = API_ENDPOINTS.gapdown;
-        break;
-      case 'swing-high-cross-up':
-        baseUrl = API_ENDPOINTS.swingHighCross;
-        additionalParams.direction = 'up';
-        break;
-      case 'swing-high-cross-down':
-        baseUrl = API_ENDPOINTS.swingHighCross;
-        additionalParams.direction = 'down';
-        break;
-      case 'swing-low-cross-up':
-        baseUrl = API_ENDPOINTS.swingLowCross;
-        additionalParams.direction = 'up';
-        break;
-      case 'swing-low-cross-down':
-        baseUrl = API_ENDPOINTS.swingLowCross;
-        additionalParams.direction = 'down';
-        break;
-      case 'new-buys':
-        baseUrl = API_ENDPOINTS.newSignals;
-        additionalParams.signal = 'buy';
-        break;
-      case 'new-sells':
-        baseUrl = API_ENDPOINTS.newSignals;
-        additionalParams.signal = 'sell';
-        break;
-      case '52-week-rs':
-        baseUrl = API_ENDPOINTS.weekRelativeStrength;
-        break;
-      default:
-        setWatchlistData([]);
-        setLoading(false);
-        return;
-    }
+    setScreens(null);
 
-    fetch(buildApiUrl(baseUrl, additionalParams))
+    fetch(buildApiUrl(API_ENDPOINTS.screens, { date }))
       .then(res => {
         if (!res.ok) throw new Error(`HTTP ${res.status}: ${res.statusText}`);
         return res.json();
       })
       .then(data => {
-        const dataArray = Array.isArray(data) ? data : [];
-        setWatchlistData(dataArray);
-        
-        // Note: Selected symbol will be set by separate useEffect based on filtered data
+        setScreens(data && typeof data === 'object' && data.screens ? data.screens : {});
       })
       .catch(e => {
         setError(e.message);
-        setWatchlistData([]);
-        setSelectedSymbol(null);
+        setScreens({});
       })
       .finally(() => setLoading(false));
-  }, [selectedWatchlistId, date, isRealTimeEnabled, userApiKey]);
+  }, [date, isRealTimeEnabled, userApiKey]);
+
+  useEffect(() => {
+    setSelectedSymbol(null); // Clear selected symbol when watchlist changes
+    setSortColumn(null); // Clear sorting when watchlist changes to preserve server order
+    setSortDirection('asc');
+    if (screens === null) {
+      setWatchlistData(null);
+      return;
+    }
+    // Note: Selected symbol will be set by separate useEffect based on filtered data
+    setWatchlistData(screens[selectedWatchlistId]?.members ?? []);
+  }, [selectedWatchlistId, screens]);
 
   // Auto-select first symbol from filtered watchlist when data or filters change
   useEffect(() => {
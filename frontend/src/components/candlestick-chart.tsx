@@ -3,7 +3,8 @@
 import React, { useEffect, useRef, useState } from 'react';
 import { createChart, ColorType, IChartApi, ISeriesApi } from 'lightweight-charts';
 import { API_ENDPOINTS } from '../lib/api-config';
-import { getRealtimeService, RealtimePrice } from '../lib/realtime-data';
+import { decodeDownsampledPriceData, LinePoint } from '../lib/price-data';
+import { getRealtimeService, RealtimeCandle } from '../lib/realtime-data';
 import { shouldEnableRealtimeData, getMarketStatusDisplay, shouldEnableRealtimeDataSync, getMarketStatusDisplaySync } from '../lib/market-hours';
 import { Input } from './catalyst/input';
 import { Button } from './catalyst/button';
@@ -28,14 +29,18 @@ interface CandlestickChartProps {
 
 type TimePeriod = '3M' | '6M' | '1Y' | '2Y' | '5Y';
 
-const TIME_PERIODS: { label: string; value: TimePeriod; days: number }[] = [
-  { label: '3 Months', value: '3M', days: 90 },
-  { label: '6 Months', value: '6M', days: 180 },
-  { label: '1 Year', value: '1Y', days: 365 },
-  { label: '2 Years', value: '2Y', days: 730 },
-  { label: '5 Years', value: '5Y', days: 1825 },
+// Trading bars per period (about 21 sessions a month, 252 a year)
+const TIME_PERIODS: { label: string; value: TimePeriod; bars: number }[] = [
+  { label: '3 Months', value: '3M', bars: 63 },
+  { label: '6 Months', value: '6M', bars: 126 },
+  { label: '1 Year', value: '1Y', bars: 252 },
+  { label: '2 Years', value: '2Y', bars: 504 },
+  { label: '5 Years', value: '5Y', bars: 1260 },
 ];
 
+// The API's MAX_BARS; the server treats any larger max_points as this
+const MAX_POINTS = 5000;
+
 export const CandlestickChart: React.FC<CandlestickChartProps> = ({
   symbol,
   isDarkMode = false,
@@ -201,21 +206,45 @@ export const CandlestickChart: React.FC<CandlestickChartProps> = ({
         setError(null);
 
         const selectedPeriodData = TIME_PERIODS.find(p => p.value === selectedPeriod);
-        const days = selectedPeriodData?.days || 365;
+        const bars = selectedPeriodData?.bars || 252;
 
         try {
-          const url = buildApiUrl(`${API_ENDPOINTS.priceData}/${displaySymbol}`, { days: days.toString() });
+          // No more than one bar per pixel of chart width; the server merges the rest
+          const maxPoints = Math.min(Math.max(chartContainerRef.current?.clientWidth || 1000, 100), MAX_POINTS);
+          const url = buildApiUrl(`${API_ENDPOINTS.priceData}/${displaySymbol}`, {
+            bars: bars.toString(),
+            format: 'binary',
+            max_points: maxPoints.toString(),
+          });
           const response = await fetch(url);
           if (!response.ok) {
             throw new Error(`HTTP ${response.status}: ${response.statusText}`);
           }
 
-          const data: CandlestickData[] = await response.json();
+          // Packed columns are about a third the size of the row JSON
+          const { bars, lines } = decodeDownsampledPriceData(await response.arrayBuffer());
           
-          if (data.length === 0) {
+          if (bars.length === 0) {
             throw new Error('No price data available');
           }
 
+          // The EMA points are picked within each merged bar by LTTB, at their own dates;
+          // the OHLCV display shows each bar with the latest EMA values up to its date
+          const valuesAt = (points: LinePoint[]) => {
+            let j = -1;
+            return bars.map(bar => {
+              while (j + 1 < points.length && points[j + 1].time <= bar.time) j++;
+              return j >= 0 ? points[j].value : null;
+            });
+          };
+          const ema21Values = valuesAt(lines.ema_21);
+          const ema200Values = valuesAt(lines.ema_200);
+          const data: CandlestickData[] = bars.map((bar, i) => ({
+            ...bar,
+            ema_21: ema21Values[i],
+            ema_200: ema200Values[i],
+          }));
+
 
           // Store the original data for OHLCV display
           setChartData(data);
@@ -252,20 +281,16 @@ export const CandlestickChart: React.FC<CandlestickChartProps> = ({
             color: item.close > item.open ? '#22c55e40' : '#ef444440',
           }));
 
-          // Extract EMA data from API response (only include values where EMA exists)
-          const ema21Data = data
-            .filter(item => item.ema_21 !== null && item.ema_21 !== undefined)
-            .map(item => ({
-              time: convertToTimestamp(item.time),
-              value: item.ema_21!,
-            }));
+          // The EMA lines are plotted as sent, each point at its own date
+          const ema21Data = lines.ema_21.map(point => ({
+            time: convertToTimestamp(point.time),
+            value: point.value,
+          }));
 
-          const ema200Data = data
-            .filter(item => item.ema_200 !== null && item.ema_200 !== undefined)
-            .map(item => ({
-              time: convertToTimestamp(item.time),
-              value: item.ema_200!,
-            }));
+          const ema200Data = lines.ema_200.map(point => ({
+            time: convertToTimestamp(point.time),
+            value: point.value,
+          }));
 
 
           // Set data to series
@@ -361,9 +386,9 @@ export const CandlestickChart: React.FC<CandlestickChartProps> = ({
   useEffect(() => {
     const realtimeService = getRealtimeService();
     
-    // Check market status using EODHD API (async)
+    // Check market status from the backend's market hours (async)
     const checkMarketStatus = async () => {
-      // Use the proper async version to get EODHD data
+      // Use the proper async version to get the exchange's sessions and holidays
       const shouldEnable = await shouldEnableRealtimeData();
       
       // Force enable realtime for specific symbols in development
@@ -388,87 +413,36 @@ export const CandlestickChart: React.FC<CandlestickChartProps> = ({
         return;
       }
 
-    // Set up realtime data callbacks
-    realtimeService.onData((data: RealtimePrice) => {
-      if (data.symbol === displaySymbol) {
-        setLastPrice(data.price);
-        
-        // Update the chart with realtime price
-        if (candlestickSeriesRef.current) {
-          const currentDate = new Date().toISOString().split('T')[0]; // Get current date (YYYY-MM-DD)
-          const currentTimestamp = Math.floor(new Date().setHours(0, 0, 0, 0) / 1000); // Today's timestamp
-          
-          if (chartData.length > 0) {
-            const lastCandle = chartData[chartData.length - 1];
-            
-            // If it's the same day as the last candle, update it
-            if (lastCandle.time === currentDate) {
-              const updatedCandle = {
-                ...lastCandle,
-                close: data.price,
-                high: Math.max(lastCandle.high, data.price),
-                low: Math.min(lastCandle.low, data.price),
-              };
-              
-              candlestickSeriesRef.current.update({
-                time: currentTimestamp,
-                open: updatedCandle.open,
-                high: updatedCandle.high,
-                low: updatedCandle.low,
-                close: updatedCandle.close,
-              });
-              
-              // Update our local data too
-              const newChartData = [...chartData];
-              newChartData[newChartData.length - 1] = updatedCandle;
-              setChartData(newChartData);
-            } else {
-              // Create a new candle for today
-              const previousClose = lastCandle.close;
-              const newCandle = {
-                time: currentDate,
-                open: previousClose, // Use previous close as today's open
-                high: Math.max(previousClose, data.price),
-                low: Math.min(previousClose, data.price),
-                close: data.price,
-                volume: 0, // We don't have volume from price updates
-              };
-              
-              candlestickSeriesRef.current.update({
-                time: currentTimestamp,
-                open: newCandle.open,
-                high: newCandle.high,
-                low: newCandle.low,
-                close: newCandle.close,
-              });
-              
-              // Add to our local data
-              const newChartData = [...chartData, newCandle];
-              setChartData(newChartData);
-            }
-          } else {
-            // No historical data - create first candle
-            const newCandle = {
-              time: currentDate,
-              open: data.price,
-              high: data.price,
-              low: data.price,
-              close: data.price,
-              volume: 0,
-            };
-            
-            candlestickSeriesRef.current.update({
-              time: currentTimestamp,
-              open: newCandle.open,
-              high: newCandle.high,
-              low: newCandle.low,
-              close: newCandle.close,
-            });
-            
-            setChartData([newCandle]);
-          }
-        }
-      }
+    // Set up realtime data callbacks: the backend sends the session's bar so far
+    realtimeService.onBar((bar: RealtimeCandle) => {
+      if (bar.symbol !== displaySymbol) return;
+      setLastPrice(bar.close);
+      if (!candlestickSeriesRef.current) return;
+
+      // Same local-date timestamp as the historical bars
+      const [year, month, day] = bar.time.split('-').map(Number);
+      const barTimestamp = Math.floor(new Date(year, month - 1, day).getTime() / 1000);
+      candlestickSeriesRef.current.update({
+        time: barTimestamp,
+        open: bar.open,
+        high: bar.high,
+        low: bar.low,
+        close: bar.close,
+      });
+      volumeSeriesRef.current?.update({
+        time: barTimestamp,
+        value: bar.volume,
+        color: bar.close > bar.open ? '#22c55e40' : '#ef444440',
+      });
+
+      // Replace the session's candle in our local data, or add it
+      const candle = { time: bar.time, open: bar.open, high: bar.high, low: bar.low, close: bar.close, volume: bar.volume };
+      setChartData(previous => {
+        const last = previous[previous.length - 1];
+        return last && last.time === bar.time
+          ? [...previous.slice(0, -1), { ...last, ...candle }]
+          : [...previous, candle];
+      });
     });
 
     realtimeService.onError((error: Error) => {
@@ -495,7 +469,7 @@ export const CandlestickChart: React.FC<CandlestickChartProps> = ({
         realtimeService.unsubscribeFromSymbol(displaySymbol);
       }
     };
-  }, [displaySymbol, chartData]);
+  }, [displaySymbol]);
 
   if (!symbol && !displaySymbol) {
     return (
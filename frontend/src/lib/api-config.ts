@@ -16,6 +16,10 @@ export const API_ENDPOINTS = {
   swingLowCross: `${API_BASE_URL}/swing-low-cross`,
   newSignals: `${API_BASE_URL}/new-signals`,
   weekRelativeStrength: `${API_BASE_URL}/52-week-relative-strength`,
-  priceData: `${API_BASE_URL}/price-data`
+  priceData: `${API_BASE_URL}/price-data`,
+  screens: `${API_BASE_URL}/screens`,
+  marketHours: `${API_BASE_URL}/market-hours`
 };
 
+// Live bars and screen events, shared by every browser through the backend's one upstream feed
+export const REALTIME_WS_URL = `${API_BASE_URL.replace(/^http/, 'ws')}/ws/realtime`;
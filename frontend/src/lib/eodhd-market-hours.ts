@@ -1,7 +1,10 @@
 /**
  * EODHD API service for fetching real market hours and holidays
+ * The exchange details come through the backend's /market-hours, which holds the EODHD token
  */
 
+import { API_ENDPOINTS } from './api-config';
+
 export interface EODHDExchangeDetails {
   Name: string;
   Code: string;
@@ -31,24 +34,13 @@ export interface MarketSession {
 }
 
 class EODHDMarketHoursService {
-  private apiToken: string;
-  private exchangeCode: string;
   private cachedExchangeDetails: EODHDExchangeDetails | null = null;
   private cacheExpiry: number = 0;
   private readonly cacheDuration = 24 * 60 * 60 * 1000; // 24 hours in milliseconds
   private hasLoggedNoSessionsWarning = false; // Track if we've already logged the warning
 
-  constructor() {
-    this.apiToken = process.env.NEXT_PUBLIC_EODHD_API_TOKEN || '';
-    this.exchangeCode = process.env.NEXT_PUBLIC_EODHD_EXCHANGE_CODE || 'US';
-    
-    if (!this.apiToken) {
-      console.warn('EODHD API token not found. Market hours will use default values.');
-    }
-  }
-
   /**
-   * Fetch exchange details from EODHD API
+   * Fetch exchange details from the backend (EODHD exchange details)
    */
   async fetchExchangeDetails(): Promise<EODHDExchangeDetails | null> {
     // Return cached data if still valid
@@ -56,15 +48,8 @@ class EODHDMarketHoursService {
       return this.cachedExchangeDetails;
     }
 
-    if (!this.apiToken) {
-      return null;
-    }
-
     try {
-      const url = `https://eodhd.com/api/exchange-details/${this.exchangeCode}?api_token=${this.apiToken}&fmt=json`;
-      
-
-      const response = await fetch(url);
+      const response = await fetch(API_ENDPOINTS.marketHours);
       
       if (!response.ok) {
         throw new Error(`HTTP ${response.status}: ${response.statusText}`);
@@ -79,7 +64,7 @@ class EODHDMarketHoursService {
 
       return data;
     } catch (error) {
-      console.error('Failed to fetch exchange details from EODHD:', error);
+      console.error('Failed to fetch exchange details, market hours will use default values:', error);
       return null;
     }
   }
@@ -0,0 +1,120 @@
+// Decoder for the packed columnar price-data payload (GET /price-data/{symbol}?format=binary).
+//
+// Layout, all little-endian:
+//   "COL1" magic, uint32 bar count n
+//   float64[n] open, high, low, close, ema_21, ema_200 (NaN when missing)
+//   int64[n]   volume
+//   int32[n]   date as days since 1970-01-01
+//
+// With max_points the series is downsampled (GET ...&max_points=N&format=binary)
+// and the body is several such buffers, each padded to a multiple of 8 bytes:
+//   the bars: float64[n] open, high, low, close; int64[n] volume; int32[n] date
+//   then per line (ema_21, ema_200): "COL1", uint32 m; float64[m] value; int32[m] date
+
+export interface PriceBar {
+  time: string;
+  open: number;
+  high: number;
+  low: number;
+  close: number;
+  volume: number;
+  ema_21?: number | null;
+  ema_200?: number | null;
+}
+
+export interface LinePoint {
+  time: string;
+  value: number;
+}
+
+export interface DownsampledPriceData {
+  bars: PriceBar[];
+  lines: Record<(typeof LINE_COLUMNS)[number], LinePoint[]>;
+}
+
+const MAGIC = 'COL1';
+const LINE_COLUMNS = ['ema_21', 'ema_200'] as const;
+const HEADER_BYTES = 8;
+const FLOAT_COLUMNS = ['open', 'high', 'low', 'close', 'ema_21', 'ema_200'] as const;
+const MS_PER_DAY = 86_400_000;
+
+const toDate = (days: number) => new Date(days * MS_PER_DAY).toISOString().slice(0, 10);
+
+// Bar count of the buffer starting at offset, after checking its magic
+function readHeader(buffer: ArrayBuffer, offset: number): number {
+  const magic = String.fromCharCode(...new Uint8Array(buffer, offset, 4));
+  if (magic !== MAGIC) {
+    throw new Error(`Unexpected price data format: ${magic}`);
+  }
+  return new DataView(buffer).getUint32(offset + 4, true);
+}
+
+export function decodePriceData(buffer: ArrayBuffer): PriceBar[] {
+  const n = readHeader(buffer, 0);
+
+  // Columns start 8-byte aligned, so they can be viewed in place
+  let offset = HEADER_BYTES;
+  const floats: Record<string, Float64Array> = {};
+  for (const name of FLOAT_COLUMNS) {
+    floats[name] = new Float64Array(buffer, offset, n);
+    offset += n * 8;
+  }
+  const volume = new BigInt64Array(buffer, offset, n);
+  offset += n * 8;
+  const days = new Int32Array(buffer, offset, n);
+
+  const nullable = (value: number) => (Number.isNaN(value) ? null : value);
+  const bars: PriceBar[] = new Array(n);
+  for (let i = 0; i < n; i++) {
+    bars[i] = {
+      time: toDate(days[i]),
+      open: floats.open[i],
+      high: floats.high[i],
+      low: floats.low[i],
+      close: floats.close[i],
+      volume: Number(volume[i]),
+      ema_21: nullable(floats.ema_21[i]),
+      ema_200: nullable(floats.ema_200[i]),
+    };
+  }
+  return bars;
+}
+
+export function decodeDownsampledPriceData(buffer: ArrayBuffer): DownsampledPriceData {
+  const align = (offset: number) => Math.ceil(offset / 8) * 8;
+
+  const n = readHeader(buffer, 0);
+  let offset = HEADER_BYTES;
+  const floats: Record<string, Float64Array> = {};
+  for (const name of ['open', 'high', 'low', 'close']) {
+    floats[name] = new Float64Array(buffer, offset, n);
+    offset += n * 8;
+  }
+  const volume = new BigInt64Array(buffer, offset, n);
+  offset += n * 8;
+  const days = new Int32Array(buffer, offset, n);
+  offset = align(offset + n * 4);
+
+  const bars: PriceBar[] = new Array(n);
+  for (let i = 0; i < n; i++) {
+    bars[i] = {
+      time: toDate(days[i]),
+      open: floats.open[i],
+      high: floats.high[i],
+      low: floats.low[i],
+      close: floats.close[i],
+      volume: Number(volume[i]),
+    };
+  }
+
+  // Each line point sits at its own bar's date, not necessarily one of the bars' dates
+  const lines = {} as DownsampledPriceData['lines'];
+  for (const name of LINE_COLUMNS) {
+    const m = readHeader(buffer, offset);
+    const values = new Float64Array(buffer, offset + HEADER_BYTES, m);
+    const lineDays = new Int32Array(buffer, offset + HEADER_BYTES + m * 8, m);
+    lines[name] = Array.from(values, (value, i) => ({ time: toDate(lineDays[i]), value }));
+    offset = align(offset + HEADER_BYTES + m * 12);
+  }
+  return { bars, lines };
+}
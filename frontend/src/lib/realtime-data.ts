@@ -1,8 +1,11 @@
 /**
- * EODHD WebSocket service for realtime stock data
- * Handles live price updates during market hours
+ * Realtime bar service for the dashboard
+ * Subscribes to the backend's /ws/realtime, which holds the one upstream trade
+ * feed for every browser and sends each watched symbol's current-session bar
  */
 
+import { REALTIME_WS_URL } from './api-config';
+
 export interface RealtimePrice {
   symbol: string;
   price: number;
@@ -20,60 +23,64 @@ export interface RealtimeCandle {
   low: number;
   close: number;
   volume: number;
+  trades?: number;
+  // False when the bar started after the session opened or lived through a feed interruption
+  complete?: boolean;
+}
+
+export interface RealtimeScreenEvents {
+  watchlist: string;
+  events: Array<Record<string, unknown>>;
 }
 
 type RealtimeDataCallback = (data: RealtimePrice) => void;
+type RealtimeBarCallback = (bar: RealtimeCandle) => void;
+type ScreensCallback = (update: RealtimeScreenEvents) => void;
 type ErrorCallback = (error: Error) => void;
 type StatusCallback = (status: 'connecting' | 'connected' | 'disconnected' | 'error') => void;
 
-export class EODHDRealtimeService {
+// The backend closes with this code when it has no realtime feed configured
+const FEED_NOT_CONFIGURED = 1013;
+
+export class RealtimeService {
   private ws: WebSocket | null = null;
   private reconnectAttempts = 0;
   private maxReconnectAttempts = 5;
   private reconnectDelay = 1000;
   private subscribedSymbols = new Set<string>();
   private dataCallback: RealtimeDataCallback | null = null;
+  private barCallback: RealtimeBarCallback | null = null;
+  private screensCallback: ScreensCallback | null = null;
   private errorCallback: ErrorCallback | null = null;
   private statusCallback: StatusCallback | null = null;
-  
-  private readonly apiToken: string;
+
   private readonly wsUrl: string;
 
-  constructor() {
-    this.apiToken = process.env.NEXT_PUBLIC_EODHD_API_TOKEN || '';
-    this.wsUrl = process.env.NEXT_PUBLIC_EODHD_WS_US_TRADE || '';
-    
-    
-    if (!this.apiToken || !this.wsUrl) {
-      throw new Error('EODHD API token and WebSocket URL are required');
-    }
-    
-    // Validate token format
-    if (!this.validateTokenFormat(this.apiToken)) {
-      console.warn('EODHD API token may have invalid format. Please check your token configuration.');
-    }
+  constructor(wsUrl: string = REALTIME_WS_URL) {
+    this.wsUrl = wsUrl;
   }
 
   /**
-   * Connect to EODHD WebSocket
+   * Connect to the backend realtime WebSocket
    */
   connect(): Promise<void> {
+    if (this.ws && (this.ws.readyState === WebSocket.OPEN || this.ws.readyState === WebSocket.CONNECTING)) {
+      return Promise.resolve();
+    }
     return new Promise((resolve, reject) => {
       try {
         this.statusCallback?.('connecting');
-        
-        const wsUrlWithAuth = `${this.wsUrl}?api_token=${this.apiToken}`;
-        this.ws = new WebSocket(wsUrlWithAuth);
+        this.ws = new WebSocket(this.wsUrl);
 
         this.ws.onopen = () => {
           this.reconnectAttempts = 0;
           this.statusCallback?.('connected');
-          
-          // Re-subscribe to any previously subscribed symbols
-          this.subscribedSymbols.forEach(symbol => {
-            this.subscribeToSymbol(symbol);
-          });
-          
+
+          // Re-subscribe to any previously subscribed symbols in one message
+          if (this.subscribedSymbols.size > 0) {
+            this.send({ action: 'subscribe', symbols: Array.from(this.subscribedSymbols) });
+          }
+
           resolve();
         };
 
@@ -88,8 +95,13 @@ export class EODHDRealtimeService {
         };
 
         this.ws.onclose = (event) => {
+          if (event.code === FEED_NOT_CONFIGURED) {
+            this.statusCallback?.('error');
+            this.errorCallback?.(new Error(event.reason || 'Realtime feed is not configured'));
+            return;
+          }
           this.statusCallback?.('disconnected');
-          
+
           // Attempt to reconnect if not manually closed
           if (event.code !== 1000 && this.reconnectAttempts < this.maxReconnectAttempts) {
             this.attemptReconnect();
@@ -97,24 +109,14 @@ export class EODHDRealtimeService {
         };
 
         this.ws.onerror = (error) => {
-          console.error('EODHD WebSocket error details:', {
+          console.error('Realtime WebSocket error details:', {
             error,
             readyState: this.ws?.readyState,
-            url: wsUrlWithAuth.replace(this.apiToken, 'TOKEN_HIDDEN'),
+            url: this.wsUrl,
             timestamp: new Date().toISOString(),
-            tokenValid: this.validateTokenFormat(this.apiToken),
             reconnectAttempt: this.reconnectAttempts
           });
-          
-          // Check if it's an authentication error
-          if (this.ws?.readyState === WebSocket.CONNECTING) {
-            if (!this.validateTokenFormat(this.apiToken)) {
-              console.error('Connection failed - API token may be invalid or malformed');
-            } else {
-              console.error('Connection failed - possible authentication or network issue');
-            }
-          }
-          
+
           this.statusCallback?.('error');
           const errorMessage = `WebSocket connection error${this.reconnectAttempts > 0 ? ` (attempt ${this.reconnectAttempts + 1})` : ''}`;
           this.errorCallback?.(new Error(errorMessage));
@@ -139,49 +141,57 @@ export class EODHDRealtimeService {
   }
 
   /**
-   * Subscribe to real-time data for a symbol
+   * Subscribe to the live bar of a symbol
    */
   subscribeToSymbol(symbol: string): void {
-    if (!this.ws || this.ws.readyState !== WebSocket.OPEN) {
-      // Store for later subscription when connected
-      this.subscribedSymbols.add(symbol);
-      return;
-    }
-
-    const subscribeMessage = {
-      action: 'subscribe',
-      symbols: symbol
-    };
-
-    this.ws.send(JSON.stringify(subscribeMessage));
+    // Stored for (re-)subscription when connected
     this.subscribedSymbols.add(symbol);
+    this.send({ action: 'subscribe', symbols: symbol });
   }
 
   /**
-   * Unsubscribe from real-time data for a symbol
+   * Unsubscribe from the live bar of a symbol
    */
   unsubscribeFromSymbol(symbol: string): void {
-    if (!this.ws || this.ws.readyState !== WebSocket.OPEN) {
-      this.subscribedSymbols.delete(symbol);
-      return;
-    }
+    this.subscribedSymbols.delete(symbol);
+    this.send({ action: 'unsubscribe', symbols: symbol });
+  }
 
-    const unsubscribeMessage = {
-      action: 'unsubscribe',
-      symbols: symbol
-    };
+  /**
+   * Follow live entries and exits of screens (default: every live screen) over a watchlist's symbols
+   */
+  watch(watchlist: string, symbols: string[], screens?: string[]): void {
+    this.send({ action: 'watch', watchlist, symbols, ...(screens ? { screens } : {}) });
+  }
 
-    this.ws.send(JSON.stringify(unsubscribeMessage));
-    this.subscribedSymbols.delete(symbol);
+  /**
+   * Stop following a watchlist
+   */
+  unwatch(watchlist: string): void {
+    this.send({ action: 'unwatch', watchlist });
   }
 
   /**
-   * Set callback for real-time data updates
+   * Set callback for the latest price of each updated bar
    */
   onData(callback: RealtimeDataCallback): void {
     this.dataCallback = callback;
   }
 
+  /**
+   * Set callback for each updated bar
+   */
+  onBar(callback: RealtimeBarCallback): void {
+    this.barCallback = callback;
+  }
+
+  /**
+   * Set callback for live screen entries and exits of watched watchlists
+   */
+  onScreens(callback: ScreensCallback): void {
+    this.screensCallback = callback;
+  }
+
   /**
    * Set callback for errors
    */
@@ -196,22 +206,41 @@ export class EODHDRealtimeService {
     this.statusCallback = callback;
   }
 
+  private send(message: object): void {
+    if (this.ws && this.ws.readyState === WebSocket.OPEN) {
+      this.ws.send(JSON.stringify(message));
+    }
+  }
+
   /**
    * Handle incoming WebSocket messages
    */
   private handleMessage(data: any): void {
-    // EODHD message format for US trades
-    if (data.s && data.p) { // symbol and price
-      const realtimePrice: RealtimePrice = {
-        symbol: data.s,
-        price: parseFloat(data.p),
-        size: data.v ? parseInt(data.v) : undefined,
-        timestamp: data.t || Date.now(),
-        marketStatus: data.ms,
-        condition: data.c
-      };
-
-      this.dataCallback?.(realtimePrice);
+    switch (data.type) {
+      case 'bars':
+        // Bars arrive coalesced, at most one per symbol per update interval
+        for (const bar of data.bars) {
+          const candle: RealtimeCandle = {
+            symbol: bar.symbol,
+            time: bar.date,
+            open: bar.open,
+            high: bar.high,
+            low: bar.low,
+            close: bar.close,
+            volume: bar.volume,
+            trades: bar.trades,
+            complete: bar.complete,
+          };
+          this.barCallback?.(candle);
+          this.dataCallback?.({ symbol: bar.symbol, price: bar.close, timestamp: bar.time || Date.now() });
+        }
+        break;
+      case 'screens':
+        this.screensCallback?.({ watchlist: data.watchlist, events: data.events });
+        break;
+      case 'error':
+        this.errorCallback?.(new Error(data.detail));
+        break;
     }
   }
 
@@ -225,7 +254,7 @@ export class EODHDRealtimeService {
     setTimeout(() => {
       this.connect().catch(error => {
         console.error('Reconnection failed:', error);
-        
+
         if (this.reconnectAttempts >= this.maxReconnectAttempts) {
           this.errorCallback?.(new Error('Max reconnection attempts reached'));
         }
@@ -238,7 +267,7 @@ export class EODHDRealtimeService {
    */
   getStatus(): 'connecting' | 'connected' | 'disconnected' | 'error' {
     if (!this.ws) return 'disconnected';
-    
+
     switch (this.ws.readyState) {
       case WebSocket.CONNECTING:
         return 'connecting';
@@ -258,32 +287,14 @@ export class EODHDRealtimeService {
   getSubscribedSymbols(): string[] {
     return Array.from(this.subscribedSymbols);
   }
-
-  /**
-   * Validate EODHD API token format
-   * EODHD tokens can have various formats, be more flexible
-   */
-  private validateTokenFormat(token: string): boolean {
-    if (!token || typeof token !== 'string') {
-      return false;
-    }
-
-    // More flexible validation for EODHD tokens
-    // Allow various formats: 8.8, longer strings with dots, or alphanumeric strings
-    const isValidLength = token.length >= 10; // Minimum reasonable length
-    const hasValidChars = /^[a-zA-Z0-9._-]+$/.test(token); // Allow alphanumeric, dots, hyphens, underscores
-    const notObviousPlaceholder = !token.toLowerCase().includes('your_') && !token.toLowerCase().includes('token_here');
-    
-    return isValidLength && hasValidChars && notObviousPlaceholder;
-  }
 }
 
 // Singleton instance
-let realtimeService: EODHDRealtimeService | null = null;
+let realtimeService: RealtimeService | null = null;
 
-export function getRealtimeService(): EODHDRealtimeService {
+export function getRealtimeService(): RealtimeService {
   if (!realtimeService) {
-    realtimeService = new EODHDRealtimeService();
+    realtimeService = new RealtimeService();
   }
   return realtimeService;
-}
\ No newline at end of file
+}